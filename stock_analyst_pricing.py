@@ -3,6 +3,12 @@ import pandas as pd
 import matplotlib.pyplot as plt
 from bs4 import BeautifulSoup
 import requests
+import sys
+import time
+import stock_charts
+import stock_metrics
+import stock_price_data
+import stock_screener
 def get_sp500_tickers():
     """
     Scrapes Wikipedia to get the current S&P 500 tickers.
@@ -36,12 +42,15 @@ def get_sp500_tickers():
     return ticker_symbols
 
 
+@stock_metrics.timed('screen.get_tickers_filtered')
 def get_tickers_filtered(ticker_list,
                          min_5y_return=None,
                          min_market_cap=None,
                          max_market_cap=None,
                          include_industries=None,
-                         include_sectors=None):
+                         include_sectors=None,
+                         max_workers=stock_screener.DEFAULT_MAX_WORKERS,
+                         show_report=False):
     """
     Filters a given list of tickers based on:
       - Minimum 5-year % return
@@ -56,68 +65,47 @@ def get_tickers_filtered(ticker_list,
     :param max_market_cap: (float) Maximum market cap.
     :param include_industries: (list) List of industry strings you want to include.
     :param include_sectors: (list) List of sector strings you want to include.
+    :param max_workers: (int) Maximum number of fundamentals lookups in flight.
+    :param show_report: (bool) Print per-stage timings and pruned counts.
     
     :return: DataFrame with the tickers that match the filters, 
              plus relevant info.
     """
 
-    # Container for our results
-    filtered_results = []
+    # Cheap fundamental filters run first (in parallel fetches); only survivors download 5y prices
+    fundamental_filters = []
+    if min_market_cap is not None:
+        # If market cap is missing or too small, skip
+        fundamental_filters.append(("min market cap", lambda info: info.get("marketCap") is not None and info["marketCap"] >= min_market_cap))
+    if max_market_cap is not None:
+        # If market cap is missing or too large, skip
+        fundamental_filters.append(("max market cap", lambda info: info.get("marketCap") is not None and info["marketCap"] <= max_market_cap))
+    if include_industries is not None:
+        fundamental_filters.append(("industry", lambda info: info.get("industry") in include_industries))
+    if include_sectors is not None:
+        fundamental_filters.append(("sector", lambda info: info.get("sector") in include_sectors))
 
-    for ticker_symbol in ticker_list:
-        # Download up to 5 years of data
-        data = yf.download(ticker_symbol, period='5y', interval='1d', progress=False)
-        
-        # If we don't have enough data (or any), skip
-        if data.empty or len(data) < 2:
-            continue
+    price_filters = []
+    if min_5y_return is not None:
+        price_filters.append(("min 5y return", lambda data, info: stock_screener.period_return_pct(data) >= min_5y_return))
 
-        start_price = data['Close'].iloc[0]
-        end_price = data['Close'].iloc[-1]
+    # Only these fields are read, so the hourly currentPrice TTL doesn't force refetches
+    screen = stock_screener.run_screen(ticker_list, fundamental_filters, price_filters,
+                                       price_period='5y', max_workers=max_workers,
+                                       fields=("marketCap", "industry", "sector"))
+    if show_report:
+        screen.print_report()
 
-        # Calculate 5-year % return
-        five_yr_return_pct = ((end_price - start_price) / start_price) * 100
-        
-        # Apply minimum 5-year return filter (if provided)
-        if min_5y_return is not None and five_yr_return_pct < min_5y_return:
-            continue
-        
-        # Now get fundamental info (market cap, industry, sector, etc.)
-        ticker_obj = yf.Ticker(ticker_symbol)
-        info = ticker_obj.info
-
-        market_cap = info.get("marketCap", None)
-        industry = info.get("industry", None)
-        sector = info.get("sector", None)
-
-        # Check market cap filters
-        if min_market_cap is not None:
-            # If market cap is missing or too small, skip
-            if market_cap is None or market_cap < min_market_cap:
-                continue
-        
-        if max_market_cap is not None:
-            # If market cap is missing or too large, skip
-            if market_cap is None or market_cap > max_market_cap:
-                continue
-
-        # Check industry filter
-        if include_industries is not None:
-            if industry not in include_industries:
-                continue
-        
-        # Check sector filter
-        if include_sectors is not None:
-            if sector not in include_sectors:
-                continue
-        
-        # If we reach here, the stock passes all filters
+    # Container for our results
+    filtered_results = []
+    for ticker_symbol in screen.tickers:
+        info = screen.fundamentals[ticker_symbol]
         filtered_results.append({
             "Ticker": ticker_symbol,
-            "5Y Return (%)": five_yr_return_pct,
-            "Market Cap": market_cap,
-            "Industry": industry,
-            "Sector": sector
+            "5Y Return (%)": stock_screener.period_return_pct(screen.prices[ticker_symbol]),
+            "Market Cap": info.get("marketCap", None),
+            "Industry": info.get("industry", None),
+            "Sector": info.get("sector", None)
         })
     
     # Convert to DataFrame for convenience
@@ -131,71 +119,78 @@ def get_tickers_filtered(ticker_list,
     return df_filtered
 
 
+def implied_upside_pct(info):
+    """Percent upside from the current price to the analysts' mean target, or None if unavailable."""
+    current_price = info.get("currentPrice", None)
+    target_mean_price = info.get("targetMeanPrice", None)
+    if current_price is None or target_mean_price is None or current_price == 0:
+        return None
+    return ((target_mean_price - current_price) / current_price) * 100
+
+
+@stock_metrics.timed('screen.filter_stocks_by_analyst_target')
 def filter_stocks_by_analyst_target(tickers, upside_threshold=20, 
                                     min_market_cap=None, 
-                                    max_pe=None):
+                                    max_pe=None,
+                                    max_workers=stock_screener.DEFAULT_MAX_WORKERS,
+                                    show_report=False):
     """
     Filters a list of tickers based on the user-specified upside threshold (%).
     Optional filters for market cap and P/E ratio can be applied.
+    Fundamentals are fetched in parallel; set show_report to print per-filter timings.
     Returns a DataFrame of the stocks that pass the filters.
     """
-    results = []
+    # If current price or target is missing, skip
+    filters = [("implied upside", lambda info: (implied_upside_pct(info) is not None
+                                                and implied_upside_pct(info) >= upside_threshold))]
     
-    for ticker_symbol in tickers:
-        ticker = yf.Ticker(ticker_symbol)
-        
-        # Attempt to retrieve the relevant info
-        info = ticker.info
-        print(info)
-        break
-        current_price = info.get("currentPrice", None)
-        target_mean_price = info.get("analyst_price_targets", None)
-        market_cap = info.get("marketCap", None)
-        pe_ratio = info.get("trailingPE", None)
-        
-        # If current price or target is missing, skip
-        if current_price is None or target_mean_price is None or current_price == 0:
-            continue
-        
-        # Calculate the implied upside
-        implied_upside = ((target_mean_price - current_price) / current_price) * 100
-        
-        # Apply filters
-        if implied_upside < upside_threshold:
-            continue
-        
-        # Market cap filter (if provided)
-        if min_market_cap is not None and (market_cap is None or market_cap < min_market_cap):
-            continue
-        
-        # P/E ratio filter (if provided)
-        if max_pe is not None and (pe_ratio is None or pe_ratio > max_pe):
-            continue
-        
+    # Market cap filter (if provided)
+    if min_market_cap is not None:
+        filters.append(("min market cap", lambda info: info.get("marketCap") is not None and info["marketCap"] >= min_market_cap))
+    
+    # P/E ratio filter (if provided)
+    if max_pe is not None:
+        filters.append(("max P/E", lambda info: info.get("trailingPE") is not None and info["trailingPE"] <= max_pe))
+
+    screen = stock_screener.run_screen(tickers, filters, max_workers=max_workers)
+    if show_report:
+        screen.print_report()
+
+    results = []
+    for ticker_symbol in screen.tickers:
+        info = screen.fundamentals[ticker_symbol]
         results.append({
             "Ticker": ticker_symbol,
-            "Current Price": current_price,
-            "Target Mean Price": target_mean_price,
-            "Implied Upside (%)": implied_upside,
-            "Market Cap": market_cap,
-            "PE Ratio": pe_ratio
+            "Current Price": info.get("currentPrice", None),
+            "Target Mean Price": info.get("targetMeanPrice", None),
+            "Implied Upside (%)": implied_upside_pct(info),
+            "Market Cap": info.get("marketCap", None),
+            "PE Ratio": info.get("trailingPE", None)
         })
     
     # Convert results to a DataFrame for easy display / sorting
     return pd.DataFrame(results)
 
-def plot_recent_performance(filtered_df, period="6mo"):
+@stock_metrics.timed('screen.plot_recent_performance')
+def plot_recent_performance(filtered_df, period="6mo", chart_dir=None):
     """
     Plots the recent performance for each ticker in the filtered DataFrame.
     period can be something like '1mo', '3mo', '6mo', '1y', '5y', etc.
+    With chart_dir set, nothing is shown: one PNG per ticker is rendered there in parallel.
     """
+    prices = stock_price_data.get_prices(list(filtered_df["Ticker"]), period=period)
+    chart_jobs = []
     for _, row in filtered_df.iterrows():
         ticker_symbol = row["Ticker"]
-        data = yf.download(ticker_symbol, period=period, progress=False)
+        data = prices.get(ticker_symbol)
         
-        if len(data) == 0:
+        if data is None or len(data) == 0:
             print(f"No data to plot for {ticker_symbol}.")
             continue
+
+        if chart_dir is not None:
+            chart_jobs.append(stock_charts.price_chart_job(ticker_symbol, data, period, chart_dir))
+            continue
         
         plt.figure(figsize=(10, 6))
         plt.plot(data.index, data["Close"], label=ticker_symbol)
@@ -205,7 +200,46 @@ def plot_recent_performance(filtered_df, period="6mo"):
         plt.legend()
         plt.show()
 
-def main():
+    if chart_jobs:
+        start = time.perf_counter()
+        results = stock_charts.render_charts(chart_jobs)
+        stock_charts.print_render_report(results, time.perf_counter() - start)
+
+def run(tickers, upside_threshold=20, min_market_cap=None, max_pe=None, chart_period=None, chart_dir=None,
+        max_workers=stock_screener.DEFAULT_MAX_WORKERS, summary=None):
+    """
+    Screen tickers by analyst target upside and optionally chart the matches.
+
+    :param chart_period: If set (e.g. '6mo'), chart each match's recent performance; with
+                         chart_dir the charts are rendered to PNG files instead of shown.
+    :return: DataFrame of the stocks that pass the filters.
+    """
+    import stock_jobs
+    summary = summary or stock_jobs.RunSummary()
+    with summary.stage('screen', items=len(tickers)):
+        filtered_stocks = filter_stocks_by_analyst_target(
+            tickers,
+            upside_threshold=upside_threshold,
+            min_market_cap=min_market_cap,
+            max_pe=max_pe,
+            max_workers=max_workers,
+            show_report=True
+        )
+    summary.count('matches', len(filtered_stocks))
+
+    if filtered_stocks.empty:
+        print("No stocks matched the criteria.")
+        return filtered_stocks
+
+    print("\nStocks matching the criteria:\n")
+    print(filtered_stocks)
+
+    if chart_period is not None:
+        with summary.stage('charts', items=len(filtered_stocks)):
+            plot_recent_performance(filtered_stocks, period=chart_period, chart_dir=chart_dir)
+    return filtered_stocks
+
+def main(chart_dir=None):
     print("Fetching tickers...")
     sp500_list = get_sp500_tickers()
     
@@ -222,27 +256,17 @@ def main():
         max_pe = float(input("Enter the maximum P/E ratio (e.g., 40): ") or 40)
     
     # Filter the tickers
-    filtered_stocks = filter_stocks_by_analyst_target(
-        sp500_list, 
-        upside_threshold=upside_threshold, 
-        min_market_cap=min_market_cap, 
-        max_pe=max_pe
-    )
-    
+    filtered_stocks = run(sp500_list, upside_threshold=upside_threshold, min_market_cap=min_market_cap, max_pe=max_pe)
     if filtered_stocks.empty:
-        print("No stocks matched the criteria.")
         return
     
-    print("\nStocks matching the criteria:\n")
-    print(filtered_stocks)
-    
     plot_choice = input("\nWould you like to see recent performance graphs? (y/n): ") or "n"
     if plot_choice.lower() == "y":
         period_choice = input("Enter period for charts (e.g., '1mo', '3mo', '6mo', '1y'): ") or "6mo"
-        plot_recent_performance(filtered_stocks, period=period_choice)
+        plot_recent_performance(filtered_stocks, period=period_choice, chart_dir=chart_dir)
 
 if __name__ == "__main__":
     #tickerlist = get_sp500_tickers()
     #print(tickerlist)
     #get_tickers_filtered(ticker_list=tickerlist)
-    main()
+    main(chart_dir=stock_charts.DEFAULT_OUTPUT_DIR if '--headless' in sys.argv[1:] else None)
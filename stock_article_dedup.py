@@ -0,0 +1,258 @@
+import hashlib
+import math
+import re
+import time
+import zlib
+from urllib.parse import urlsplit
+
+import numpy as np
+
+import stock_sentiment_cache
+
+# Constants
+DEFAULT_THRESHOLD = 0.7     # Minimum Jaccard similarity of title shingles to count as the same story
+DEFAULT_NUM_PERM = 64       # MinHash signature length
+DEFAULT_BANDS = 16          # LSH bands (rows per band = num_perm / bands)
+DEFAULT_SHINGLE_SIZE = 4    # Characters per title shingle
+WEIGHTINGS = ('story', 'log', 'copies')
+DEFAULT_WEIGHTING = 'log'
+_PRIME = 2147483647         # 2^31 - 1, so a * x + b stays inside uint64
+
+# Syndicated copies often append the outlet's name: "Title - Reuters", "Title | Yahoo Finance"
+_OUTLET_SUFFIX = re.compile(r"\s+[-|\u2013\u2014:]\s+(\S+(\s+\S+){0,3})$")
+
+def normalize_url(url):
+    """Host (without www.) plus path, lowercased; scheme, query, fragment and trailing slash dropped."""
+    if not url:
+        return ''
+    parts = urlsplit(url.strip().lower())
+    host = parts.netloc[4:] if parts.netloc.startswith('www.') else parts.netloc
+    return host + parts.path.rstrip('/')
+
+def normalize_title(title):
+    """Lowercased title without a short trailing outlet name, punctuation removed and whitespace collapsed."""
+    title = (title or "").strip()
+    stripped = _OUTLET_SUFFIX.sub("", title)
+    if len(stripped.split()) >= 3:  # Never reduce a title to a fragment
+        title = stripped
+    return stock_sentiment_cache.normalize_text(re.sub(r"[^\w\s]", " ", title))
+
+def title_shingles(title, size=DEFAULT_SHINGLE_SIZE):
+    """Set of character shingles of a normalized title (the whole title if it is shorter)."""
+    if len(title) <= size:
+        return {title} if title else set()
+    return {title[i:i + size] for i in range(len(title) - size + 1)}
+
+def copy_weight(copies, weighting=DEFAULT_WEIGHTING):
+    """
+    Weight of a story seen `copies` times: 'story' counts it once, 'copies' once per copy
+    (the old behaviour), 'log' in between (1 + ln copies) so wide syndication counts for
+    more without one wire story drowning out the month.
+    """
+    if weighting == 'story':
+        return 1.0
+    if weighting == 'copies':
+        return float(copies)
+    if weighting == 'log':
+        return 1.0 + math.log(copies)
+    raise ValueError(f"Unknown weighting '{weighting}'. Choose from: {', '.join(WEIGHTINGS)}")
+
+class _UnionFind:
+    def __init__(self, n):
+        self.parent = list(range(n))
+
+    def find(self, i):
+        while self.parent[i] != i:
+            self.parent[i] = self.parent[self.parent[i]]
+            i = self.parent[i]
+        return i
+
+    def union(self, i, j):
+        root_i, root_j = self.find(i), self.find(j)
+        if root_i != root_j:
+            # Keep the earliest article as the root so it becomes the group's representative
+            self.parent[max(root_i, root_j)] = min(root_i, root_j)
+
+class DedupResult:
+    """
+    Story groups for one list of articles.
+
+    `group_of[i]` is the group of article i, `representatives[g]` the index of the first
+    article of group g and `copies[g]` how many articles it covers. `counters` records how
+    many articles were merged by exact URL, exact title and near-duplicate title.
+    """
+
+    def __init__(self, group_of, counters):
+        self.group_of = group_of
+        self.representatives = []
+        first_seen = {}
+        for i, group in enumerate(group_of):
+            if group not in first_seen:
+                first_seen[group] = len(self.representatives)
+                self.representatives.append(i)
+        self.group_of = [first_seen[group] for group in group_of]
+        self.copies = [0] * len(self.representatives)
+        for group in self.group_of:
+            self.copies[group] += 1
+        self.counters = dict(counters, unique=len(self.representatives))
+
+    def unique_articles(self, articles):
+        return [articles[i] for i in self.representatives]
+
+    def weights(self, weighting=DEFAULT_WEIGHTING):
+        return [copy_weight(copies, weighting) for copies in self.copies]
+
+    def expand(self, values):
+        """Map one value per group (e.g. its sentiment label) back onto every article."""
+        return [values[group] for group in self.group_of]
+
+class ArticleDeduplicator:
+    """
+    Groups syndicated copies of the same story before scoring.
+
+    Articles are merged when their normalized URLs match, their normalized titles match,
+    or the Jaccard similarity of their title shingles is at least `threshold`. Near
+    duplicates are found with MinHash signatures and LSH banding; every LSH candidate
+    pair is confirmed with the exact Jaccard similarity before merging.
+    """
+
+    def __init__(self, threshold=DEFAULT_THRESHOLD, num_perm=DEFAULT_NUM_PERM, bands=DEFAULT_BANDS,
+                 shingle_size=DEFAULT_SHINGLE_SIZE, seed=1):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.shingle_size = shingle_size
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, _PRIME, size=num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, _PRIME, size=num_perm, dtype=np.uint64)
+        self.totals = {'articles': 0, 'exact_url': 0, 'exact_title': 0, 'near_duplicate': 0, 'unique': 0}
+
+    def signatures(self, shingle_sets):
+        """MinHash signatures (articles x num_perm) computed for all articles in one vectorized pass."""
+        lengths = np.array([len(shingles) for shingles in shingle_sets])
+        hashes = np.fromiter(
+            (zlib.crc32(shingle.encode('utf-8')) & 0x7FFFFFFF for shingles in shingle_sets for shingle in shingles),
+            dtype=np.uint64, count=int(lengths.sum()),
+        )
+        permuted = (hashes[:, None] * self._a + self._b) % _PRIME
+        offsets = np.concatenate([[0], np.cumsum(lengths)[:-1]])
+        return np.minimum.reduceat(permuted, offsets, axis=0)
+
+    def dedup(self, articles):
+        """Group the articles into stories and return a DedupResult."""
+        n = len(articles)
+        groups = _UnionFind(n)
+        counters = {'articles': n, 'exact_url': 0, 'exact_title': 0, 'near_duplicate': 0}
+
+        def merge(i, j, counter):
+            if groups.find(i) != groups.find(j):
+                groups.union(i, j)
+                counters[counter] += 1
+
+        titles = [normalize_title(article.get('title')) for article in articles]
+        seen_urls, seen_titles = {}, {}
+        for i, article in enumerate(articles):
+            url = normalize_url(article.get('url'))
+            if url:
+                merge(seen_urls.setdefault(url, i), i, 'exact_url')
+            if titles[i]:
+                key = hashlib.sha1(titles[i].encode('utf-8')).digest()
+                merge(seen_titles.setdefault(key, i), i, 'exact_title')
+
+        # Near duplicates: one representative per distinct title goes through MinHash/LSH
+        candidates = [i for i in sorted(seen_titles.values())]
+        if len(candidates) > 1:
+            shingles = [title_shingles(titles[i], self.shingle_size) for i in candidates]
+            signatures = self.signatures(shingles)
+            rows = self.num_perm // self.bands
+            for band in range(self.bands):
+                buckets = {}
+                for position, key in enumerate(map(bytes, signatures[:, band * rows:(band + 1) * rows])):
+                    buckets.setdefault(key, []).append(position)
+                for members in buckets.values():
+                    for other in members[1:]:
+                        first, second = shingles[members[0]], shingles[other]
+                        if len(first & second) / len(first | second) >= self.threshold:
+                            merge(candidates[members[0]], candidates[other], 'near_duplicate')
+
+        result = DedupResult([groups.find(i) for i in range(n)], counters)
+        for counter, value in result.counters.items():
+            self.totals[counter] += value
+        return result
+
+_deduplicator = None
+_disabled = False
+
+def get_deduplicator():
+    """
+    Return the shared deduplicator, creating it with the default thresholds on first use,
+    or None if deduplication was disabled with set_deduplicator(None).
+    """
+    global _deduplicator
+    if _disabled:
+        return None
+    if _deduplicator is None:
+        _deduplicator = ArticleDeduplicator()
+    return _deduplicator
+
+def set_deduplicator(deduplicator):
+    """
+    Replace the shared deduplicator (e.g. with other thresholds). None disables
+    deduplication: score_story_groups then scores every article and weights each copy 1.
+    Setting a deduplicator again re-enables it.
+    """
+    global _deduplicator, _disabled
+    _deduplicator = deduplicator
+    _disabled = deduplicator is None
+    return _deduplicator
+
+def print_counters(counters):
+    print(f"Deduplicated {counters['articles']} articles into {counters['unique']} stories "
+          f"({counters['exact_url']} same URL, {counters['exact_title']} same title, "
+          f"{counters['near_duplicate']} near-duplicate titles)")
+
+def sample_articles(n_stories=300, max_copies=8, seed=0):
+    """Synthetic wire stories, each syndicated several times with small title edits and new URLs."""
+    import random
+    rng = random.Random(seed)
+    words = ["shares", "rise", "fall", "after", "earnings", "beat", "miss", "estimates", "company", "reports",
+             "quarterly", "revenue", "guidance", "analysts", "expect", "growth", "deal", "merger", "stock", "record"]
+    suffixes = ["", " - Reuters", " | Yahoo Finance", " - MarketWatch", " (AP)", ": report"]
+    articles = []
+    for story in range(n_stories):
+        title = f"Company{story} " + " ".join(rng.choice(words) for _ in range(rng.randint(6, 12)))
+        for copy in range(rng.randint(1, max_copies)):
+            articles.append({
+                'title': title + rng.choice(suffixes),
+                'url': f"https://site{copy}.example.com/news/{story}-{copy}",
+                'story': story,
+            })
+    rng.shuffle(articles)
+    return articles
+
+def benchmark(n_stories=300, threshold=DEFAULT_THRESHOLD):
+    """Deduplicate synthetic syndicated stories and report timing and grouping accuracy."""
+    articles = sample_articles(n_stories)
+    deduplicator = ArticleDeduplicator(threshold=threshold)
+    start = time.perf_counter()
+    result = deduplicator.dedup(articles)
+    seconds = time.perf_counter() - start
+
+    stories = {}
+    for article, group in zip(articles, result.group_of):
+        stories.setdefault(article['story'], set()).add(group)
+    split = sum(len(groups) > 1 for groups in stories.values())
+    members = {}
+    for article, group in zip(articles, result.group_of):
+        members.setdefault(group, set()).add(article['story'])
+    merged = sum(len(story_ids) > 1 for story_ids in members.values())
+
+    print_counters(result.counters)
+    print(f"{len(articles)} articles in {seconds * 1000:.1f} ms; {len(stories)} true stories, "
+          f"{split} split across groups, {merged} groups mixing stories")
+    return {'seconds': seconds, 'split': split, 'merged': merged, **result.counters}
+
+if __name__ == "__main__":
+    benchmark()
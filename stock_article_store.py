@@ -0,0 +1,154 @@
+import glob
+import os
+import re
+import threading
+import time
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+# Constants
+DEFAULT_STORE_PATH = os.path.join('data', 'articles')
+PARTITION_FILE = 'part-0.parquet'
+
+# Columns stored in each partition file (ticker and month live in the directory names)
+ARTICLE_SCHEMA = pa.schema([
+    ('source', pa.string()),
+    ('title', pa.string()),
+    ('description', pa.string()),
+    ('url', pa.string()),
+    ('source_strength', pa.string()),
+    ('sentiment_label', pa.string()),
+    ('sentiment_score', pa.float64()),
+    ('stored_at', pa.float64()),
+])
+PARTITIONING = ds.partitioning(pa.schema([('ticker', pa.string()), ('month', pa.string())]), flavor='hive')
+
+# Legacy per-month CSV names written by the sentiment modules
+GDELT_CSV_PATTERN = re.compile(r"^(?P<ticker>.+)_sentiment_for_(?P<month>\d{4}-\d{2})\.csv$")
+NEWSAPI_CSV_PATTERN = re.compile(r"^(?P<ticker>.+)_(?P<month>\d{4}-\d{2})\.csv$")
+
+class ArticleStore:
+    """
+    Parquet dataset of articles partitioned as ticker=<T>/month=<YYYY-MM>.
+
+    Appends merge into the month's partition and deduplicate by URL (falling back to
+    title when an article has no URL), keeping the newest row. Reads push the
+    ticker/month predicates down to the partition directories so only the matching
+    files are opened.
+    """
+
+    def __init__(self, path=DEFAULT_STORE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        os.makedirs(path, exist_ok=True)
+
+    def _partition_path(self, ticker, month):
+        return os.path.join(self.path, f"ticker={ticker}", f"month={month}")
+
+    def append(self, ticker, month, articles, source, labels=None, scores=None):
+        """
+        Append articles for one ticker and month, with optional per-article sentiment.
+
+        :param articles: List of article dicts (title, description, url, optional source_strength).
+        :param source: Where the articles came from, e.g. 'gdelt' or 'newsapi'.
+        :param labels: Optional star label per article.
+        :param scores: Optional numeric sentiment score per article.
+        :return: Number of rows in the partition after deduplication.
+        """
+        now = time.time()
+        new_rows = pd.DataFrame({
+            'source': source,
+            'title': [a.get('title') or '' for a in articles],
+            'description': [a.get('description') or '' for a in articles],
+            'url': [a.get('url') or '' for a in articles],
+            'source_strength': [a.get('source_strength') for a in articles],
+            'sentiment_label': labels if labels is not None else [None] * len(articles),
+            'sentiment_score': scores if scores is not None else [None] * len(articles),
+            'stored_at': now,
+        })
+
+        partition = self._partition_path(ticker, month)
+        file_path = os.path.join(partition, PARTITION_FILE)
+        with self._lock:
+            if os.path.exists(file_path):
+                existing = pq.read_table(file_path).to_pandas()
+                combined = pd.concat([existing, new_rows], ignore_index=True)
+            else:
+                combined = new_rows
+
+            dedup_key = combined['url'].where(combined['url'] != '', combined['title'])
+            combined = combined[~dedup_key.duplicated(keep='last')]
+
+            os.makedirs(partition, exist_ok=True)
+            table = pa.Table.from_pandas(combined, schema=ARTICLE_SCHEMA, preserve_index=False)
+            # Write then rename so a crash never leaves a half-written partition behind; the
+            # '.'-prefixed temp name is skipped by ds.dataset, so a leftover one can't break reads
+            tmp_path = os.path.join(partition, '.' + PARTITION_FILE + '.tmp')
+            pq.write_table(table, tmp_path)
+            os.replace(tmp_path, file_path)
+        return len(combined)
+
+    def has_month(self, ticker, month):
+        """Return True if any articles are stored for the ticker and month."""
+        return os.path.exists(os.path.join(self._partition_path(ticker, month), PARTITION_FILE))
+
+    def read(self, tickers=None, start=None, end=None, columns=None):
+        """
+        Read stored articles as a DataFrame.
+
+        :param tickers: Optional list of tickers to include.
+        :param start: Optional first date or month ('YYYY-MM-DD' or 'YYYY-MM'), inclusive.
+        :param end: Optional last date or month, inclusive.
+        :param columns: Optional subset of columns to load.
+        """
+        dataset = ds.dataset(self.path, format='parquet', partitioning=PARTITIONING)
+        predicate = None
+        for condition in (
+            ds.field('ticker').isin(list(tickers)) if tickers is not None else None,
+            ds.field('month') >= start[:7] if start else None,
+            ds.field('month') <= end[:7] if end else None,
+        ):
+            if condition is not None:
+                predicate = condition if predicate is None else predicate & condition
+        return dataset.to_table(columns=columns, filter=predicate).to_pandas()
+
+def import_csvs(root='.', store=None):
+    """
+    Migrate the legacy per-month CSVs (<ticker>/<ticker>_<month>.csv from NewsAPI and
+    <ticker>/<ticker>_sentiment_for_<month>.csv from GDELT) into the Parquet store.
+
+    :return: Number of CSV files imported.
+    """
+    store = store or ArticleStore()
+    imported = 0
+    for csv_file_path in sorted(glob.glob(os.path.join(root, '*', '*.csv'))):
+        file_name = os.path.basename(csv_file_path)
+        match = GDELT_CSV_PATTERN.match(file_name)
+        source = 'gdelt'
+        if not match:
+            match = NEWSAPI_CSV_PATTERN.match(file_name)
+            source = 'newsapi'
+        if not match:
+            continue  # e.g. the full-history price CSVs from stock_hmm_analysis
+
+        data = pd.read_csv(csv_file_path, dtype=str, keep_default_na=False)
+        articles = [
+            {
+                'title': row.get('Title', ''),
+                'description': row.get('Description', ''),
+                'url': row.get('URL', ''),
+                'source_strength': row.get('Source Strength') or None,
+            }
+            for row in data.to_dict('records')
+        ]
+        store.append(match['ticker'], match['month'], articles, source)
+        imported += 1
+        print(f"Imported {csv_file_path} ({len(articles)} articles)")
+    return imported
+
+if __name__ == "__main__":
+    count = import_csvs()
+    print(f"Imported {count} CSV files into {DEFAULT_STORE_PATH}")
@@ -0,0 +1,329 @@
+import itertools
+import time
+
+import numpy as np
+import pandas as pd
+
+# Constants
+TRADING_DAYS = 252
+MEMORY_BUDGET_BYTES = 256 * 1024 ** 2   # Rough cap on the (params x days x tickers) arrays of one chunk
+ANY_STATE = 99                          # State bound that every regime passes
+
+# Parameter grid: every combination is one signal rule. A ticker is long on day t when its
+# sentiment score (from an earlier month) is above long_threshold and its regime is at
+# least long_min_state, short when the score is below short_threshold and its regime is at
+# most short_max_state, and flat otherwise. States are ordered by mean return (see
+# stock_hmm_store.sort_states), so the highest state is the bullish one.
+DEFAULT_GRID = {
+    'long_threshold': [-0.5, -0.25, 0.0, 0.25, 0.5, 0.75, 1.0, 1.5],
+    'short_threshold': [-np.inf, -1.5, -1.0, -0.5, -0.25, 0.0],
+    'long_min_state': [0, 1],
+    'short_max_state': [0, ANY_STATE],
+    'cost_bps': [0.0, 5.0, 10.0, 20.0],
+}
+
+class BacktestPanel:
+    """
+    Days x tickers arrays for a backtest, on the union of all tickers' trading days.
+
+    `forward_returns[t, j]` is ticker j's return from day t to the next trading day (the
+    return a position taken at day t's close earns), `sentiment[t, j]` the monthly score
+    known on day t and `states[t, j]` the regime on day t; missing values are NaN / -1.
+    """
+
+    def __init__(self, dates, tickers, forward_returns, sentiment, states):
+        self.dates = dates
+        self.tickers = tickers
+        self.forward_returns = forward_returns
+        self.sentiment = sentiment
+        self.states = states
+
+    @property
+    def shape(self):
+        return self.forward_returns.shape
+
+def filtered_states(models, data_by_ticker, features=None):
+    """
+    Regime per bar from the online forward filter, i.e. using only bars up to that day.
+    Viterbi paths from predict() look at the whole history, which leaks future returns
+    into a backtest.
+
+    :return: Dict of ticker -> Series of regimes indexed like the ticker's data.
+    """
+    import stock_regime_tracker
+    features = features or ['Returns']
+    states = {}
+    for ticker, model in models.items():
+        data = data_by_ticker[ticker]
+        probabilities = stock_regime_tracker.RegimeTracker(model).update_many(data[features].to_numpy(dtype=np.float64))
+        states[ticker] = pd.Series(np.argmax(probabilities, axis=1), index=data.index)
+    return states
+
+def build_panel(data_by_ticker, states_by_ticker, sentiment_by_ticker, lag_months=1):
+    """
+    Align returns, regimes and monthly sentiment for many tickers into a BacktestPanel.
+
+    :param data_by_ticker: Dict of ticker -> frame with a 'Returns' column (as from get_stock_data).
+    :param states_by_ticker: Dict of ticker -> Series of regimes indexed by date (e.g. filtered_states).
+    :param sentiment_by_ticker: Dict of ticker -> Series of monthly scores indexed by 'YYYY-MM'
+                                (e.g. stock_hmm_features.monthly_sentiment).
+    :param lag_months: Each day uses the score of the month this many months earlier, since a
+                       month's score is only complete once the month is over.
+    """
+    tickers = [ticker for ticker in data_by_ticker if ticker in states_by_ticker]
+    returns = pd.DataFrame({ticker: data_by_ticker[ticker]['Returns'] for ticker in tickers}).sort_index()
+    dates = returns.index
+    forward_returns = returns.shift(-1).to_numpy(dtype=np.float64)
+
+    states = pd.DataFrame({ticker: states_by_ticker[ticker] for ticker in tickers}).reindex(dates)
+    states = states.fillna(-1).to_numpy(dtype=np.int16)
+
+    # Monthly scores as a months x tickers table, then one row lookup per day
+    months = (dates.to_period('M') - lag_months).strftime('%Y-%m')
+    monthly = pd.DataFrame({ticker: sentiment_by_ticker.get(ticker, pd.Series(dtype=np.float64)) for ticker in tickers})
+    sentiment = monthly.reindex(index=months, columns=tickers).to_numpy(dtype=np.float64)
+
+    return BacktestPanel(dates.to_numpy(), tickers, forward_returns, sentiment, states)
+
+def _model_inputs(data, features, scaling, cutoff, ticker, article_store):
+    """
+    A ticker's HMM inputs. Raw returns are used as they are; indicator features are
+    standardized with `scaling`, or if there is none with the statistics of the bars
+    before `cutoff` only, so the backtest period never shapes its own inputs. Returns None
+    (with a message) when there is no scaling and no bars before `cutoff` to take it from.
+    """
+    import stock_hmm_features
+    if features == ['Returns']:
+        return data.dropna(subset=features)
+    # The sentiment column is rebuilt from the article store, lagged like the model saw it
+    columns = [feature for feature in features if feature != stock_hmm_features.SENTIMENT_FEATURE]
+    sentiment = None
+    if stock_hmm_features.SENTIMENT_FEATURE in features:
+        sentiment = stock_hmm_features.monthly_sentiment([ticker], article_store).get(ticker, pd.Series(dtype=np.float64))
+    if scaling is None:
+        training, scaling = stock_hmm_features.build_feature_frame(data[data.index < cutoff], columns, sentiment)
+        if training.empty:
+            # Statistics of no bars are NaN and would turn every input (and state) into garbage
+            print(f"No scaling stored for {ticker}'s features and no bars before {cutoff.date()} to compute it; "
+                  f"skipping it (pass train_start to load earlier history).")
+            return None
+    frame, _ = stock_hmm_features.build_feature_frame(data, columns, sentiment, scaling)
+    return frame
+
+def load_panel(tickers, start_date, end_date, n_components=2, model_store=None, article_store=None, lag_months=1,
+               train_start=None, features=None):
+    """
+    Build an out-of-sample panel for [start_date, end_date) from the price cache, HMMs fit
+    only on bars before start_date and the monthly sentiment in the article store.
+
+    Each ticker uses its latest stored model version (see stock_hmm_store) whose training
+    window ended before start_date, scaled with the statistics stored with that version,
+    so neither the regime parameters nor the standardization have seen the backtest
+    period. The store only keeps recent versions, so for a backtest starting further back
+    pass train_start: tickers without such a version are then fit cold on
+    [train_start, start_date) on `features` (default raw returns). Otherwise they are left
+    out, as are tickers without prices. Regimes come from the forward filter run from the
+    start of the loaded history, so each day's regime only uses bars up to that day.
+    """
+    import stock_hmm_features
+    import stock_hmm_store
+    import stock_hmm_training
+    import stock_indicator_engine
+    import stock_price_data
+
+    prices = stock_price_data.get_prices(tickers, start=train_start or start_date, end=end_date)
+    adj_close = pd.DataFrame({ticker: prices[ticker]['Adj Close'] for ticker in tickers if ticker in prices})
+    data_by_ticker = stock_indicator_engine.compute_indicator_frames(adj_close)
+    cutoff = pd.Timestamp(start_date)
+
+    model_store = model_store or stock_hmm_store.HMMModelStore()
+    states, to_fit = {}, {}
+    for ticker, data in data_by_ticker.items():
+        records = [record for record in model_store.versions(ticker, n_components) if record['train_end'] < start_date]
+        if not records:
+            if train_start is None:
+                print(f"No {n_components}-state HMM for {ticker} trained before {start_date}; skipping it.")
+            else:
+                to_fit[ticker] = data
+            continue
+        model, record = model_store.load(ticker, n_components, records[-1]['version'])
+        model_features = record.get('features', ['Returns'])
+        inputs = _model_inputs(data, model_features, stock_hmm_store.stored_scaling(record), cutoff, ticker, article_store)
+        if inputs is None:
+            continue
+        states.update(filtered_states({ticker: model}, {ticker: inputs}, model_features))
+
+    if to_fit:
+        features = list(features or ['Returns'])
+        inputs = {}
+        for ticker, data in to_fit.items():
+            frame = _model_inputs(data, features, None, cutoff, ticker, article_store)
+            if frame is None:
+                continue
+            if not (frame.index < cutoff).any():
+                print(f"No bars for {ticker} between {train_start} and {start_date} to fit an HMM on; skipping it.")
+                continue
+            inputs[ticker] = frame
+        trained = stock_hmm_training.train_models({ticker: frame[frame.index < cutoff] for ticker, frame in inputs.items()},
+                                                  n_components=(n_components,), features=features)
+        for ticker, result in trained.items():
+            if result.model is None:
+                print(f"Could not fit an HMM for {ticker} before {start_date}; skipping it.")
+                continue
+            states.update(filtered_states({ticker: stock_hmm_store.sort_states(result.model)}, {ticker: inputs[ticker]},
+                                          features))
+
+    # The history before start_date only trained the models and warmed up the filter
+    data_by_ticker = {ticker: data[data.index >= cutoff] for ticker, data in data_by_ticker.items() if ticker in states}
+    states = {ticker: series[series.index >= cutoff] for ticker, series in states.items()}
+    sentiment_by_ticker = stock_hmm_features.monthly_sentiment(list(states), article_store)
+    return build_panel(data_by_ticker, states, sentiment_by_ticker, lag_months)
+
+def expand_grid(grid=None):
+    """Every combination of the grid's values, as a DataFrame with one row per parameter set."""
+    grid = grid or DEFAULT_GRID
+    return pd.DataFrame(list(itertools.product(*grid.values())), columns=list(grid))
+
+def _chunk_size(panel, n_params):
+    # About a dozen float64 (params x days x tickers) temporaries are alive at once
+    per_param = 12 * 8 * panel.forward_returns.size
+    return max(1, min(n_params, MEMORY_BUDGET_BYTES // max(per_param, 1)))
+
+def _evaluate_chunk(panel, params, valid, forward, periods_per_year):
+    """Vectorized metrics for one chunk of parameter sets (params along the first axis)."""
+    column = lambda name, dtype=np.float64: params[name].to_numpy(dtype=dtype)[:, None, None]
+    sentiment, states = panel.sentiment[None], panel.states[None]
+
+    with np.errstate(invalid='ignore'):
+        long = (sentiment > column('long_threshold')) & (states >= column('long_min_state', np.int16))
+        short = (sentiment < column('short_threshold')) & (states <= column('short_max_state', np.int16))
+    positions = (long & valid).astype(np.float64) - (short & valid & ~long)
+
+    # Trading cost on every change of position, including opening on the first day
+    trades = np.abs(np.diff(positions, axis=1, prepend=0.0))
+    pnl = positions * forward - trades * column('cost_bps') / 1e4
+
+    # Equal-weight portfolio over the tickers tradable that day
+    tradable = valid.sum(axis=2)
+    daily = np.divide(pnl.sum(axis=2), tradable, out=np.zeros(pnl.shape[:2]), where=tradable > 0)
+
+    wealth = np.cumprod(1 + daily, axis=1)
+    drawdown = 1 - wealth / np.maximum.accumulate(wealth, axis=1)
+    mean, std = daily.mean(axis=1), daily.std(axis=1)
+    held = positions != 0
+    n_held = held.sum(axis=(1, 2))
+    n_valid = max(int(valid.sum()), 1)
+    return {
+        'total_return': wealth[:, -1] - 1,
+        'annual_return': wealth[:, -1] ** (periods_per_year / daily.shape[1]) - 1,
+        'sharpe': np.divide(mean, std, out=np.zeros_like(mean), where=std > 0) * np.sqrt(periods_per_year),
+        'max_drawdown': drawdown.max(axis=1),
+        'exposure': n_held / n_valid,
+        'turnover': trades.sum(axis=(1, 2)) / n_valid,
+        'hit_rate': np.divide((held & (pnl > 0)).sum(axis=(1, 2)), n_held, out=np.zeros(len(n_held)), where=n_held > 0),
+    }
+
+def run_backtest(panel, grid=None, chunk_size=None, periods_per_year=TRADING_DAYS):
+    """
+    Evaluate every parameter set of the grid over the whole panel.
+
+    Positions, costs and portfolio returns for a chunk of parameter sets are computed at
+    once by broadcasting the parameters against the days x tickers arrays, so there is no
+    Python loop over days, tickers or parameter sets inside a chunk; chunks only bound memory.
+
+    :param grid: Dict of parameter name -> list of values (default DEFAULT_GRID), or a
+                 DataFrame of parameter sets as returned by expand_grid.
+    :return: (results, stats). results has one row per parameter set with its parameters,
+             total/annual return, Sharpe ratio, max drawdown, exposure, turnover and hit
+             rate; stats has the combo count, seconds and seconds per 1,000 combos.
+    """
+    params = grid if isinstance(grid, pd.DataFrame) else expand_grid(grid)
+    params = params.reset_index(drop=True)
+    chunk_size = chunk_size or _chunk_size(panel, len(params))
+
+    start = time.perf_counter()
+    valid = ((panel.states >= 0) & ~np.isnan(panel.forward_returns))[None]
+    forward = np.nan_to_num(panel.forward_returns)[None]
+    chunks = [_evaluate_chunk(panel, params.iloc[i:i + chunk_size], valid, forward, periods_per_year)
+              for i in range(0, len(params), chunk_size)]
+    metrics = {name: np.concatenate([chunk[name] for chunk in chunks]) for name in chunks[0]} if chunks else {}
+    seconds = time.perf_counter() - start
+
+    results = params.assign(**metrics)
+    stats = {
+        'combos': len(params),
+        'days': panel.shape[0],
+        'tickers': panel.shape[1],
+        'chunk_size': chunk_size,
+        'seconds': seconds,
+        'seconds_per_1k': 1000 * seconds / len(params) if len(params) else 0.0,
+    }
+    return results, stats
+
+def print_backtest(results, stats, top=10):
+    print(f"Backtested {stats['combos']} parameter sets over {stats['days']} days x {stats['tickers']} tickers "
+          f"in {stats['seconds']:.2f}s ({stats['seconds_per_1k']:.2f}s per 1,000 combos)")
+    print(results.sort_values('sharpe', ascending=False).head(top).to_string(index=False, float_format='{:.4f}'.format))
+
+def _loop_backtest(panel, params, periods_per_year=TRADING_DAYS):
+    """Day-by-day reference implementation of one parameter set, for checking run_backtest."""
+    n_days, n_tickers = panel.shape
+    previous = np.zeros(n_tickers)
+    daily = []
+    for t in range(n_days):
+        total, tradable = 0.0, 0
+        for j in range(n_tickers):
+            score, state, forward = panel.sentiment[t, j], panel.states[t, j], panel.forward_returns[t, j]
+            position = 0.0
+            if state >= 0 and not np.isnan(forward):
+                tradable += 1
+                if score > params['long_threshold'] and state >= params['long_min_state']:
+                    position = 1.0
+                elif score < params['short_threshold'] and state <= params['short_max_state']:
+                    position = -1.0
+                total += position * forward
+            total -= abs(position - previous[j]) * params['cost_bps'] / 1e4
+            previous[j] = position
+        daily.append(total / tradable if tradable else 0.0)
+    daily = np.asarray(daily)
+    return {'total_return': np.prod(1 + daily) - 1,
+            'sharpe': daily.mean() / daily.std() * np.sqrt(periods_per_year) if daily.std() > 0 else 0.0}
+
+def synthetic_panel(n_tickers=50, n_bars=1500, seed=0):
+    """
+    Panel from synthetic two-regime prices, filtered states of HMMs fit on them and
+    monthly sentiment that weakly anticipates the following month's returns.
+    """
+    import stock_hmm_store
+    import stock_hmm_training
+    data_by_ticker = stock_hmm_store.synthetic_regime_data(n_tickers, n_bars=n_bars, seed=seed)
+    results = stock_hmm_training.train_models(data_by_ticker, restarts=1)
+    models = {ticker: stock_hmm_store.sort_states(result.model) for ticker, result in results.items()}
+    states = filtered_states(models, data_by_ticker)
+
+    rng = np.random.default_rng(seed)
+    sentiment = {}
+    for ticker, data in data_by_ticker.items():
+        monthly_returns = data['Returns'].groupby(data.index.strftime('%Y-%m')).mean()
+        # Scored in one month, applied (lag 1) to the next one
+        signal = monthly_returns.shift(-1).fillna(0.0) / monthly_returns.std()
+        sentiment[ticker] = (0.2 * signal + rng.normal(0, 1, len(signal))).clip(-2, 2)
+    return build_panel(data_by_ticker, states, sentiment)
+
+def benchmark(n_tickers=50, n_bars=1500, check=3):
+    """Run the default grid on a synthetic universe and check a few parameter sets against the day loop."""
+    panel = synthetic_panel(n_tickers, n_bars)
+    results, stats = run_backtest(panel)
+    print_backtest(results, stats)
+
+    for _, row in results.sample(check, random_state=0).iterrows():
+        start = time.perf_counter()
+        reference = _loop_backtest(panel, row)
+        loop_seconds = time.perf_counter() - start
+        print(f"Day loop: {loop_seconds:.2f}s per combo; |total return diff| = "
+              f"{abs(reference['total_return'] - row['total_return']):.2e}, "
+              f"|Sharpe diff| = {abs(reference['sharpe'] - row['sharpe']):.2e}")
+    return results, stats
+
+if __name__ == "__main__":
+    benchmark()
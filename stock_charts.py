@@ -0,0 +1,180 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import stock_metrics
+
+# Constants
+DEFAULT_OUTPUT_DIR = 'charts'
+DEFAULT_MAX_POINTS = 1500
+DPI = 100
+
+def default_max_workers():
+    return max(1, (os.cpu_count() or 1) - 1)
+
+def _use_agg():
+    # Worker processes never open windows; switch even if the parent already imported pyplot
+    import matplotlib
+    matplotlib.use('Agg', force=True)
+
+def downsample_minmax(x, y, max_points=DEFAULT_MAX_POINTS):
+    """
+    Reduce a line to at most ~max_points points while keeping every bucket's low and high,
+    so spikes survive. Returns the indices to keep, in order.
+    """
+    n = len(y)
+    if n <= max_points:
+        return np.arange(n)
+    buckets = np.array_split(np.arange(n), max(1, max_points // 2))
+    keep = []
+    for bucket in buckets:
+        values = y[bucket]
+        if np.all(np.isnan(values)):
+            keep.append(bucket[0])
+            continue
+        low, high = bucket[np.nanargmin(values)], bucket[np.nanargmax(values)]
+        keep.extend(sorted({low, high}))
+    return np.asarray(keep)
+
+def _line(ax, dates, values, max_points, **kwargs):
+    keep = downsample_minmax(dates, values, max_points)
+    ax.plot(dates[keep], values[keep], **kwargs)
+
+@stock_metrics.timed('charts.render_regime_chart')
+def render_regime_chart(path, ticker, dates, series, states, n_components, max_points=DEFAULT_MAX_POINTS):
+    """
+    Write one ticker's HMM/indicator chart (the same panels as analyze_and_plot) to `path`.
+
+    Each series is a single downsampled line and the hidden states are one scatter layer,
+    instead of one marker list per state plus an annotation per week. Only the latest,
+    highest and lowest prices are labelled.
+
+    :param series: Dict with 'Adj Close', 'MA_14', 'EMA_14', 'MACD_Line', 'Signal_Line', 'RSI_14' arrays.
+    :return: Seconds spent rendering and saving.
+    """
+    start = time.perf_counter()
+    import matplotlib.pyplot as plt
+    dates = np.asarray(dates, dtype='datetime64[ns]')
+    close = np.asarray(series['Adj Close'], dtype=np.float64)
+
+    fig, ax1 = plt.subplots(figsize=(15, 10))
+    stride = max(1, len(close) // max_points)
+    scatter = ax1.scatter(dates[::stride], close[::stride], c=np.asarray(states)[::stride], s=4,
+                          cmap='tab10', vmin=0, vmax=9, zorder=3)
+    handles = [plt.Line2D([], [], marker='o', linestyle='', color=scatter.cmap(scatter.norm(i)), label=f'State {i}')
+               for i in range(n_components)]
+
+    _line(ax1, dates, np.asarray(series['MA_14'], dtype=np.float64), max_points, label='14-Day MA', linestyle='--')
+    _line(ax1, dates, np.asarray(series['EMA_14'], dtype=np.float64), max_points, label='14-Day EMA', linestyle='-.')
+    _line(ax1, dates, np.asarray(series['MACD_Line'], dtype=np.float64), max_points, label='MACD Line', color='purple')
+    _line(ax1, dates, np.asarray(series['Signal_Line'], dtype=np.float64), max_points, label='Signal Line', color='orange')
+    _line(ax1, dates, close, max_points, label=f'{ticker} Price', alpha=0.5)
+
+    for index in {len(close) - 1, int(np.nanargmax(close)), int(np.nanargmin(close))}:
+        ax1.annotate(f"{close[index]:.2f}", (dates[index], close[index]),
+                     textcoords="offset points", xytext=(0, 5), ha='center')
+
+    ax1.set_xlabel("Date")
+    ax1.set_ylabel("Price")
+    ax1.set_title(f"{ticker} Price Analysis with HMM and Financial Indicators")
+
+    ax2 = ax1.twinx()
+    _line(ax2, dates, np.asarray(series['RSI_14'], dtype=np.float64), max_points, label='14-Day RSI', color='green')
+    ax2.set_ylabel("RSI")
+    ax2.set_ylim(0, 100)
+
+    line_handles, line_labels = ax1.get_legend_handles_labels()
+    ax1.legend(handles + line_handles, [h.get_label() for h in handles] + line_labels, loc="upper left")
+    ax2.legend(loc="upper right")
+
+    fig.savefig(path, dpi=DPI)
+    plt.close(fig)
+    return time.perf_counter() - start
+
+@stock_metrics.timed('charts.render_price_chart')
+def render_price_chart(path, ticker, dates, close, period, max_points=DEFAULT_MAX_POINTS):
+    """Write the plot_recent_performance chart for one ticker to `path`; return seconds spent."""
+    start = time.perf_counter()
+    import matplotlib.pyplot as plt
+    dates = np.asarray(dates, dtype='datetime64[ns]')
+    fig, ax = plt.subplots(figsize=(10, 6))
+    _line(ax, dates, np.asarray(close, dtype=np.float64), max_points, label=ticker)
+    ax.set_title(f"{ticker} Price History - Last {period}")
+    ax.set_xlabel("Date")
+    ax.set_ylabel("Price (USD)")
+    ax.legend()
+    fig.savefig(path, dpi=DPI)
+    plt.close(fig)
+    return time.perf_counter() - start
+
+def _render(job):
+    kind, ticker, path, kwargs = job
+    renderer = render_regime_chart if kind == 'regime' else render_price_chart
+    return ticker, path, renderer(path, ticker, **kwargs)
+
+def regime_chart_job(ticker, data, hidden_states, n_components, output_dir=DEFAULT_OUTPUT_DIR):
+    """Describe a regime chart from an indicator frame and its decoded states, for render_charts."""
+    columns = ['Adj Close', 'MA_14', 'EMA_14', 'MACD_Line', 'Signal_Line', 'RSI_14']
+    return ('regime', ticker, os.path.join(output_dir, f"{ticker}_regimes.png"), {
+        'dates': data.index.to_numpy(),
+        'series': {column: data[column].to_numpy() for column in columns},
+        'states': np.asarray(hidden_states),
+        'n_components': n_components,
+    })
+
+def price_chart_job(ticker, data, period, output_dir=DEFAULT_OUTPUT_DIR):
+    """Describe a recent-performance chart from an OHLCV frame, for render_charts."""
+    return ('price', ticker, os.path.join(output_dir, f"{ticker}_{period}.png"), {
+        'dates': data.index.to_numpy(),
+        'close': data['Close'].to_numpy(),
+        'period': period,
+    })
+
+@stock_metrics.timed('charts.render_charts')
+def render_charts(jobs, max_workers=None):
+    """
+    Render chart jobs to PNG files with the Agg backend in parallel worker processes.
+
+    :param jobs: List from regime_chart_job / price_chart_job.
+    :return: List of {'ticker', 'path', 'seconds'} (render time per chart), in job order.
+    """
+    jobs = list(jobs)
+    for _, _, path, _ in jobs:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    max_workers = min(max_workers or default_max_workers(), len(jobs) or 1)
+    if max_workers == 1:
+        _use_agg()
+        rendered = [_render(job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers, initializer=_use_agg) as executor:
+            rendered = list(executor.map(_render, jobs))
+    return [{'ticker': ticker, 'path': path, 'seconds': seconds} for ticker, path, seconds in rendered]
+
+def print_render_report(results, wall_seconds=None):
+    for result in results:
+        print(f"{result['ticker']:<8}{result['seconds']:>8.2f}s  {result['path']}")
+    total = sum(result['seconds'] for result in results)
+    summary = f"Rendered {len(results)} charts, {total:.2f}s of render time"
+    if wall_seconds is not None:
+        summary += f" in {wall_seconds:.2f}s wall time"
+    print(summary)
+
+if __name__ == "__main__":
+    # Render synthetic regime charts to compare against the interactive figure path
+    import stock_hmm_store
+    import stock_indicator_engine
+    import pandas as pd
+    data_by_ticker = stock_hmm_store.synthetic_regime_data(20)
+    frames = stock_indicator_engine.compute_indicator_frames(
+        pd.DataFrame({ticker: data['Adj Close'] for ticker, data in data_by_ticker.items()}))
+    rng = np.random.default_rng(0)
+    jobs = [regime_chart_job(ticker, frame, rng.integers(0, 2, len(frame)), 2, output_dir=os.path.join(DEFAULT_OUTPUT_DIR, 'benchmark'))
+            for ticker, frame in frames.items()]
+    start = time.perf_counter()
+    results = render_charts(jobs)
+    print_render_report(results, time.perf_counter() - start)
@@ -0,0 +1,179 @@
+import argparse
+import contextlib
+import sys
+import traceback
+
+import stock_jobs
+import stock_metrics
+
+def read_ticker_file(path):
+    """Tickers from a text file: comma- or whitespace-separated, '#' starts a comment."""
+    tickers = []
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            line = line.split('#', 1)[0]
+            tickers.extend(token.strip().upper() for token in line.replace(',', ' ').split() if token.strip())
+    return tickers
+
+def resolve_tickers(args, summary):
+    """Collect tickers from --tickers, --ticker-file and --sp500, without duplicates, in order."""
+    tickers = [ticker.upper() for ticker in args.tickers or []]
+    for path in args.ticker_file or []:
+        tickers.extend(read_ticker_file(path))
+    if args.sp500:
+        import stock_analyst_pricing
+        with summary.stage('universe'):
+            tickers.extend(stock_analyst_pricing.get_sp500_tickers())
+    tickers = list(dict.fromkeys(tickers))
+    summary.count('tickers_requested', len(tickers))
+    return tickers
+
+def validate(tickers, summary):
+    import stock_price_data
+    with summary.stage('validate', items=len(tickers)):
+        valid = stock_price_data.validate_tickers(tickers)
+    for ticker in tickers:
+        if ticker not in valid:
+            print(f"Ticker '{ticker}' is invalid and will be removed.")
+    summary.count('tickers_valid', len(valid))
+    return valid
+
+def _sentiment_results(results):
+    return [
+        {'ticker': ticker, 'from': from_date, 'to': to_date, 'consensus': consensus, 'avg_score': avg_score}
+        for (ticker, from_date, to_date), (consensus, avg_score) in sorted(results.items())
+    ]
+
+def _month_ranges(months):
+    """The last `months` completed calendar months as (first_day, last_day), most recent first."""
+    from datetime import date, timedelta
+    ranges = []
+    last_day = date.today().replace(day=1) - timedelta(days=1)
+    for _ in range(months):
+        first_day = last_day.replace(day=1)
+        ranges.append((first_day.strftime('%Y-%m-%d'), last_day.strftime('%Y-%m-%d')))
+        last_day = first_day - timedelta(days=1)
+    return ranges
+
+def _configure_dedup(args):
+    if args.no_dedup:
+        import stock_article_dedup
+        stock_article_dedup.set_deduplicator(None)
+
+def run_sentiment(args, summary):
+    import stock_sentiment
+    _configure_dedup(args)
+    tickers = validate(resolve_tickers(args, summary), summary)
+    results, company_names = stock_sentiment.run(
+        tickers, _month_ranges(args.months), fetch_workers=args.fetch_workers,
+        queue_size=args.queue_size, batch_articles=args.batch_articles, summary=summary)
+    stock_sentiment.print_results(results, company_names)
+    summary.results['windows'] = _sentiment_results(results)
+
+def run_gdelt(args, summary):
+    import stock_sentiment_GDELT
+    _configure_dedup(args)
+    tickers = validate(resolve_tickers(args, summary), summary)
+    results, company_names = stock_sentiment_GDELT.run(
+        tickers, _month_ranges(args.months), fetch_workers=args.fetch_workers,
+        queue_size=args.queue_size, batch_articles=args.batch_articles, summary=summary)
+    stock_sentiment_GDELT.print_results(results, company_names)
+    summary.results['windows'] = _sentiment_results(results)
+
+def run_regimes(args, summary):
+    import stock_hmm_analysis
+    tickers = validate(resolve_tickers(args, summary), summary)
+    current, statistics = stock_hmm_analysis.run(
+        tickers, start_date=args.start, end_date=args.end, headless=True,
+        chart_dir=None if args.no_charts else args.chart_dir, n_components=args.n_components, summary=summary)
+    summary.results['current_regimes'] = current.to_dict(orient='records')
+    summary.results['statistics'] = statistics.to_dict(orient='records')
+
+def run_screen(args, summary):
+    import stock_analyst_pricing
+    tickers = resolve_tickers(args, summary)
+    matches = stock_analyst_pricing.run(
+        tickers, upside_threshold=args.upside, min_market_cap=args.min_market_cap, max_pe=args.max_pe,
+        chart_period=args.chart_period, chart_dir=args.chart_dir, max_workers=args.max_workers, summary=summary)
+    summary.results['matches'] = matches.to_dict(orient='records')
+
+def build_parser():
+    import stock_charts
+    import stock_screener
+
+    parser = argparse.ArgumentParser(description="Batch runs of the sentiment, regime and screening jobs.")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    universe = argparse.ArgumentParser(add_help=False)
+    universe.add_argument('--tickers', nargs='+', metavar='TICKER', help="Ticker symbols.")
+    universe.add_argument('--ticker-file', action='append', metavar='PATH',
+                          help="File of tickers (comma/whitespace separated, '#' comments); repeatable.")
+    universe.add_argument('--sp500', action='store_true', help="Add the current S&P 500 constituents.")
+    universe.add_argument('--summary', metavar='PATH', default='-', help="Write the JSON run summary here (default: print it).")
+    universe.add_argument('--metrics', metavar='PATH', default=None,
+                          help="Time the hot paths and write the timers here (.prom/.txt: Prometheus text, else JSON).")
+    universe.add_argument('--profile', metavar='PATH', default=None,
+                          help="cProfile the run and dump pstats here (for snakeviz/flameprof).")
+
+    news = argparse.ArgumentParser(add_help=False)
+    news.add_argument('--months', type=int, default=6, help="Completed months to score, most recent first (default 6).")
+    news.add_argument('--fetch-workers', type=int, default=stock_jobs.DEFAULT_FETCH_WORKERS,
+                      help="Fetcher threads (default %(default)s).")
+    news.add_argument('--queue-size', type=int, default=stock_jobs.DEFAULT_QUEUE_SIZE,
+                      help="Fetched windows that may wait for the model (default %(default)s).")
+    news.add_argument('--no-dedup', action='store_true',
+                      help="Score every syndicated copy instead of each story once.")
+    news.add_argument('--batch-articles', type=int, default=stock_jobs.DEFAULT_BATCH_ARTICLES,
+                      help="Articles gathered per scoring call (default %(default)s).")
+
+    subparsers.add_parser('sentiment', parents=[universe, news], help="NewsAPI sentiment per ticker and month.")
+    subparsers.add_parser('gdelt', parents=[universe, news], help="GDELT sentiment per ticker and month.")
+
+    regimes = subparsers.add_parser('regimes', parents=[universe], help="Refit HMMs and report current regimes.")
+    regimes.add_argument('--start', default="2018-01-01", help="First price date (default %(default)s).")
+    regimes.add_argument('--end', default=None, help="End date (default today).")
+    regimes.add_argument('--n-components', type=int, default=2, help="Hidden states (default %(default)s).")
+    regimes.add_argument('--chart-dir', default=stock_charts.DEFAULT_OUTPUT_DIR, help="Directory for regime charts.")
+    regimes.add_argument('--no-charts', action='store_true', help="Skip rendering charts.")
+
+    screen = subparsers.add_parser('screen', parents=[universe], help="Screen by analyst target upside.")
+    screen.add_argument('--upside', type=float, default=20, help="Minimum %% upside to the mean target (default %(default)s).")
+    screen.add_argument('--min-market-cap', type=float, default=None, help="Minimum market cap, e.g. 1e9.")
+    screen.add_argument('--max-pe', type=float, default=None, help="Maximum trailing P/E.")
+    screen.add_argument('--max-workers', type=int, default=stock_screener.DEFAULT_MAX_WORKERS,
+                        help="Fundamentals lookups in flight (default %(default)s).")
+    screen.add_argument('--chart-period', default=None, help="Chart matches over this period, e.g. 6mo.")
+    screen.add_argument('--chart-dir', default=stock_charts.DEFAULT_OUTPUT_DIR, help="Directory for the charts.")
+    return parser
+
+COMMANDS = {'sentiment': run_sentiment, 'gdelt': run_gdelt, 'regimes': run_regimes, 'screen': run_screen}
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if not (args.tickers or args.ticker_file or args.sp500):
+        print("No tickers given: use --tickers, --ticker-file or --sp500.")
+        return 2
+
+    options = {key: value for key, value in vars(args).items() if key not in ('command', 'summary', 'metrics', 'profile')}
+    summary = stock_jobs.RunSummary(command=args.command, options=options)
+    if args.metrics:
+        stock_metrics.reset()
+        stock_metrics.enable()
+    profiler = stock_metrics.profile(args.profile) if args.profile else contextlib.nullcontext()
+    status = 0
+    try:
+        with profiler:
+            COMMANDS[args.command](args, summary)
+        summary.finish()
+    except Exception as e:
+        traceback.print_exc()
+        summary.finish('error', f"{type(e).__name__}: {e}")
+        status = 1
+    if args.metrics:
+        summary.metrics = stock_metrics.snapshot()
+        stock_metrics.write(args.metrics, summary.metrics)
+    summary.write(args.summary)
+    return status
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,205 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import stock_metrics
+
+# Constants
+DEFAULT_STORE_PATH = os.path.join('.cache', 'fundamentals.sqlite')
+DEFAULT_MAX_WORKERS = 16
+HOUR = 60 * 60
+DAY = 24 * HOUR
+
+# Fields kept from yf.Ticker(...).info and how long each stays fresh (seconds)
+FIELD_TTLS = {
+    'longName': 90 * DAY,
+    'sector': 30 * DAY,
+    'industry': 30 * DAY,
+    'marketCap': DAY,
+    'trailingPE': DAY,
+    'currentPrice': HOUR,
+    'targetMeanPrice': DAY,
+    'targetHighPrice': DAY,
+    'targetLowPrice': DAY,
+    'numberOfAnalystOpinions': DAY,
+}
+
+def _fetch_info(ticker):
+    import yfinance as yf
+    try:
+        with stock_metrics.timer('yfinance.info', items=1):
+            return yf.Ticker(ticker).info or {}
+    except Exception as e:
+        print(f"Error fetching info for {ticker}: {e}")
+        return None
+
+class FundamentalsStore:
+    """
+    Local store of fundamentals snapshots taken from yf.Ticker(...).info.
+
+    Current values carry a fetch time and are refreshed once one of the fields a caller
+    asks for is older than its TTL, so asking only for `longName` never refetches because
+    the hourly `currentPrice` aged out; one .info call refreshes every field of a ticker. Every refresh is also written
+    to a per-day snapshot history, so screens can be replayed against past data with
+    `as_of`. With `offline=True` nothing is fetched and only stored values are served.
+    """
+
+    def __init__(self, path=DEFAULT_STORE_PATH, field_ttls=None, offline=False):
+        self.path = path
+        self.field_ttls = field_ttls or FIELD_TTLS
+        self.offline = offline
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS fundamentals ("
+            " ticker TEXT NOT NULL,"
+            " field TEXT NOT NULL,"
+            " value TEXT,"
+            " fetched_at REAL NOT NULL,"
+            " PRIMARY KEY (ticker, field))"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS snapshots ("
+            " ticker TEXT NOT NULL,"
+            " snapshot_date TEXT NOT NULL,"
+            " field TEXT NOT NULL,"
+            " value TEXT,"
+            " PRIMARY KEY (ticker, snapshot_date, field))"
+        )
+        self._conn.commit()
+
+    def _stored(self, tickers):
+        """Return {ticker: {field: (value, fetched_at)}} for the stored current values."""
+        stored = {ticker: {} for ticker in tickers}
+        with self._lock:
+            for start in range(0, len(tickers), 500):
+                chunk = tickers[start:start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT ticker, field, value, fetched_at FROM fundamentals WHERE ticker IN ({placeholders})",
+                    chunk,
+                ).fetchall()
+                for ticker, field, value, fetched_at in rows:
+                    stored[ticker][field] = (json.loads(value), fetched_at)
+        return stored
+
+    def _is_stale(self, stored, now, fields):
+        for field in fields:
+            if field not in stored or now - stored[field][1] > self.field_ttls[field]:
+                return True
+        return False
+
+    def _write(self, ticker, info, now):
+        today = datetime.fromtimestamp(now).strftime('%Y-%m-%d')
+        values = [(ticker, field, json.dumps(info.get(field))) for field in self.field_ttls]
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO fundamentals (ticker, field, value, fetched_at) VALUES (?, ?, ?, ?)",
+                [(t, f, v, now) for t, f, v in values],
+            )
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO snapshots (ticker, snapshot_date, field, value) VALUES (?, ?, ?, ?)",
+                [(t, today, f, v) for t, f, v in values],
+            )
+            self._conn.commit()
+
+    def refresh(self, tickers, max_workers=DEFAULT_MAX_WORKERS):
+        """Fetch .info for the tickers in parallel and store every tracked field."""
+        tickers = list(tickers)
+        if not tickers or self.offline:
+            return
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            for ticker, info in zip(tickers, executor.map(_fetch_info, tickers)):
+                if info is not None:
+                    self._write(ticker, info, time.time())
+
+    def get_many(self, tickers, max_workers=DEFAULT_MAX_WORKERS, as_of=None, fields=None):
+        """
+        Return {ticker: {field: value}} for the tickers.
+
+        Tickers missing any of the requested fields, or holding one past its TTL, are
+        refreshed first in one parallel bulk refresh. With `as_of` ('YYYY-MM-DD') the
+        values come from the latest snapshot on or before that date and nothing is fetched.
+
+        :param fields: Fields to return (default: every tracked field). Only their TTLs
+                       decide whether a ticker is refetched.
+        """
+        tickers = list(dict.fromkeys(tickers))
+        fields = list(fields) if fields is not None else list(self.field_ttls)
+        if as_of is not None:
+            return {ticker: {field: value for field, value in self.snapshot(ticker, as_of).items() if field in fields}
+                    for ticker in tickers}
+
+        now = time.time()
+        stored = self._stored(tickers)
+        stale = [ticker for ticker in tickers if self._is_stale(stored[ticker], now, fields)]
+        if stale and not self.offline:
+            self.refresh(stale, max_workers=max_workers)
+            stored.update(self._stored(stale))
+        return {
+            ticker: {field: value for field, (value, _) in stored[ticker].items() if field in fields and value is not None}
+            for ticker in tickers
+        }
+
+    def get(self, ticker, fields=None):
+        """Return the current fields for one ticker, refreshing them if any requested one is stale."""
+        return self.get_many([ticker], fields=fields)[ticker]
+
+    def snapshot(self, ticker, as_of):
+        """Return the fields for a ticker as of the latest snapshot on or before `as_of`."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT field, value FROM snapshots s WHERE ticker = ? AND snapshot_date = ("
+                " SELECT MAX(snapshot_date) FROM snapshots WHERE ticker = s.ticker AND field = s.field"
+                " AND snapshot_date <= ?)",
+                (ticker, as_of),
+            ).fetchall()
+        fields = {field: json.loads(value) for field, value in rows}
+        return {field: value for field, value in fields.items() if value is not None}
+
+    def snapshot_dates(self, ticker=None):
+        """Return the dates that have snapshots (for one ticker or any)."""
+        with self._lock:
+            if ticker is None:
+                rows = self._conn.execute("SELECT DISTINCT snapshot_date FROM snapshots ORDER BY 1").fetchall()
+            else:
+                rows = self._conn.execute(
+                    "SELECT DISTINCT snapshot_date FROM snapshots WHERE ticker = ? ORDER BY 1", (ticker,)
+                ).fetchall()
+        return [row[0] for row in rows]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+# Shared store used by the screeners and sentiment modules
+_store = None
+
+def get_store():
+    """Return the shared fundamentals store, creating it on first use."""
+    global _store
+    if _store is None:
+        _store = FundamentalsStore()
+    return _store
+
+def set_store(store):
+    """Replace the shared store (e.g. with an offline store or one at another path)."""
+    global _store
+    _store = store
+    return _store
+
+if __name__ == "__main__":
+    # Take today's snapshot of the S&P 500 (e.g. from a daily cron job)
+    from stock_analyst_pricing import get_sp500_tickers
+    sp500_list = get_sp500_tickers()
+    get_store().refresh(sp500_list)
+    print(f"Stored fundamentals snapshot for {len(sp500_list)} tickers in {DEFAULT_STORE_PATH}")
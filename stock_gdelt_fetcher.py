@@ -0,0 +1,133 @@
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import stock_metrics
+
+# Constants
+GDELT_BASE_URL = 'https://api.gdeltproject.org/api/v2/doc/doc'
+GDELT_REQUESTS_PER_SECOND = 0.2  # GDELT asks for no more than one request every 5 seconds
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+class TokenBucket:
+    """Thread-safe token bucket: `rate` tokens per second, holding at most `capacity`."""
+
+    def __init__(self, rate, capacity=1):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a token is available, then take it."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+def build_params(query, from_date, to_date, num_articles=100):
+    """Build GDELT ArtList query parameters for a YYYY-MM-DD date window."""
+    return {
+        'query': query,
+        'mode': 'ArtList',
+        'startdatetime': from_date.replace("-", "") + "000000",
+        'enddatetime': to_date.replace("-", "") + "235959",
+        'maxrecords': num_articles,
+        'format': 'json',
+        'sourcelang': 'English',
+    }
+
+class GDELTFetcher:
+    """
+    Concurrent GDELT Document API client.
+
+    All requests share one pooled HTTP session and one token-bucket rate limiter;
+    429 and 5xx responses (and connection errors) are retried with exponential backoff.
+    Point `base_url` at a local stub server to exercise it offline.
+    """
+
+    def __init__(self, base_url=GDELT_BASE_URL, max_workers=4,
+                 requests_per_second=GDELT_REQUESTS_PER_SECOND, burst=1,
+                 max_retries=5, backoff=2.0, max_backoff=60.0, timeout=30):
+        self.base_url = base_url
+        self.max_workers = max_workers
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.timeout = timeout
+        self.rate_limiter = TokenBucket(requests_per_second, burst)
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_workers)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def _retry_delay(self, attempt, response=None):
+        # Honour Retry-After when the server sends it (up to max_backoff, so one header cannot
+        # park a fetcher thread for an hour), otherwise back off exponentially with jitter
+        if response is not None and response.headers.get('Retry-After', '').isdigit():
+            return min(self.max_backoff, float(response.headers['Retry-After']))
+        delay = min(self.max_backoff, self.backoff * (2 ** attempt))
+        return delay * (0.5 + random.random() / 2)
+
+    def get(self, params):
+        """Issue one rate-limited request with retries; return the decoded JSON or None on failure."""
+        for attempt in range(self.max_retries + 1):
+            self.rate_limiter.acquire()
+            try:
+                with stock_metrics.timer('gdelt.http_request'):
+                    response = self.session.get(self.base_url, params=params, timeout=self.timeout)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                stock_metrics.count('gdelt.connection_errors')
+                if attempt == self.max_retries:
+                    print(f"Failed to fetch data for {params.get('query')}: {e}")
+                    return None
+                time.sleep(self._retry_delay(attempt))
+                continue
+
+            if response.status_code in RETRY_STATUS_CODES and attempt < self.max_retries:
+                stock_metrics.count('gdelt.retries')
+                time.sleep(self._retry_delay(attempt, response))
+                continue
+
+            if response.status_code != 200:
+                print(f"Failed to fetch data for {params.get('query')} from {params.get('startdatetime')} "
+                      f"to {params.get('enddatetime')}. Status Code: {response.status_code}")
+                return None
+
+            try:
+                return response.json()
+            except requests.exceptions.JSONDecodeError:
+                print("Response content is not in JSON format. Here is the response content:")
+                print(response.text)
+                return None
+        return None
+
+    def fetch_windows(self, windows, num_articles=100):
+        """
+        Fetch many (query, from_date, to_date) windows concurrently.
+
+        Yields (window, data) pairs as each request completes, where data is the
+        decoded JSON response or None if the window could not be fetched.
+        """
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {
+                executor.submit(self.get, build_params(query, from_date, to_date, num_articles)): (query, from_date, to_date)
+                for query, from_date, to_date in windows
+            }
+            for future in as_completed(futures):
+                yield futures[future], future.result()
+
+    def close(self):
+        self.session.close()
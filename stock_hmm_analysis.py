@@ -1,19 +1,40 @@
 import numpy as np
 import os
 import pandas as pd
-import yfinance as yf
-from hmmlearn.hmm import GaussianHMM
-import matplotlib.pyplot as plt
 import datetime
+import sys
+import time
+import stock_charts
+import stock_hmm_features
+import stock_hmm_store
+import stock_regime_tracker
+import stock_indicator_engine
+import stock_metrics
+import stock_price_data
+
+# HMM inputs: None fits on raw returns; a list of indicator columns (e.g.
+# stock_hmm_features.DEFAULT_FEATURES) fits on that standardized multi-feature matrix
+HMM_FEATURES = None
+HMM_COVARIANCE_TYPE = "diag"
 
 # Download stock price data
+@stock_metrics.timed('hmm.get_stock_data')
 def get_stock_data(ticker, start_date, end_date):
-    stock_data = yf.download(ticker, start=start_date, end=end_date)
-    stock_data = stock_data[['Adj Close']]
+    prices = stock_price_data.get_prices([ticker], start=start_date, end=end_date)
+    if ticker not in prices:
+        return pd.DataFrame(columns=['Adj Close', 'Returns'])
+    stock_data = prices[ticker][['Adj Close']].copy()
     stock_data['Returns'] = stock_data['Adj Close'].pct_change()
     stock_data.dropna(inplace=True)  # Drop any NaN values
     return stock_data
 
+# Download many tickers and compute all indicators for them in one vectorized pass
+@stock_metrics.timed('hmm.get_stock_data_with_indicators')
+def get_stock_data_with_indicators(tickers, start_date, end_date):
+    prices = stock_price_data.get_prices(tickers, start=start_date, end=end_date)
+    adj_close = pd.DataFrame({ticker: prices[ticker]['Adj Close'] for ticker in tickers if ticker in prices})
+    return stock_indicator_engine.compute_indicator_frames(adj_close)
+
 # Financial Indicators
 def calculate_moving_average(data, window=14):
     return data['Adj Close'].rolling(window=window).mean()
@@ -43,14 +64,21 @@ def calculate_volatility(data, window=30):
     return data['Returns'].rolling(window=window).std() * np.sqrt(window)
 
 # Prepare the HMM model
-def train_hmm(data, n_components=2):
-    model = GaussianHMM(n_components=n_components, covariance_type="diag", n_iter=1000)
-    model.fit(data[['Returns']])
+@stock_metrics.timed('hmm.train_hmm')
+def train_hmm(data, n_components=2, features=None, covariance_type="diag"):
+    from hmmlearn.hmm import GaussianHMM  # Deferred so validate_tickers callers skip hmmlearn
+    model = GaussianHMM(n_components=n_components, covariance_type=covariance_type, n_iter=1000)
+    if features is None:
+        model.fit(data[['Returns']])
+    else:
+        observations, _, _ = stock_hmm_features.build_feature_matrix(data, features)
+        model.fit(observations)
     return model
 
 # Predict states and visualize
-def analyze_and_plot(data, model, ticker, ax1):
-    hidden_states = model.predict(data[['Returns']])
+@stock_metrics.timed('hmm.analyze_and_plot')
+def analyze_and_plot(data, model, ticker, ax1, observations=None):
+    hidden_states = model.predict(data[['Returns']] if observations is None else observations)
 
     # Plot each hidden state on the main y-axis
     for i in range(model.n_components):
@@ -87,43 +115,195 @@ def analyze_and_plot(data, model, ticker, ax1):
     # Add legends for both axes
     ax1.legend(loc="upper left")
     ax2.legend(loc="upper right")
+    return hidden_states
+
+# Per-state statistics for many tickers in one grouped pass
+def regime_statistics(states_by_ticker, volatility_threshold=0.01):
+    """
+    Summarize HMM regimes for every ticker at once.
+
+    :param states_by_ticker: Dict of ticker -> (returns, hidden_states), equal-length sequences in time order.
+    :param volatility_threshold: Std of returns above which a state is labelled 'High' volatility.
+    :return: Tidy DataFrame with one row per (ticker, state): n_bars, time_share, mean_return,
+             std_return, n_runs, mean_dwell (average consecutive bars per visit), to_<j>
+             (share of the state's transitions that go to state j), direction and volatility labels.
+    """
+    tickers = list(states_by_ticker)
+    lengths = [len(states_by_ticker[ticker][1]) for ticker in tickers]
+    ticker_codes = np.repeat(np.arange(len(tickers)), lengths)
+    states = np.concatenate([np.asarray(states_by_ticker[ticker][1]) for ticker in tickers])
+    # Group on integer ticker codes; names are attached at the end
+    long = pd.DataFrame({
+        'ticker': ticker_codes,
+        'state': states,
+        'Returns': np.concatenate([np.asarray(states_by_ticker[ticker][0], dtype=np.float64) for ticker in tickers]),
+    })
+
+    # A new run (visit to a state) starts wherever the ticker or the state changes
+    starts = np.ones(len(long), dtype=bool)
+    starts[1:] = (ticker_codes[1:] != ticker_codes[:-1]) | (states[1:] != states[:-1])
+
+    grouped = long.groupby(['ticker', 'state'])
+    stats = grouped['Returns'].agg(n_bars='size', mean_return='mean', std_return='std')
+    stats['n_runs'] = long[starts].groupby(['ticker', 'state']).size()
+    stats['mean_dwell'] = stats['n_bars'] / stats['n_runs']
+    stats['time_share'] = stats['n_bars'] / stats.groupby(level='ticker')['n_bars'].transform('sum')
+
+    # Transitions between consecutive bars of the same ticker, as shares of each origin state
+    same_ticker = ticker_codes[1:] == ticker_codes[:-1]
+    transitions = pd.DataFrame({
+        'ticker': ticker_codes[1:][same_ticker],
+        'state': states[:-1][same_ticker],
+        'to': states[1:][same_ticker],
+    })
+    counts = transitions.groupby(['ticker', 'state', 'to']).size().unstack('to', fill_value=0)
+    shares = counts.div(counts.sum(axis=1), axis=0).add_prefix('to_')
+    stats = stats.join(shares).fillna({column: 0.0 for column in shares.columns})
+
+    stats['direction'] = np.where(stats['mean_return'] > 0, 'Bullish', 'Bearish')
+    stats['volatility'] = np.where(stats['std_return'] > volatility_threshold, 'High', 'Low')
+    columns = ['n_bars', 'time_share', 'mean_return', 'std_return', 'n_runs', 'mean_dwell',
+               *shares.columns, 'direction', 'volatility']
+    stats = stats[columns].reset_index()
+    stats['ticker'] = np.asarray(tickers, dtype=object)[stats['ticker'].to_numpy()]
+    return stats
 
 # Function to interpret HMM states based on average returns and volatility
-def interpret_states(data, hidden_states):
-    for i in range(len(np.unique(hidden_states))):
-        state_data = data[hidden_states == i]
-        avg_return = state_data['Returns'].mean()
-        volatility = state_data['Returns'].std()
-        print(f"State {i}:")
-        print(f"  Average Return: {avg_return}")
-        print(f"  Volatility: {volatility}")
-        print(f"  {'Bullish' if avg_return > 0 else 'Bearish'} State with {'High' if volatility > 0.01 else 'Low'} Volatility")
-
-# Function to save stock data to CSV
-def save_data_to_csv(data, ticker, start_date, end_date):
-    os.makedirs(ticker, exist_ok=True)
-    csv_file_path = os.path.join(ticker, f"{ticker}_{start_date}_to_{end_date}.csv")
-    data.to_csv(csv_file_path)
-    print(f"Data saved to {csv_file_path}")
+def interpret_states(data, hidden_states, volatility_threshold=0.01):
+    stats = regime_statistics({'': (data['Returns'], hidden_states)}, volatility_threshold)
+    for row in stats.itertuples():
+        print(f"State {row.state}:")
+        print(f"  Average Return: {row.mean_return}")
+        print(f"  Volatility: {row.std_return}")
+        print(f"  {row.direction} State with {row.volatility} Volatility")
+    return stats
+
+# Function to save stock data to a per-ticker Parquet file (overwritten with the full history each run)
+def save_data_to_parquet(data, ticker, root=os.path.join('data', 'indicators')):
+    os.makedirs(root, exist_ok=True)
+    parquet_file_path = os.path.join(root, f"{ticker}.parquet")
+    data.to_parquet(parquet_file_path)
+    print(f"Data saved to {parquet_file_path}")
+    return parquet_file_path
 
 def validate_tickers(ticker_list):
-    valid_tickers = []
+    # One batched request for the whole list instead of a day of data per ticker
+    try:
+        valid_tickers = stock_price_data.validate_tickers(ticker_list)
+    except Exception as e:
+        print(f"Could not validate tickers {ticker_list}. Error: {e}")
+        return []
     for ticker in ticker_list:
-        try:
-            data = yf.download(ticker, period="1d")
-            if not data.empty:
-                valid_tickers.append(ticker)
-            else:
-                print(f"Ticker '{ticker}' is invalid and will be removed.")
-        except Exception as e:
-            print(f"Ticker '{ticker}' is invalid and will be removed. Error: {e}")
+        if ticker not in valid_tickers:
+            print(f"Ticker '{ticker}' is invalid and will be removed.")
     return valid_tickers
 
-def main():
-    # Set the start and end dates
-    start_date = "2018-01-01"
-    end_date = datetime.datetime.today().strftime('%Y-%m-%d')
-    
+def run(tickers, start_date="2018-01-01", end_date=None, headless=True, chart_dir=stock_charts.DEFAULT_OUTPUT_DIR,
+        n_components=2, summary=None):
+    """
+    Fit or refit each ticker's HMM, track its current regime and chart it.
+
+    With headless=True no window is opened: each ticker's chart is rendered to
+    <chart_dir>/<ticker>_regimes.png by parallel Agg worker processes (chart_dir=None skips
+    the charts). Otherwise the charts are shown in one interactive figure.
+
+    :param tickers: Already validated ticker symbols.
+    :return: (current_regimes, statistics) DataFrames.
+    """
+    import stock_jobs
+    summary = summary or stock_jobs.RunSummary()
+    end_date = end_date or datetime.datetime.today().strftime('%Y-%m-%d')
+
+    # Load stock data and calculate financial indicators for every ticker at once
+    with summary.stage('prices', items=len(tickers)):
+        all_stock_data = get_stock_data_with_indicators(tickers, start_date, end_date)
+    tickers = [ticker for ticker in tickers if ticker in all_stock_data]
+
+    # HMM inputs: raw returns, or standardized indicator features with warm-up rows trimmed
+    with summary.stage('features', items=len(tickers)):
+        if HMM_FEATURES is None:
+            hmm_inputs, hmm_features, scalings = all_stock_data, ['Returns'], None
+        else:
+            # Reuse the scaling stored with each ticker's model, so its warm refit and tracker
+            # see features in the scale its means and covariances were fit in
+            hmm_features = list(HMM_FEATURES)
+            stored = stock_hmm_store.stored_scalings(tickers, n_components, hmm_features, HMM_COVARIANCE_TYPE)
+            hmm_inputs, scalings = stock_hmm_features.build_feature_frames(all_stock_data, HMM_FEATURES, scalings=stored)
+
+    # Refit each ticker's stored HMM from its previous parameters (cold fits in a process pool the first time)
+    with summary.stage('fit', items=len(tickers)):
+        hmm_results = stock_hmm_store.refit_models(hmm_inputs, n_components=n_components, features=hmm_features,
+                                                   covariance_type=HMM_COVARIANCE_TYPE, scalings=scalings)
+    stock_hmm_store.print_refits(hmm_results)
+    # A failed fit drops its ticker instead of ending the run
+    summary.count('fits_failed', len(tickers) - len(hmm_results))
+    tickers = [ticker for ticker in tickers if ticker in hmm_results]
+    if not tickers:
+        print("No tickers left to analyze.")
+        return pd.DataFrame(), pd.DataFrame()
+
+    # Filter each ticker's history forward once to get its current regime and probability
+    with summary.stage('track', items=len(tickers)):
+        trackers = stock_regime_tracker.track({t: model for t, (model, _) in hmm_results.items()}, hmm_inputs,
+                                              features=hmm_features)
+        current = stock_regime_tracker.current_regimes(trackers)
+    print(current.to_string(index=False))
+
+    if not headless:
+        import matplotlib.pyplot as plt  # Deferred so importing this module stays light
+        # One subplot per ticker that made it through the price and fit stages
+        fig, axes = plt.subplots(len(tickers), 1, figsize=(15, 10 * len(tickers)), squeeze=False)
+        fig.subplots_adjust(hspace=0.4)
+
+    # Perform analysis for each stock
+    states_by_ticker = {}
+    chart_jobs = []
+    with summary.stage('decode', items=len(tickers)):
+        for idx, ticker in enumerate(tickers):
+            print(f"\nAnalyzing {ticker}...\n")
+
+            stock_data = all_stock_data[ticker]
+            observations = hmm_inputs[ticker][hmm_features]
+            plot_data = stock_data.loc[observations.index]  # Same bars the model saw
+
+            # Latest model version for this ticker
+            hmm_model = hmm_results[ticker][0]
+
+            if headless:
+                # Decode now, render later in worker processes
+                hidden_states = hmm_model.predict(observations)
+                if chart_dir is not None:
+                    chart_jobs.append(stock_charts.regime_chart_job(ticker, plot_data, hidden_states,
+                                                                    hmm_model.n_components, chart_dir))
+            else:
+                # Analyze and plot in the specified subplot
+                ax1 = axes[idx, 0]
+                hidden_states = analyze_and_plot(plot_data, hmm_model, ticker, ax1, observations)
+            states_by_ticker[ticker] = (plot_data['Returns'], hidden_states)
+
+            # Save stock data with indicators
+            save_data_to_parquet(stock_data, ticker)
+
+    # Regime statistics for every ticker in one pass
+    with summary.stage('statistics', items=len(tickers)):
+        statistics = regime_statistics(states_by_ticker)
+    print(statistics.to_string(index=False))
+
+    if headless:
+        if chart_jobs:
+            with summary.stage('charts', items=len(chart_jobs)):
+                start = time.perf_counter()
+                results = stock_charts.render_charts(chart_jobs)
+                stock_charts.print_render_report(results, time.perf_counter() - start)
+    else:
+        plt.show()
+    return current, statistics
+
+def main(headless=False, chart_dir=stock_charts.DEFAULT_OUTPUT_DIR):
+    """
+    Interactive analysis. With headless=True no window is opened: each ticker's chart is
+    rendered to <chart_dir>/<ticker>_regimes.png by parallel Agg worker processes.
+    """
     pre_tickers = []
     ticker = input("Enter the stock tickers you'd like to see analyzed (-1 to quit): ").upper()
     while ticker != "-1":
@@ -132,37 +312,7 @@ def main():
     # List of stocks to analyze
     tickers = validate_tickers(pre_tickers)
 
-    # Set up the figure and subplots
-    fig, axes = plt.subplots(len(tickers), 1, figsize=(15, 10 * len(tickers)))  # Increase height for multiple subplots
-    fig.subplots_adjust(hspace=0.4)
-
-    # Perform analysis for each stock
-    for idx, ticker in enumerate(tickers):
-        print(f"\nAnalyzing {ticker}...\n")
-        
-        # Load stock data
-        stock_data = get_stock_data(ticker, start_date, end_date)
-        
-        # Calculate additional financial indicators
-        stock_data['MA_14'] = calculate_moving_average(stock_data, window=14)
-        stock_data['EMA_14'] = calculate_exponential_moving_average(stock_data, window=14)
-        stock_data['RSI_14'] = calculate_rsi(stock_data, window=14)
-        macd_line, signal_line, _ = calculate_macd(stock_data)
-        stock_data['MACD_Line'] = macd_line
-        stock_data['Signal_Line'] = signal_line
-        stock_data['Volatility_30'] = calculate_volatility(stock_data, window=30)
-
-        # Train the HMM model
-        hmm_model = train_hmm(stock_data)
-
-        # Analyze and plot in the specified subplot
-        ax1 = axes[idx] if len(tickers) > 1 else axes  # Handle single or multiple subplots
-        analyze_and_plot(stock_data, hmm_model, ticker, ax1)
-
-        # Save stock data with indicators to CSV
-        save_data_to_csv(stock_data, ticker, start_date, end_date)
-
-    plt.show()
+    run(tickers, headless=headless, chart_dir=chart_dir)
 
 if __name__ == "__main__":
-    main()
+    main(headless='--headless' in sys.argv[1:])
@@ -0,0 +1,121 @@
+import time
+
+import numpy as np
+import pandas as pd
+
+# Constants
+SENTIMENT_FEATURE = 'Sentiment'
+DEFAULT_FEATURES = ['Returns', 'Volatility_30', 'RSI_14', 'MACD_Histogram']
+
+def monthly_sentiment(tickers, store=None):
+    """
+    Return {ticker: Series of mean article sentiment score indexed by 'YYYY-MM'} from the
+    article store (months without scored articles are absent).
+    """
+    import stock_article_store
+    store = store or stock_article_store.ArticleStore()
+    articles = store.read(tickers=list(tickers), columns=['ticker', 'month', 'sentiment_score'])
+    articles = articles.dropna(subset=['sentiment_score'])
+    means = articles.groupby(['ticker', 'month'])['sentiment_score'].mean()
+    return {ticker: means.xs(ticker) for ticker in means.index.get_level_values('ticker').unique()}
+
+def _sentiment_column(index, sentiment, lag_months=1):
+    """
+    Map a monthly sentiment Series onto daily bars. Each bar gets the score of the month
+    `lag_months` before it (a month's score is only known once the month is over);
+    months without a score count as neutral (0).
+    """
+    months = (index.to_period('M') - lag_months).strftime('%Y-%m')
+    return pd.Series(months, index=index).map(sentiment).fillna(0.0).astype(np.float64)
+
+def build_feature_frame(data, features=None, sentiment=None, scaling=None, sentiment_lag_months=1):
+    """
+    Build the standardized HMM feature frame for one ticker.
+
+    :param data: Indicator frame as produced by get_stock_data_with_indicators.
+    :param features: Indicator columns to use (default: returns, volatility, RSI, MACD histogram).
+    :param sentiment: Optional monthly sentiment Series ('YYYY-MM' -> score), added as 'Sentiment'.
+    :param scaling: Optional {'mean', 'std'} from an earlier call, so new bars are scaled like
+                    the training data; by default the frame's own mean/std are used.
+    :return: (frame, scaling). The frame holds only rows where every feature is present (the
+             indicator warm-up rows are trimmed) and is float64 with zero mean / unit variance.
+    """
+    features = list(features or DEFAULT_FEATURES)
+    frame = data[features].astype(np.float64)
+    if sentiment is not None:
+        frame[SENTIMENT_FEATURE] = _sentiment_column(frame.index, sentiment, sentiment_lag_months)
+    frame = frame.dropna()
+
+    if scaling is None:
+        std = frame.std(ddof=0).replace(0.0, 1.0)  # A constant column (e.g. no sentiment yet) stays at 0
+        scaling = {'mean': frame.mean(), 'std': std}
+    frame = (frame - scaling['mean']) / scaling['std']
+    return frame, scaling
+
+def build_feature_matrix(data, features=None, sentiment=None, scaling=None):
+    """Like build_feature_frame, but return (contiguous float64 array, index, scaling)."""
+    frame, scaling = build_feature_frame(data, features, sentiment, scaling)
+    return np.ascontiguousarray(frame.to_numpy(dtype=np.float64)), frame.index, scaling
+
+def build_feature_frames(data_by_ticker, features=None, sentiment_by_ticker=None, scalings=None):
+    """
+    Build feature frames for many tickers, ready for stock_hmm_training.train_models or
+    stock_hmm_store.refit_models (pass `features=list(frame.columns)` and the scalings).
+
+    :param scalings: Optional dict of ticker -> scaling to reuse, e.g. the one stored with
+                     the ticker's model (stock_hmm_store.stored_scalings), so warm refits and
+                     tracking see features in the scale the model was fit in. Other tickers
+                     are scaled by their own mean/std.
+    :return: (frames, scalings): dicts of ticker -> standardized feature frame and the
+             scaling used for it.
+    """
+    frames, used = {}, {}
+    for ticker, data in data_by_ticker.items():
+        sentiment = None
+        if sentiment_by_ticker is not None:
+            sentiment = sentiment_by_ticker.get(ticker, pd.Series(dtype=np.float64))
+        frames[ticker], used[ticker] = build_feature_frame(data, features, sentiment, (scalings or {}).get(ticker))
+    return frames, used
+
+def scaling_to_dict(scaling):
+    """JSON-friendly form of a scaling ({'mean': {column: value}, 'std': {column: value}})."""
+    return {key: {column: float(value) for column, value in scaling[key].items()} for key in ('mean', 'std')}
+
+def scaling_from_dict(stored):
+    """Inverse of scaling_to_dict."""
+    return {key: pd.Series(stored[key], dtype=np.float64) for key in ('mean', 'std')}
+
+def benchmark_feature_counts(n_bars=5000, n_components=2, covariance_types=('diag', 'full'), n_iter=50, repeats=3):
+    """
+    Time a fixed number of EM iterations as features are added one at a time, for each
+    covariance type, so the cost of every extra feature is visible.
+    """
+    from hmmlearn.hmm import GaussianHMM
+    import stock_hmm_store
+    import stock_indicator_engine
+
+    prices = stock_hmm_store.synthetic_regime_data(1, n_bars=n_bars)['T000'][['Adj Close']]
+    data = stock_indicator_engine.compute_indicator_frames(prices.rename(columns={'Adj Close': 'T000'}))['T000']
+    # Random monthly scores stand in for the article store
+    months = data.index.to_period('M').strftime('%Y-%m').unique()
+    sentiment = pd.Series(np.random.default_rng(0).normal(0, 1, len(months)), index=months)
+
+    print(f"{'Features':<58}{'Covariance':>11}{'Seconds':>9}{'ms/iter':>9}")
+    results = []
+    for count in range(1, len(DEFAULT_FEATURES) + 2):
+        features = DEFAULT_FEATURES[:count]
+        matrix, _, _ = build_feature_matrix(data, features, sentiment if count > len(DEFAULT_FEATURES) else None)
+        names = features + ([SENTIMENT_FEATURE] if count > len(DEFAULT_FEATURES) else [])
+        for covariance_type in covariance_types:
+            # tol=-inf runs exactly n_iter iterations, so timings compare like for like
+            start = time.perf_counter()
+            for repeat in range(repeats):
+                GaussianHMM(n_components=n_components, covariance_type=covariance_type, n_iter=n_iter,
+                            tol=-np.inf, random_state=repeat).fit(matrix)
+            seconds = (time.perf_counter() - start) / repeats
+            results.append({'features': names, 'covariance_type': covariance_type, 'seconds': seconds})
+            print(f"{', '.join(names):<58}{covariance_type:>11}{seconds:>9.3f}{1000 * seconds / n_iter:>9.2f}")
+    return results
+
+if __name__ == "__main__":
+    benchmark_feature_counts()
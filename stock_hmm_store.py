@@ -0,0 +1,291 @@
+import itertools
+import json
+import os
+import pickle
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+
+import stock_hmm_training
+import stock_metrics
+
+# Constants
+DEFAULT_STORE_PATH = os.path.join('.cache', 'hmm_models')
+WARM_N_ITER = 100
+INDEX_FILE = 'index.json'
+DEFAULT_MAX_VERSIONS = 30   # Versions kept per ticker and state count; older pickles are deleted
+
+def sort_states(model):
+    """Reorder a model's states by ascending mean of the first feature (state 0 = lowest mean return)."""
+    return permute_states(model, np.argsort(model.means_[:, 0]))
+
+def permute_states(model, order):
+    """Reorder the states of a fitted GaussianHMM in place: new state i is old state order[i]."""
+    order = np.asarray(order)
+    model.startprob_ = model.startprob_[order]
+    model.transmat_ = model.transmat_[np.ix_(order, order)]
+    model.means_ = model.means_[order]
+    model._covars_ = model._covars_[order]  # Stored in covariance_type form; the public setter expects that too
+    return model
+
+def alignment_order(model, reference, observations):
+    """
+    The state order (for permute_states) maximizing how often `model` and `reference`
+    decode the same state on `observations`.
+    """
+    new_states = model.predict(observations)
+    reference_states = reference.predict(observations)
+    agreement = np.zeros((model.n_components, model.n_components))
+    np.add.at(agreement, (new_states, reference_states), 1)
+    return max(itertools.permutations(range(model.n_components)),
+               key=lambda order: sum(agreement[old, new] for new, old in enumerate(order)))
+
+def align_states(model, reference, observations):
+    """
+    Permute `model`'s states to match `reference`'s labels as closely as possible: the
+    permutation maximizing how often both models decode the same state on `observations`.
+    This keeps labels stable across refits even when two states have similar means.
+    """
+    return permute_states(model, alignment_order(model, reference, observations))
+
+@stock_metrics.timed('hmm.warm_start_fit')
+def warm_start_fit(previous, observations, n_iter=WARM_N_ITER):
+    """
+    Fit a new GaussianHMM on `observations` starting EM from `previous`'s parameters
+    (init_params=""), so a few new bars converge in a handful of iterations.
+    """
+    from hmmlearn.hmm import GaussianHMM
+    model = GaussianHMM(n_components=previous.n_components, covariance_type=previous.covariance_type,
+                        n_iter=n_iter, tol=previous.tol, init_params="", params="stmc")
+    model.startprob_ = previous.startprob_.copy()
+    model.transmat_ = previous.transmat_.copy()
+    model.means_ = previous.means_.copy()
+    model.covars_ = previous._covars_.copy()
+    model.fit(observations)
+    return model
+
+def window_data(data, window='expanding'):
+    """Return the rows to train on: everything ('expanding') or the last `window` bars (sliding)."""
+    if window == 'expanding' or window is None:
+        return data
+    return data.iloc[-int(window):]
+
+class HMMModelStore:
+    """
+    Versioned on-disk store of fitted HMMs, one directory per ticker and state count.
+
+    Each fit is pickled as a new numbered version, and index.json records when it was
+    fitted, the training date range and the fit diagnostics. The last `max_versions`
+    versions are kept so regime labels from recent runs can still be reproduced; older
+    ones are deleted as new ones are saved (None keeps every version).
+    """
+
+    def __init__(self, path=DEFAULT_STORE_PATH, max_versions=DEFAULT_MAX_VERSIONS):
+        self.path = path
+        self.max_versions = max_versions
+        self._lock = threading.Lock()
+        os.makedirs(path, exist_ok=True)
+
+    def _directory(self, ticker, n_components):
+        return os.path.join(self.path, ticker, f"{n_components}_states")
+
+    def versions(self, ticker, n_components):
+        """Return the index records for a ticker's models, oldest first."""
+        index_path = os.path.join(self._directory(ticker, n_components), INDEX_FILE)
+        if not os.path.exists(index_path):
+            return []
+        with open(index_path, encoding='utf-8') as file:
+            return json.load(file)
+
+    def load(self, ticker, n_components, version=None):
+        """Return (model, record) for a version (default: latest), or (None, None) if nothing is stored."""
+        records = self.versions(ticker, n_components)
+        if not records:
+            return None, None
+        record = records[-1] if version is None else next(r for r in records if r['version'] == version)
+        with open(os.path.join(self._directory(ticker, n_components), record['file']), 'rb') as file:
+            return pickle.load(file), record
+
+    def save(self, ticker, model, record):
+        """Store a model as the next version and return its index record."""
+        directory = self._directory(ticker, model.n_components)
+        with self._lock:
+            os.makedirs(directory, exist_ok=True)
+            records = self.versions(ticker, model.n_components)
+            version = records[-1]['version'] + 1 if records else 1
+            record = dict(record, version=version, file=f"v{version:04d}.pkl",
+                          fitted_at=datetime.now().isoformat(timespec='seconds'))
+            with open(os.path.join(directory, record['file']), 'wb') as file:
+                pickle.dump(model, file)
+            records.append(record)
+            if self.max_versions and len(records) > self.max_versions:
+                for old in records[:-self.max_versions]:
+                    try:
+                        os.remove(os.path.join(directory, old['file']))
+                    except FileNotFoundError:
+                        pass
+                records = records[-self.max_versions:]
+            index_path = os.path.join(directory, INDEX_FILE)
+            with open(index_path + '.tmp', 'w', encoding='utf-8') as file:
+                json.dump(records, file, indent=1)
+            os.replace(index_path + '.tmp', index_path)
+        return record
+
+def _record(data, model, observations, features, mode, iterations, converged, seconds, scaling=None):
+    import stock_hmm_features
+    return {
+        'mode': mode,
+        'features': list(features),
+        'covariance_type': model.covariance_type,
+        'train_start': str(data.index[0].date()),
+        'train_end': str(data.index[-1].date()),
+        'n_observations': len(data),
+        'log_likelihood': float(model.score(observations)),
+        'iterations': iterations,
+        'converged': converged,
+        'seconds': seconds,
+        # Mean/std the features were standardized with; new bars must be scaled the same way
+        'scaling': stock_hmm_features.scaling_to_dict(scaling) if scaling is not None else None,
+    }
+
+def stored_scaling(record):
+    """The feature scaling saved with a model version, or None (raw returns, or an older record)."""
+    import stock_hmm_features
+    if not record or not record.get('scaling'):
+        return None
+    return stock_hmm_features.scaling_from_dict(record['scaling'])
+
+def stored_scalings(tickers, n_components, features, covariance_type="diag", store=None):
+    """
+    Return {ticker: scaling} from each ticker's latest stored model, for tickers whose model
+    used the same features and covariance type (the ones refit_models will warm-start).
+    """
+    store = store or HMMModelStore()
+    scalings = {}
+    for ticker in tickers:
+        records = store.versions(ticker, n_components)
+        if not records:
+            continue
+        record = records[-1]
+        if record.get('features') == list(features) and record.get('covariance_type') == covariance_type:
+            scaling = stored_scaling(record)
+            if scaling is not None:
+                scalings[ticker] = scaling
+    return scalings
+
+def refit_models(data_by_ticker, n_components=2, window='expanding', store=None,
+                 features=None, covariance_type="diag", cpu_budget=None, scalings=None):
+    """
+    Bring every ticker's stored HMM up to date and return {ticker: (model, record)}.
+
+    Tickers with a stored model are refit from its parameters on the (expanding or
+    sliding) window and their states are aligned to the previous version. Tickers
+    without one get a cold fit with random restarts through stock_hmm_training, with
+    states ordered by mean return. Every new fit is saved as a new version.
+
+    A stored model only seeds the refit if it used the same features and covariance
+    type; otherwise the ticker is fit cold. If it was also trained on exactly the same
+    window (same first and last date and bar count), it is returned as is with mode
+    'reused' and nothing is fitted or saved. A warm refit that raises falls back to a
+    cold fit; tickers whose cold fit fails are left out.
+
+    :param scalings: Dict of ticker -> the scaling its standardized features were built
+                     with (stock_hmm_features.build_feature_frames); stored with each version
+                     so later runs, trackers and backtests can scale new bars the same way.
+    """
+    scalings = scalings or {}
+    store = store or HMMModelStore()
+    features = features or stock_hmm_training.DEFAULT_FEATURES
+    windows = {ticker: window_data(data, window) for ticker, data in data_by_ticker.items()}
+
+    results, cold = {}, {}
+    for ticker, data in windows.items():
+        previous, previous_record = store.load(ticker, n_components)
+        if (previous is None or previous.covariance_type != covariance_type
+                or previous_record.get('features', stock_hmm_training.DEFAULT_FEATURES) != list(features)):
+            cold[ticker] = data
+            continue
+        if (previous_record.get('train_start') == str(data.index[0].date())
+                and previous_record.get('train_end') == str(data.index[-1].date())
+                and previous_record.get('n_observations') == len(data)):
+            # No new bars since the stored fit (e.g. a rerun the same day): don't add a duplicate version
+            results[ticker] = (previous, dict(previous_record, mode='reused', iterations=0, seconds=0.0))
+            continue
+        observations = np.ascontiguousarray(data[features].to_numpy(dtype=np.float64))
+        start = time.perf_counter()
+        try:
+            model = align_states(warm_start_fit(previous, observations), previous, observations)
+        except Exception as e:
+            # e.g. a state with no bars left in a sliding window; start over instead
+            print(f"Warm refit failed for {ticker} ({e}); fitting it cold.")
+            cold[ticker] = data
+            continue
+        record = _record(data, model, observations, features, 'warm', int(model.monitor_.iter),
+                         bool(model.monitor_.converged), time.perf_counter() - start, scalings.get(ticker))
+        results[ticker] = (model, store.save(ticker, model, record))
+
+    if cold:
+        trained = stock_hmm_training.train_models(cold, n_components=(n_components,), features=features,
+                                                  covariance_type=covariance_type, cpu_budget=cpu_budget)
+        for ticker, result in trained.items():
+            if result.model is None:
+                print(f"Could not fit an HMM for {ticker}.")
+                continue
+            data = cold[ticker]
+            observations = np.ascontiguousarray(data[features].to_numpy(dtype=np.float64))
+            model = sort_states(result.model)
+            record = _record(data, model, observations, features, 'cold', result.best['iterations'],
+                             result.best['converged'], result.seconds, scalings.get(ticker))
+            results[ticker] = (model, store.save(ticker, model, record))
+    return results
+
+def print_refits(results):
+    print(f"{'Ticker':<8}{'Version':>8}{'Mode':>8}{'Iters':>7}{'Conv':>6}{'Seconds':>9}  Window")
+    for ticker, (_, record) in results.items():
+        print(f"{ticker:<8}{record['version']:>8}{record['mode']:>8}{record['iterations']:>7}"
+              f"{str(record['converged']):>6}{record['seconds']:>9.2f}  {record['train_start']} to {record['train_end']}")
+
+def synthetic_regime_data(n_tickers, n_bars=1500, seed=0):
+    """Daily Adj Close/Returns frames whose returns switch between a calm and a turbulent regime."""
+    import pandas as pd
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range("2018-01-01", periods=n_bars)
+    transmat = np.array([[0.98, 0.02], [0.05, 0.95]])
+    means, stds = np.array([0.0008, -0.001]), np.array([0.008, 0.025])
+    frames = {}
+    for j in range(n_tickers):
+        states = np.zeros(n_bars, dtype=int)
+        for t in range(1, n_bars):
+            states[t] = rng.choice(2, p=transmat[states[t - 1]])
+        returns = rng.normal(means[states], stds[states])
+        frames[f"T{j:03d}"] = pd.DataFrame({'Adj Close': 100 * np.cumprod(1 + returns), 'Returns': returns}, index=dates)
+    return frames
+
+def compare_cold_and_warm(n_tickers=4, new_bars=5, path=os.path.join('.cache', 'hmm_models_benchmark')):
+    """
+    Fit synthetic tickers cold, append a few bars, then compare a warm refit against a
+    single cold fit on the same data: iterations, time, and whether the labels moved.
+    """
+    import shutil
+    shutil.rmtree(path, ignore_errors=True)
+    store = HMMModelStore(path)
+    full = synthetic_regime_data(n_tickers)
+
+    first = refit_models({t: d.iloc[:-new_bars] for t, d in full.items()}, store=store, cpu_budget=1)
+    warm = refit_models(full, store=store)
+    cold = stock_hmm_training.train_models(full, restarts=1, cpu_budget=1)
+
+    print(f"{'Ticker':<8}{'Cold iters':>11}{'Cold s':>8}{'Warm iters':>11}{'Warm s':>8}{'Labels kept':>13}")
+    for ticker in full:
+        observations = full[ticker][['Returns']].to_numpy()
+        before = first[ticker][0].predict(observations[:-new_bars])
+        after = warm[ticker][0].predict(observations[:-new_bars])
+        fit = cold[ticker].best
+        print(f"{ticker:<8}{fit['iterations']:>11}{fit['seconds']:>8.2f}{warm[ticker][1]['iterations']:>11}"
+              f"{warm[ticker][1]['seconds']:>8.2f}{np.mean(before == after):>12.1%}")
+    shutil.rmtree(path, ignore_errors=True)
+
+if __name__ == "__main__":
+    compare_cold_and_warm()
@@ -0,0 +1,170 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+import stock_metrics
+
+# Constants
+DEFAULT_N_ITER = 1000
+DEFAULT_RESTARTS = 5
+DEFAULT_FEATURES = ['Returns']
+
+def default_cpu_budget():
+    """Worker processes to use by default: every CPU but one, at least one."""
+    return max(1, (os.cpu_count() or 1) - 1)
+
+def _limit_threads():
+    # One BLAS thread per worker process so the pool alone decides how many cores are busy
+    try:
+        from threadpoolctl import threadpool_limits
+        threadpool_limits(1)
+    except ImportError:
+        pass
+
+def _fit_one(ticker, observations, n_components, seed, n_iter, covariance_type):
+    """Fit one GaussianHMM from one random initialization and return the model with its diagnostics."""
+    from hmmlearn.hmm import GaussianHMM
+    start = time.perf_counter()
+    fit = {'ticker': ticker, 'n_components': n_components, 'seed': seed}
+    try:
+        model = GaussianHMM(n_components=n_components, covariance_type=covariance_type,
+                            n_iter=n_iter, random_state=seed)
+        model.fit(observations)
+        fit.update({
+            'model': model,
+            'log_likelihood': float(model.score(observations)),
+            'iterations': int(model.monitor_.iter),
+            'converged': bool(model.monitor_.converged),
+            'error': None,
+        })
+    except Exception as e:  # e.g. a degenerate covariance from a bad initialization
+        fit.update({'model': None, 'log_likelihood': -np.inf, 'iterations': 0, 'converged': False, 'error': str(e)})
+    fit['seconds'] = time.perf_counter() - start
+    return fit
+
+def _n_parameters(n_components, n_features, covariance_type):
+    """Free parameters of a GaussianHMM, for BIC."""
+    covariance_parameters = {
+        'diag': n_components * n_features,
+        'spherical': n_components,
+        'full': n_components * n_features * (n_features + 1) // 2,
+        'tied': n_features * (n_features + 1) // 2,
+    }[covariance_type]
+    return (n_components - 1) + n_components * (n_components - 1) + n_components * n_features + covariance_parameters
+
+class TrainingResult:
+    """
+    Fits for one ticker. `fits` holds every restart; `best_by_components` the highest
+    log-likelihood fit for each n_components; `best` the one of those with the lowest BIC
+    (log-likelihood alone always prefers more states).
+    """
+
+    def __init__(self, ticker, fits, n_observations, n_features, covariance_type):
+        self.ticker = ticker
+        self.fits = sorted(fits, key=lambda fit: (fit['n_components'], fit['seed']))
+        self.best_by_components = {}
+        for fit in self.fits:
+            current = self.best_by_components.get(fit['n_components'])
+            if fit['model'] is not None and (current is None or fit['log_likelihood'] > current['log_likelihood']):
+                self.best_by_components[fit['n_components']] = fit
+
+        self.best = None
+        for n_components, fit in self.best_by_components.items():
+            k = _n_parameters(n_components, n_features, covariance_type)
+            fit['bic'] = k * np.log(n_observations) - 2 * fit['log_likelihood']
+            if self.best is None or fit['bic'] < self.best['bic']:
+                self.best = fit
+
+    @property
+    def model(self):
+        return self.best['model'] if self.best else None
+
+    @property
+    def seconds(self):
+        return sum(fit['seconds'] for fit in self.fits)
+
+def _observations(data, features):
+    return np.ascontiguousarray(data[features].to_numpy(dtype=np.float64))
+
+@stock_metrics.timed('hmm.train_models')
+def train_models(data_by_ticker, n_components=(2,), restarts=DEFAULT_RESTARTS, cpu_budget=None,
+                 n_iter=DEFAULT_N_ITER, covariance_type="diag", features=None, seed=0):
+    """
+    Fit GaussianHMMs for many tickers in a process pool.
+
+    Every (ticker, n_components, restart) combination is an independent job; restart r
+    uses random_state seed + r, so results are reproducible. Longer series and more
+    states are scheduled first so the pool stays busy to the end.
+
+    :param data_by_ticker: Dict of ticker -> DataFrame with the feature columns.
+    :param n_components: Iterable of state counts to try.
+    :param restarts: Random initializations per (ticker, n_components).
+    :param cpu_budget: Worker processes (each limited to one BLAS thread); 1 fits in-process.
+    :return: Dict of ticker -> TrainingResult.
+    """
+    features = features or DEFAULT_FEATURES
+    cpu_budget = cpu_budget or default_cpu_budget()
+    observations = {ticker: _observations(data, features) for ticker, data in data_by_ticker.items()}
+    jobs = [
+        (ticker, values, n, seed + restart, n_iter, covariance_type)
+        for ticker, values in observations.items()
+        for n in n_components
+        for restart in range(restarts)
+    ]
+    jobs.sort(key=lambda job: len(job[1]) * job[2] ** 2, reverse=True)
+
+    fits = {ticker: [] for ticker in observations}
+    if cpu_budget == 1:
+        for job in jobs:
+            fits[job[0]].append(_fit_one(*job))
+    else:
+        with ProcessPoolExecutor(max_workers=min(cpu_budget, len(jobs) or 1), initializer=_limit_threads) as executor:
+            futures = [executor.submit(_fit_one, *job) for job in jobs]
+            for future in as_completed(futures):
+                fit = future.result()
+                fits[fit['ticker']].append(fit)
+
+    n_features = len(features)
+    return {
+        ticker: TrainingResult(ticker, fits[ticker], len(observations[ticker]), n_features, covariance_type)
+        for ticker in observations
+    }
+
+def print_diagnostics(results):
+    print(f"{'Ticker':<8}{'States':>7}{'Seed':>6}{'LogLik':>12}{'Iters':>7}{'Conv':>6}{'Seconds':>9}")
+    for ticker, result in results.items():
+        for fit in result.fits:
+            marker = ' *' if fit is result.best else ''
+            print(f"{ticker:<8}{fit['n_components']:>7}{fit['seed']:>6}{fit['log_likelihood']:>12.2f}"
+                  f"{fit['iterations']:>7}{str(fit['converged']):>6}{fit['seconds']:>9.2f}{marker}")
+
+def benchmark(n_tickers=8, n_components=(2, 3), restarts=3, cpu_budget=None):
+    """Time sequential fits against the process pool on synthetic returns."""
+    import stock_indicator_engine
+    adj_close = stock_indicator_engine.synthetic_prices(n_tickers)
+    data_by_ticker = {}
+    for ticker in adj_close.columns:
+        data = adj_close[[ticker]].rename(columns={ticker: 'Adj Close'}).dropna()
+        data['Returns'] = data['Adj Close'].pct_change()
+        data_by_ticker[ticker] = data.dropna()
+
+    import hmmlearn.hmm  # noqa: F401 - import outside the timed runs
+    start = time.perf_counter()
+    sequential = train_models(data_by_ticker, n_components, restarts, cpu_budget=1)
+    sequential_seconds = time.perf_counter() - start
+
+    cpu_budget = cpu_budget or default_cpu_budget()
+    start = time.perf_counter()
+    pooled = train_models(data_by_ticker, n_components, restarts, cpu_budget=cpu_budget)
+    pooled_seconds = time.perf_counter() - start
+
+    same = all(sequential[t].best['log_likelihood'] == pooled[t].best['log_likelihood'] for t in data_by_ticker)
+    jobs = n_tickers * len(n_components) * restarts
+    print(f"{jobs} fits: sequential {sequential_seconds:.2f}s, {cpu_budget} processes {pooled_seconds:.2f}s "
+          f"({sequential_seconds / pooled_seconds:.1f}x), identical best fits: {same}")
+    return {'sequential_seconds': sequential_seconds, 'pooled_seconds': pooled_seconds, 'identical': same}
+
+if __name__ == "__main__":
+    benchmark()
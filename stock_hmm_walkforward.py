@@ -0,0 +1,222 @@
+import math
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+import stock_hmm_store
+import stock_hmm_training
+
+# Constants
+DEFAULT_MIN_TRAIN = 252     # Bars in the first training window (about a year)
+DEFAULT_TEST_SIZE = 63      # Out-of-sample bars decoded per fold (about a quarter)
+DEFAULT_RESTARTS = 3        # Random restarts for the cold fit that starts each chain
+
+def make_folds(n_obs, min_train=DEFAULT_MIN_TRAIN, test_size=DEFAULT_TEST_SIZE):
+    """
+    Expanding-window folds over n_obs bars as (train_end, test_end) pairs: fold k trains
+    on bars [0, train_end) and is tested on the next, unseen bars [train_end, test_end).
+    """
+    folds = []
+    train_end = min_train
+    while train_end < n_obs:
+        folds.append((train_end, min(train_end + test_size, n_obs)))
+        train_end += test_size
+    return folds
+
+def split_chains(n_folds, n_chains):
+    """Cut fold indices into n_chains contiguous runs of (nearly) equal length."""
+    n_chains = max(1, min(n_chains, n_folds))
+    bounds = np.linspace(0, n_folds, n_chains + 1).round().astype(int)
+    return [list(range(bounds[i], bounds[i + 1])) for i in range(n_chains)]
+
+def _cold_fit(ticker, observations, n_components, covariance_type, restarts, seed, n_iter):
+    fits = [stock_hmm_training._fit_one(ticker, observations, n_components, seed + restart, n_iter, covariance_type)
+            for restart in range(restarts)]
+    best = max(fits, key=lambda fit: fit['log_likelihood'])
+    if best['model'] is None:
+        raise RuntimeError(f"Every restart failed for {ticker}: {best['error']}")
+    return (stock_hmm_store.sort_states(best['model']), sum(fit['iterations'] for fit in fits),
+            all(fit['converged'] for fit in fits))
+
+def _run_chain(ticker, observations, folds, fold_indices, n_components, covariance_type, restarts, seed, n_iter):
+    """
+    Fit and evaluate one run of adjacent folds. The first fold is fit cold with random
+    restarts; every later fold starts EM from the previous fold's model and is aligned
+    to its labels. Each fold decodes its test bars with the forward filter, carrying on
+    from the filtered state at the end of training, so test regimes only use past bars.
+    """
+    import stock_regime_tracker
+    results = []
+    previous = None
+    for index in fold_indices:
+        train_end, test_end = folds[index]
+        train, test = observations[:train_end], observations[train_end:test_end]
+        start = time.perf_counter()
+        model = None
+        if previous is not None:
+            try:
+                model = stock_hmm_store.warm_start_fit(previous, train)
+                model = stock_hmm_store.align_states(model, previous, train)
+                mode, iterations, converged = 'warm', int(model.monitor_.iter), bool(model.monitor_.converged)
+            except Exception as e:
+                # e.g. a state that collapsed onto too few bars
+                print(f"Warm start failed for {ticker} fold {index} ({e}); fitting it cold.")
+                model = None
+        if model is None:
+            mode = 'cold'
+            model, iterations, converged = _cold_fit(ticker, train, n_components, covariance_type, restarts,
+                                                     seed + index, stock_hmm_training.DEFAULT_N_ITER)
+            if previous is not None:
+                model = stock_hmm_store.align_states(model, previous, train)
+
+        # The posterior of the last training bar given the training bars is the filtered state there
+        tracker = stock_regime_tracker.RegimeTracker(model, probabilities=model.predict_proba(train)[-1])
+        test_states = np.argmax(tracker.update_many(test), axis=1)
+        results.append({
+            'fold': index,
+            'mode': mode,
+            'model': model,
+            'train_loglik': float(model.score(train)) / len(train),
+            'test_loglik': tracker.log_likelihood / len(test),
+            'test_states': test_states,
+            'iterations': iterations,
+            'converged': converged,
+            'seconds': time.perf_counter() - start,
+        })
+        previous = model
+    return ticker, results
+
+def walk_forward(data_by_ticker, n_components=2, features=None, covariance_type="diag",
+                 min_train=DEFAULT_MIN_TRAIN, test_size=DEFAULT_TEST_SIZE, cpu_budget=None,
+                 n_chains=None, restarts=DEFAULT_RESTARTS, seed=0):
+    """
+    Walk-forward evaluation of HMM regimes for many tickers.
+
+    Each ticker's history is cut into expanding-window folds (make_folds). A fold trains
+    on everything before its test period and decodes the test period out of sample.
+    Adjacent folds differ by only `test_size` bars, so each fold warm-starts from the
+    previous one. To use several cores, each ticker's folds are split into `n_chains`
+    contiguous chains (default: enough chains to give every worker one). Only the first
+    fold of a chain is fit cold. Chains run in a process pool and are then relabelled
+    so state numbers agree across chain boundaries.
+
+    :param data_by_ticker: Dict of ticker -> DataFrame with the feature columns, in date order.
+    :return: (folds, stats). folds has one row per ticker and fold with the train/test dates,
+             per-bar train and out-of-sample log-likelihood, EM iterations, whether the fit
+             was warm or cold, regime stability (share of the previous fold's training bars
+             both models label the same), regime switches in the test period and wall time.
+             stats has the total wall and fit seconds.
+    """
+    features = features or stock_hmm_training.DEFAULT_FEATURES
+    cpu_budget = cpu_budget or stock_hmm_training.default_cpu_budget()
+    observations = {ticker: stock_hmm_training._observations(data, features) for ticker, data in data_by_ticker.items()}
+    folds = {ticker: make_folds(len(values), min_train, test_size) for ticker, values in observations.items()}
+    n_chains = n_chains or max(1, math.ceil(cpu_budget / max(len(observations), 1)))
+
+    jobs = [
+        (ticker, observations[ticker], folds[ticker], chain, n_components, covariance_type, restarts, seed,
+         stock_hmm_training.DEFAULT_N_ITER)
+        for ticker in observations
+        for chain in split_chains(len(folds[ticker]), n_chains) if chain
+    ]
+    # Chains ending on the longest training windows cost the most
+    jobs.sort(key=lambda job: sum(job[2][index][0] for index in job[3]), reverse=True)
+
+    start = time.perf_counter()
+    fold_results = {ticker: [] for ticker in observations}
+    if cpu_budget == 1:
+        for job in jobs:
+            ticker, results = _run_chain(*job)
+            fold_results[ticker].extend(results)
+    else:
+        with ProcessPoolExecutor(max_workers=min(cpu_budget, len(jobs) or 1),
+                                 initializer=stock_hmm_training._limit_threads) as executor:
+            futures = [executor.submit(_run_chain, *job) for job in jobs]
+            for future in as_completed(futures):
+                ticker, results = future.result()
+                fold_results[ticker].extend(results)
+
+    rows = []
+    for ticker, results in fold_results.items():
+        rows.extend(_stitch(ticker, sorted(results, key=lambda result: result['fold']),
+                            observations[ticker], folds[ticker], data_by_ticker[ticker].index))
+    wall_seconds = time.perf_counter() - start
+
+    frame = pd.DataFrame(rows)
+    stats = {
+        'tickers': len(observations),
+        'folds': len(frame),
+        'chains': len(jobs),
+        'wall_seconds': wall_seconds,
+        'fit_seconds': float(frame['seconds'].sum()) if len(frame) else 0.0,
+    }
+    return frame, stats
+
+def _stitch(ticker, results, observations, folds, index):
+    """Relabel chains to agree with the fold before them and compute per-fold stability."""
+    rows = []
+    previous, previous_states = None, None
+    order = None
+    for result in results:
+        train_end, test_end = folds[result['fold']]
+        model, test_states = result['model'], result['test_states']
+        if result['mode'] == 'cold' and previous is not None:
+            # A new chain: pick the permutation matching the previous fold, keep it for the whole chain
+            order = stock_hmm_store.alignment_order(model, previous, observations[:folds[result['fold'] - 1][0]])
+        if order is not None:
+            stock_hmm_store.permute_states(model, order)
+            test_states = np.argsort(order)[test_states]
+
+        stability = np.nan
+        if previous is not None:
+            previous_train = observations[:folds[result['fold'] - 1][0]]
+            stability = float(np.mean(model.predict(previous_train) == previous_states))
+        previous, previous_states = model, model.predict(observations[:train_end])
+
+        rows.append({
+            'ticker': ticker,
+            'fold': result['fold'],
+            'train_start': index[0],
+            'train_end': index[train_end - 1],
+            'test_start': index[train_end],
+            'test_end': index[test_end - 1],
+            'mode': result['mode'],
+            'train_loglik': result['train_loglik'],
+            'test_loglik': result['test_loglik'],
+            'iterations': result['iterations'],
+            'converged': result['converged'],
+            'stability': stability,
+            'test_switches': int(np.count_nonzero(np.diff(test_states))),
+            'test_regime_share': float(np.mean(test_states == model.n_components - 1)),
+            'seconds': result['seconds'],
+        })
+    return rows
+
+def print_walk_forward(folds, stats):
+    columns = ['ticker', 'fold', 'test_start', 'test_end', 'mode', 'train_loglik', 'test_loglik',
+               'iterations', 'stability', 'test_switches', 'seconds']
+    print(folds[columns].to_string(index=False, float_format='{:.3f}'.format))
+    summary = folds.groupby('ticker')[['test_loglik', 'stability', 'iterations', 'seconds']].mean()
+    print(summary.to_string(float_format='{:.3f}'.format))
+    print(f"{stats['folds']} folds for {stats['tickers']} tickers in {stats['chains']} chains: "
+          f"{stats['wall_seconds']:.2f}s wall time, {stats['fit_seconds']:.2f}s fitting")
+
+def benchmark(n_tickers=4, n_bars=1500, cpu_budget=None):
+    """
+    Walk forward over synthetic regime data with warm-started chains, then with every
+    fold fit cold, and compare iterations, wall time and out-of-sample log-likelihood.
+    """
+    data_by_ticker = stock_hmm_store.synthetic_regime_data(n_tickers, n_bars=n_bars)
+    warm, warm_stats = walk_forward(data_by_ticker, cpu_budget=cpu_budget)
+    print_walk_forward(warm, warm_stats)
+    n_folds = len(make_folds(n_bars))
+    cold, cold_stats = walk_forward(data_by_ticker, cpu_budget=cpu_budget, n_chains=n_folds)
+    for name, folds, stats in (('warm chains', warm, warm_stats), ('all cold', cold, cold_stats)):
+        print(f"{name:<12} {stats['wall_seconds']:>7.2f}s wall, {folds['iterations'].mean():>6.1f} EM iterations/fold, "
+              f"test loglik {folds['test_loglik'].mean():.4f}/bar, stability {folds['stability'].mean():.3f}")
+    return warm, cold
+
+if __name__ == "__main__":
+    benchmark()
@@ -0,0 +1,262 @@
+import time
+
+import numpy as np
+import pandas as pd
+
+# Output names match the columns stock_hmm_analysis.main() adds to each ticker's frame
+INDICATOR_NAMES = ['Returns', 'MA_14', 'EMA_14', 'RSI_14', 'MACD_Line', 'Signal_Line', 'MACD_Histogram', 'Volatility_30']
+
+def _window_sums(values, window):
+    """
+    Return (sum, count, nonzero count) of each trailing window along axis 0, NaNs counted
+    as missing. Rows before the first full window are NaN/0.
+    """
+    valid = ~np.isnan(values)
+    filled = np.where(valid, values, 0.0)
+    rows, cols = values.shape
+    zeros = np.zeros((1, cols))
+
+    sums = np.full((rows, cols), np.nan)
+    counts = np.zeros((rows, cols))
+    nonzero = np.zeros((rows, cols))
+    if rows >= window:
+        csum = np.concatenate([zeros, np.cumsum(filled, axis=0)])
+        ccount = np.concatenate([zeros, np.cumsum(valid, axis=0)])
+        cnonzero = np.concatenate([zeros, np.cumsum(filled != 0, axis=0)])
+        sums[window - 1:] = csum[window:] - csum[:-window]
+        counts[window - 1:] = ccount[window:] - ccount[:-window]
+        nonzero[window - 1:] = cnonzero[window:] - cnonzero[:-window]
+    return sums, counts, nonzero
+
+def _column_offset(values):
+    """First non-NaN value of each column (0 for empty columns), used to keep cumulative sums small."""
+    if not len(values):
+        return np.zeros(values.shape[1])
+    valid = ~np.isnan(values)
+    first = np.argmax(valid, axis=0)
+    offset = values[first, np.arange(values.shape[1])]
+    return np.where(valid.any(axis=0), offset, 0.0)
+
+def _rolling_mean(values, window):
+    """Trailing mean over `window` bars; NaN unless every bar in the window is present."""
+    # Summing deviations from each column's first value keeps the running sums small and precise
+    offset = _column_offset(values)
+    sums, counts, _ = _window_sums(values - offset, window)
+    _, _, nonzero = _window_sums(values, window)
+    mean = np.where(counts == window, sums / window + offset, np.nan)
+    # Windows of all zeros are exactly zero (pandas does the same; keeps RSI's 0/0 a NaN)
+    return np.where((counts == window) & (nonzero == 0), 0.0, mean)
+
+def _rolling_std(values, window):
+    """Trailing sample standard deviation (ddof=1) over `window` bars."""
+    values = values - _column_offset(values)
+    sums, counts, _ = _window_sums(values, window)
+    squares, _, _ = _window_sums(values * values, window)
+    var = (squares - sums * sums / window) / (window - 1)
+    var = np.where(counts == window, np.maximum(var, 0.0), np.nan)
+    return np.sqrt(var)
+
+def _ema_step(weighted, current, alpha):
+    """
+    One pandas ewm(adjust=False) update for a vector of series. NaN inputs leave the state
+    untouched (each ticker only advances on its own bars); the first observation seeds it.
+    """
+    old_wt = 1.0 - alpha
+    # Same arithmetic as pandas' ewma kernel so results agree to the last bit
+    updated = (old_wt * weighted + alpha * current) / (old_wt + alpha)
+    updated = np.where(weighted == current, weighted, updated)
+    return np.where(np.isnan(current), weighted, np.where(np.isnan(weighted), current, updated))
+
+def _ema_pass(prices, spans, signal_span):
+    """
+    Compute the price EMAs for every span and the EMA of (first - second span) in a single
+    pass over the dates. The price EMAs are stacked so each date is one vector update.
+
+    :return: (price EMAs of shape (len(spans), dates, tickers), signal EMA of shape (dates, tickers))
+    """
+    rows, cols = prices.shape
+    alphas = (2.0 / (np.asarray(spans, dtype=np.float64) + 1.0))[:, None]
+    signal_alpha = 2.0 / (signal_span + 1.0)
+
+    emas = np.empty((len(spans), rows, cols))
+    signal = np.empty((rows, cols))
+    state = np.full((len(spans), cols), np.nan)
+    signal_state = np.full(cols, np.nan)
+    for t in range(rows):
+        state = _ema_step(state, prices[t], alphas)
+        emas[:, t] = state
+        signal_state = _ema_step(signal_state, state[0] - state[1], signal_alpha)
+        signal[t] = signal_state
+
+    # Bars a ticker doesn't have stay NaN in the output
+    missing = np.isnan(prices)
+    emas[:, missing] = np.nan
+    signal[missing] = np.nan
+    return emas, signal
+
+def _pack(values):
+    """
+    Move each column's non-NaN values to the top, in order, with the NaNs below them.
+    Tickers on different calendars (crypto every day, equities on weekdays) then line up
+    bar by bar, the way a per-ticker dropna() sees them.
+
+    :return: (packed values, row order to pass to _unpack)
+    """
+    order = np.argsort(np.isnan(values), axis=0, kind='stable')
+    return np.take_along_axis(values, order, axis=0), order
+
+def _unpack(values, order):
+    """Scatter packed rows back to the dates they came from (inverse of _pack)."""
+    out = np.empty_like(values)
+    np.put_along_axis(out, order, values, axis=0)
+    return out
+
+def compute_indicators(adj_close, ma_window=14, ema_window=14, rsi_window=14,
+                       macd_fast=12, macd_slow=26, macd_signal=9, volatility_window=30):
+    """
+    Compute every stock_hmm_analysis indicator for many tickers at once.
+
+    :param adj_close: 2-D array-like (dates x tickers) of raw adjusted closes, NaN where a
+                      ticker has no bar (e.g. before it listed).
+    :return: dict of indicator name -> float64 array (dates x tickers). Like get_stock_data,
+             each ticker's first bar (which has no return) is dropped, so values match
+             running the per-ticker calculate_* functions on get_stock_data's output.
+             Windows run over each ticker's own bars, so dates another ticker trades on
+             (a weekend next to a crypto ticker) don't break them.
+    """
+    raw = np.asarray(adj_close, dtype=np.float64)
+    if raw.ndim == 1:
+        raw = raw[:, None]
+    raw, order = _pack(raw)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        previous = np.vstack([np.full((1, raw.shape[1]), np.nan), raw[:-1]])
+        returns = raw / previous - 1.0
+        # get_stock_data drops the first row (NaN return); mirror that per ticker
+        prices = np.where(np.isnan(returns), np.nan, raw)
+
+        observed = ~np.isnan(prices)
+        previous = np.vstack([np.full((1, prices.shape[1]), np.nan), prices[:-1]])
+        delta = prices - previous
+        gain = np.where(observed, np.where(delta > 0, delta, 0.0), np.nan)
+        loss = np.where(observed, np.where(delta < 0, -delta, 0.0), np.nan)
+
+        # One fused pass over the dates for every recursive (EMA) indicator
+        (ema_fast, ema_slow, ema), signal_line = _ema_pass(prices, (macd_fast, macd_slow, ema_window), macd_signal)
+        macd_line = ema_fast - ema_slow
+
+        avg_gain = _rolling_mean(gain, rsi_window)
+        avg_loss = _rolling_mean(loss, rsi_window)
+        rs = avg_gain / avg_loss
+        rsi = 100 - (100 / (1 + rs))
+
+        results = {
+            'Returns': np.where(observed, returns, np.nan),
+            f'MA_{ma_window}': _rolling_mean(prices, ma_window),
+            f'EMA_{ema_window}': ema,
+            f'RSI_{rsi_window}': rsi,
+            'MACD_Line': macd_line,
+            'Signal_Line': signal_line,
+            'MACD_Histogram': macd_line - signal_line,
+            f'Volatility_{volatility_window}': _rolling_std(returns, volatility_window) * np.sqrt(volatility_window),
+        }
+    return {name: _unpack(values, order) for name, values in results.items()}
+
+def compute_indicator_frames(adj_close):
+    """
+    Run compute_indicators on a wide DataFrame (dates x tickers) of adjusted closes and
+    return {ticker: DataFrame} shaped like stock_hmm_analysis.main() builds per ticker.
+    """
+    results = compute_indicators(adj_close.to_numpy())
+    frames = {}
+    for j, ticker in enumerate(adj_close.columns):
+        frame = pd.DataFrame({'Adj Close': adj_close[ticker].to_numpy()}, index=adj_close.index)
+        for name, values in results.items():
+            frame[name] = values[:, j]
+        frames[ticker] = frame[~np.isnan(results['Returns'][:, j])]
+    return frames
+
+def _per_ticker(adj_close):
+    """Reference path: get_stock_data-style frames run through the existing calculate_* functions."""
+    import stock_hmm_analysis as sha
+    frames = {}
+    for ticker in adj_close.columns:
+        data = adj_close[[ticker]].rename(columns={ticker: 'Adj Close'}).dropna()
+        data['Returns'] = data['Adj Close'].pct_change()
+        data.dropna(inplace=True)
+        data['MA_14'] = sha.calculate_moving_average(data, window=14)
+        data['EMA_14'] = sha.calculate_exponential_moving_average(data, window=14)
+        data['RSI_14'] = sha.calculate_rsi(data, window=14)
+        macd_line, signal_line, macd_histogram = sha.calculate_macd(data)
+        data['MACD_Line'] = macd_line
+        data['Signal_Line'] = signal_line
+        data['MACD_Histogram'] = macd_histogram
+        data['Volatility_30'] = sha.calculate_volatility(data, window=30)
+        frames[ticker] = data
+    return frames
+
+def synthetic_prices(n_tickers, start="2018-01-01", end=None, seed=0, daily=0):
+    """
+    Random-walk adjusted closes on business days, with some tickers listing partway through.
+    The last `daily` tickers trade every calendar day instead (like crypto next to equities).
+    """
+    end = end or pd.Timestamp.today().normalize()
+    dates = pd.date_range(start, end) if daily else pd.bdate_range(start, end)
+    rng = np.random.default_rng(seed)
+    steps = rng.normal(0.0003, 0.015, size=(len(dates), n_tickers))
+    prices = 100 * np.cumprod(1 + steps, axis=0)
+    listing_rows = rng.integers(0, len(dates) // 4, size=n_tickers)
+    listing_rows[: max(1, n_tickers // 2)] = 0
+    for j, row in enumerate(listing_rows):
+        prices[:row, j] = np.nan
+    if daily:
+        prices[dates.dayofweek >= 5, :n_tickers - daily] = np.nan
+    return pd.DataFrame(prices, index=dates, columns=[f"T{j:03d}" for j in range(n_tickers)])
+
+def check_against_per_ticker(adj_close):
+    """Return the largest absolute difference per indicator between the engine and the per-ticker functions."""
+    engine = compute_indicator_frames(adj_close)
+    reference = _per_ticker(adj_close)
+    worst = {}
+    for name in INDICATOR_NAMES:
+        diffs = []
+        for ticker in adj_close.columns:
+            a = engine[ticker][name].to_numpy()
+            b = reference[ticker][name].to_numpy()
+            if not np.array_equal(np.isnan(a), np.isnan(b)):
+                raise AssertionError(f"{name} NaN pattern differs for {ticker}")
+            mask = ~np.isnan(a)
+            diffs.append(np.max(np.abs(a[mask] - b[mask]), initial=0.0))
+        worst[name] = max(diffs)
+    return worst
+
+def benchmark(ticker_counts=(10, 100, 500), repeats=3):
+    """Time the engine against the per-ticker functions on synthetic daily data since 2018."""
+    print(f"{'Tickers':>8}{'Per-ticker (s)':>16}{'Engine (s)':>12}{'Speedup':>10}")
+    results = {}
+    for count in ticker_counts:
+        adj_close = synthetic_prices(count)
+        values = adj_close.to_numpy()
+
+        start = time.perf_counter()
+        for _ in range(repeats):
+            _per_ticker(adj_close)
+        per_ticker = (time.perf_counter() - start) / repeats
+
+        start = time.perf_counter()
+        for _ in range(repeats):
+            compute_indicators(values)
+        engine = (time.perf_counter() - start) / repeats
+
+        results[count] = {'per_ticker_seconds': per_ticker, 'engine_seconds': engine}
+        print(f"{count:>8}{per_ticker:>16.3f}{engine:>12.3f}{per_ticker / engine:>9.1f}x")
+    return results
+
+if __name__ == "__main__":
+    for label, adj_close in [('business days', synthetic_prices(50)),
+                             ('mixed calendars', synthetic_prices(50, daily=10))]:
+        print(f"Check on {label}:")
+        worst = check_against_per_ticker(adj_close)
+        for name, diff in worst.items():
+            print(f"{name:<16} max |engine - per-ticker| = {diff:.3e}")
+    benchmark()
@@ -0,0 +1,105 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+# Constants
+DEFAULT_STATE_PATH = os.path.join('.cache', 'ingest_state.sqlite')
+SOURCE_NEWSAPI = 'newsapi'
+SOURCE_GDELT = 'gdelt'
+STATUS_FETCHED = 'fetched'
+STATUS_SCORED = 'scored'
+
+def is_complete_window(to_date, today=None):
+    """A window is complete once its last day is in the past; open windows are always refetched."""
+    today = today or datetime.today().strftime('%Y-%m-%d')
+    return to_date < today
+
+class IngestState:
+    """
+    Per-ticker, per-source watermark store for news ingestion.
+
+    Each (ticker, source, from_date, to_date) window moves from 'fetched' (articles
+    stored, not yet scored) to 'scored' (consensus and score stored). A rerun can serve
+    scored windows without any network or model calls and resume fetched-but-unscored
+    windows after a crash without refetching them.
+    """
+
+    def __init__(self, path=DEFAULT_STATE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS windows ("
+            " ticker TEXT NOT NULL,"
+            " source TEXT NOT NULL,"
+            " from_date TEXT NOT NULL,"
+            " to_date TEXT NOT NULL,"
+            " status TEXT NOT NULL,"
+            " articles TEXT,"
+            " consensus TEXT,"
+            " avg_score REAL,"
+            " updated_at REAL NOT NULL,"
+            " PRIMARY KEY (ticker, source, from_date, to_date))"
+        )
+        self._conn.commit()
+
+    def get(self, ticker, source, from_date, to_date):
+        """Return the stored record for a window as a dict, or None if it was never fetched."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT status, articles, consensus, avg_score FROM windows"
+                " WHERE ticker = ? AND source = ? AND from_date = ? AND to_date = ?",
+                (ticker, source, from_date, to_date),
+            ).fetchone()
+        if row is None:
+            return None
+        status, articles, consensus, avg_score = row
+        return {
+            'status': status,
+            'articles': json.loads(articles) if articles else [],
+            'consensus': consensus,
+            'avg_score': avg_score,
+        }
+
+    def mark_fetched(self, ticker, source, from_date, to_date, articles):
+        """Record the fetched articles for a window (any earlier score is discarded)."""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO windows"
+                " (ticker, source, from_date, to_date, status, articles, consensus, avg_score, updated_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, NULL, NULL, ?)",
+                (ticker, source, from_date, to_date, STATUS_FETCHED, json.dumps(articles), time.time()),
+            )
+            self._conn.commit()
+
+    def mark_scored(self, ticker, source, from_date, to_date, consensus, avg_score):
+        """Record the sentiment result for a window that was already marked fetched."""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE windows SET status = ?, consensus = ?, avg_score = ?, updated_at = ?"
+                " WHERE ticker = ? AND source = ? AND from_date = ? AND to_date = ?",
+                (STATUS_SCORED, consensus, avg_score, time.time(), ticker, source, from_date, to_date),
+            )
+            self._conn.commit()
+
+    def completed_windows(self, ticker, source):
+        """Return the (from_date, to_date) windows already scored for a ticker and source."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT from_date, to_date FROM windows WHERE ticker = ? AND source = ? AND status = ?"
+                " ORDER BY from_date",
+                (ticker, source, STATUS_SCORED),
+            ).fetchall()
+        return rows
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,255 @@
+import json
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+# Constants
+DEFAULT_FETCH_WORKERS = 4
+DEFAULT_QUEUE_SIZE = 32         # Fetched windows waiting for the model (bounds memory)
+DEFAULT_BATCH_ARTICLES = 256    # Articles gathered before one scoring call
+DEFAULT_LINGER = 0.05           # Seconds the scorer waits for more windows before scoring a partial batch
+_DONE = object()
+
+class RunSummary:
+    """
+    Timings and counters for one batch run, written out as JSON at the end.
+
+    Stages may run on several threads at once, so a stage's seconds are the summed busy
+    time of every call; `wall_seconds` is the elapsed time of the whole run.
+    """
+
+    def __init__(self, command=None, options=None):
+        self.command = command
+        self.options = options or {}
+        self.started_at = datetime.now().isoformat(timespec='seconds')
+        self.stages = {}
+        self.queues = {}
+        self.counters = {}
+        self.results = {}
+        self.metrics = None
+        self.status = 'running'
+        self.error = None
+        self._start = time.perf_counter()
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name, items=0):
+        """Time one call of a stage; `items` is how many tickers/windows/articles it handled."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            with self._lock:
+                stage = self.stages.setdefault(name, {'seconds': 0.0, 'calls': 0, 'items': 0})
+                stage['seconds'] += seconds
+                stage['calls'] += 1
+                stage['items'] += items
+
+    def count(self, name, n=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def finish(self, status='ok', error=None):
+        self.status = status
+        self.error = error
+        self.wall_seconds = time.perf_counter() - self._start
+        return self
+
+    def to_dict(self):
+        return {
+            'command': self.command,
+            'options': self.options,
+            'started_at': self.started_at,
+            'wall_seconds': getattr(self, 'wall_seconds', time.perf_counter() - self._start),
+            'status': self.status,
+            'error': self.error,
+            'stages': self.stages,
+            'queues': self.queues,
+            'counters': self.counters,
+            'results': self.results,
+            'metrics': self.metrics,
+        }
+
+    def write(self, path):
+        """Write the summary as JSON to `path` ('-' prints it)."""
+        text = json.dumps(self.to_dict(), indent=2, default=str)
+        if path == '-':
+            print(text)
+            return
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(text + '\n')
+
+class MeteredQueue(queue.Queue):
+    """Bounded queue that tracks its depth and how long producers were blocked on a full queue."""
+
+    def __init__(self, name, maxsize):
+        super().__init__(maxsize)
+        self.name = name
+        self.max_depth = 0
+        self._depth_total = 0
+        self._samples = 0
+        self.blocked_seconds = 0.0
+
+    def put(self, item, block=True, timeout=None):
+        start = time.perf_counter()
+        super().put(item, block, timeout)
+        waited = time.perf_counter() - start
+        with self.mutex:
+            self.blocked_seconds += waited
+            depth = len(self.queue)
+            self.max_depth = max(self.max_depth, depth)
+            self._depth_total += depth
+            self._samples += 1
+
+    def metrics(self):
+        return {
+            'capacity': self.maxsize,
+            'max_depth': self.max_depth,
+            'mean_depth': self._depth_total / self._samples if self._samples else 0.0,
+            'blocked_put_seconds': self.blocked_seconds,
+        }
+
+def stream(tasks, fetch, score, write, summary, fetch_workers=DEFAULT_FETCH_WORKERS, queue_size=DEFAULT_QUEUE_SIZE,
+           batch_articles=DEFAULT_BATCH_ARTICLES, linger=DEFAULT_LINGER, ready=None):
+    """
+    Streaming fetch -> score -> write pipeline.
+
+    fetch_workers threads call fetch(task) -> [(key, articles), ...] and put each window on
+    a bounded queue. One scoring thread takes windows off it, gathers them into a batch
+    dict until it holds batch_articles articles (or nothing new arrives for `linger`
+    seconds), and calls score(batch). One writer thread calls write(result) for each scored
+    batch. Both queues are bounded, so when the model or the writer falls behind, the
+    stages before them block instead of piling up articles in memory.
+
+    :param ready: Optional (key, articles) windows that need no fetching (e.g. resumed ones).
+    :return: The summary, with per-stage busy time, items and utilization (busy time /
+             (wall time x threads)) in summary.stages, and queue depth and blocked-put time
+             in summary.queues.
+    """
+    tasks_queue = queue.Queue()
+    for task in tasks:
+        tasks_queue.put(task)
+    fetched = MeteredQueue('fetched', queue_size)
+    scored = MeteredQueue('scored', max(2, queue_size // 8))
+    errors = []
+
+    def fetcher():
+        while True:
+            try:
+                task = tasks_queue.get_nowait()
+            except queue.Empty:
+                return
+            try:
+                with summary.stage('fetch', items=1):
+                    windows = fetch(task)
+            except Exception as e:  # One failed request should not sink the batch
+                print(f"Fetch failed for {task}: {e}")
+                summary.count('fetch_errors')
+                continue
+            for window in windows:
+                fetched.put(window)
+
+    def scorer():
+        batch, n_articles, done = {}, 0, False
+        while not done:
+            try:
+                item = fetched.get(timeout=linger) if batch else fetched.get()
+            except queue.Empty:
+                item = None  # Nothing new for a while: score what we have
+            if item is _DONE:
+                done = True
+            elif item is not None:
+                key, articles = item
+                batch[key] = articles
+                n_articles += len(articles)
+                if n_articles < batch_articles:
+                    continue
+            if batch:
+                try:
+                    with summary.stage('score', items=len(batch)):
+                        result = score(batch)
+                    scored.put(result)
+                except Exception as e:
+                    errors.append(e)
+                batch, n_articles = {}, 0
+        scored.put(_DONE)
+
+    def writer():
+        while True:
+            result = scored.get()
+            if result is _DONE:
+                return
+            try:
+                with summary.stage('write', items=1):
+                    write(result)
+            except Exception as e:
+                errors.append(e)
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=scorer, name='scorer'), threading.Thread(target=writer, name='writer')]
+    fetchers = [threading.Thread(target=fetcher, name=f'fetcher-{i}') for i in range(fetch_workers)]
+    for thread in threads + fetchers:
+        thread.start()
+    for window in ready or ():
+        fetched.put(window)
+    for thread in fetchers:
+        thread.join()
+    fetched.put(_DONE)
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - start
+
+    workers = {'fetch': fetch_workers, 'score': 1, 'write': 1}
+    for name, n_threads in workers.items():
+        stage = summary.stages.setdefault(name, {'seconds': 0.0, 'calls': 0, 'items': 0})
+        stage['threads'] = n_threads
+        stage['utilization'] = stage['seconds'] / (wall * n_threads) if wall > 0 else 0.0
+    summary.queues.update({q.name: q.metrics() for q in (fetched, scored)})
+    summary.counters['pipeline_seconds'] = wall
+    if errors:
+        raise errors[0]
+    return summary
+
+def print_pipeline_report(summary):
+    """Print per-stage utilization and queue depth from a summary filled by stream()."""
+    for name in ('fetch', 'score', 'write'):
+        stage = summary.stages.get(name)
+        if stage and 'utilization' in stage:
+            print(f"{name:<6} {stage['threads']:>2} thread(s)  {stage['calls']:>5} calls  "
+                  f"{stage['seconds']:>8.2f}s busy  {stage['utilization']:>6.1%} utilized")
+    for name, metrics in summary.queues.items():
+        print(f"queue '{name}': capacity {metrics['capacity']}, max depth {metrics['max_depth']}, "
+              f"mean depth {metrics['mean_depth']:.1f}, producers blocked {metrics['blocked_put_seconds']:.2f}s")
+
+def benchmark(n_windows=60, articles_per_window=20, fetch_seconds=0.05, score_seconds_per_article=0.0005,
+              fetch_workers=DEFAULT_FETCH_WORKERS, queue_size=8):
+    """
+    Run stream() with simulated network latency and model cost, and compare its wall time
+    with doing the same fetches and scoring one after another.
+    """
+    def fetch(task):
+        time.sleep(fetch_seconds)
+        return [(task, [{'title': f'{task} {i}'} for i in range(articles_per_window)])]
+
+    def score(batch):
+        time.sleep(score_seconds_per_article * sum(len(articles) for articles in batch.values()))
+        return batch
+
+    sequential = n_windows * (fetch_seconds + score_seconds_per_article * articles_per_window)
+    summary = RunSummary('benchmark')
+    start = time.perf_counter()
+    stream(range(n_windows), fetch, score, lambda batch: None, summary, fetch_workers=fetch_workers, queue_size=queue_size)
+    seconds = time.perf_counter() - start
+    print(f"{n_windows} windows: streaming {seconds:.2f}s vs sequential {sequential:.2f}s ({sequential / seconds:.1f}x)")
+    print_pipeline_report(summary)
+    return summary
+
+if __name__ == "__main__":
+    benchmark()
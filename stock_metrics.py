@@ -0,0 +1,229 @@
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+# Instrumentation is off until enable() is called; disabled timers cost one flag check
+_enabled = False
+_lock = threading.Lock()
+_timers = {}
+_counters = {}
+_NULL_TIMER = nullcontext()
+PROMETHEUS_PREFIX = 'stock'
+
+def enable():
+    global _enabled
+    _enabled = True
+
+def disable():
+    global _enabled
+    _enabled = False
+
+def is_enabled():
+    return _enabled
+
+def reset():
+    """Forget every recorded timer and counter."""
+    with _lock:
+        _timers.clear()
+        _counters.clear()
+
+def _record(name, seconds, items=0, error=False):
+    with _lock:
+        timer = _timers.get(name)
+        if timer is None:
+            timer = _timers[name] = {'calls': 0, 'seconds': 0.0, 'max_seconds': 0.0, 'items': 0, 'errors': 0}
+        timer['calls'] += 1
+        timer['seconds'] += seconds
+        timer['items'] += items
+        if seconds > timer['max_seconds']:
+            timer['max_seconds'] = seconds
+        if error:
+            timer['errors'] += 1
+
+class _Timer:
+    __slots__ = ('name', 'items', 'start')
+
+    def __init__(self, name, items):
+        self.name = name
+        self.items = items
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        _record(self.name, time.perf_counter() - self.start, self.items, exc_type is not None)
+        return False
+
+def timer(name, items=0):
+    """Context manager timing one block under `name`; `items` is how many things it handled."""
+    if not _enabled:
+        return _NULL_TIMER
+    return _Timer(name, items)
+
+def timed(name=None):
+    """
+    Decorator timing every call of a function under `name` (default module.qualname).
+    Calls that raise are counted as errors. While disabled the wrapper only checks a flag.
+    """
+    def decorate(func):
+        metric = name or f"{func.__module__}.{func.__qualname__}"
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            start = time.perf_counter()
+            error = True
+            try:
+                result = func(*args, **kwargs)
+                error = False
+                return result
+            finally:
+                _record(metric, time.perf_counter() - start, error=error)
+        return wrapper
+    return decorate
+
+def count(name, n=1):
+    """Add n to a counter (no-op while disabled)."""
+    if not _enabled:
+        return
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + n
+
+def snapshot():
+    """Copy of the recorded timers (with mean seconds per call) and counters."""
+    with _lock:
+        timers = {name: dict(timer, mean_seconds=timer['seconds'] / timer['calls'])
+                  for name, timer in sorted(_timers.items())}
+        return {'timers': timers, 'counters': dict(sorted(_counters.items()))}
+
+def _label(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def to_prometheus(data=None):
+    """Render a snapshot in the Prometheus text exposition format."""
+    data = data or snapshot()
+    families = [
+        ('calls_total', 'counter', 'Calls of an instrumented function or block.', 'calls'),
+        ('seconds_total', 'counter', 'Wall seconds spent in an instrumented function or block.', 'seconds'),
+        ('max_seconds', 'gauge', 'Slowest single call.', 'max_seconds'),
+        ('items_total', 'counter', 'Items handled by an instrumented block.', 'items'),
+        ('errors_total', 'counter', 'Calls that raised.', 'errors'),
+    ]
+    lines = []
+    for suffix, kind, help_text, field in families:
+        metric = f"{PROMETHEUS_PREFIX}_{suffix}"
+        lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} {kind}"]
+        lines += [f'{metric}{{name="{_label(name)}"}} {timer[field]}' for name, timer in data['timers'].items()]
+    metric = f"{PROMETHEUS_PREFIX}_events_total"
+    lines += [f"# HELP {metric} Event counters.", f"# TYPE {metric} counter"]
+    lines += [f'{metric}{{name="{_label(name)}"}} {value}' for name, value in data['counters'].items()]
+    return '\n'.join(lines) + '\n'
+
+def write(path, data=None):
+    """
+    Write a snapshot to `path`: Prometheus text for .prom/.txt files, JSON otherwise
+    ('-' prints the JSON).
+    """
+    data = data or snapshot()
+    if path.endswith(('.prom', '.txt')):
+        text = to_prometheus(data)
+    else:
+        text = json.dumps(data, indent=2) + '\n'
+    if path == '-':
+        print(text, end='')
+        return
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(text)
+
+def print_metrics(data=None, limit=20):
+    """Print the slowest timers by total seconds."""
+    data = data or snapshot()
+    timers = sorted(data['timers'].items(), key=lambda item: item[1]['seconds'], reverse=True)[:limit]
+    for name, timer in timers:
+        print(f"{name:<48} {timer['calls']:>7} calls {timer['seconds']:>9.3f}s total "
+              f"{timer['mean_seconds'] * 1000:>9.2f}ms mean {timer['max_seconds'] * 1000:>9.2f}ms max")
+    for name, value in data['counters'].items():
+        print(f"{name:<48} {value:>7}")
+
+@contextmanager
+def profile(path, top=0):
+    """
+    cProfile the block, including threads started inside it, and dump the merged stats
+    to `path` in pstats format (open with snakeviz, or turn into a flamegraph with
+    flameprof / gprof2dot). Worker processes (chart rendering, HMM training) are not
+    profiled; their pools show up as time waiting on futures. `top` > 0 also prints
+    the slowest functions by cumulative time.
+    """
+    import cProfile
+    import pstats
+
+    profilers = []
+    profilers_lock = threading.Lock()
+
+    def start_thread_profiler(*_):
+        # Runs as the first profile event of each new thread; replaces itself with cProfile
+        profiler = cProfile.Profile()
+        with profilers_lock:
+            profilers.append(profiler)
+        profiler.enable()
+
+    main_profiler = cProfile.Profile()
+    threading.setprofile(start_thread_profiler)
+    main_profiler.enable()
+    try:
+        yield main_profiler
+    finally:
+        main_profiler.disable()
+        threading.setprofile(None)
+        with profilers_lock:
+            thread_profilers = list(profilers)
+        stats = pstats.Stats(main_profiler)
+        for profiler in thread_profilers:
+            profiler.disable()
+            try:
+                stats.add(profiler)
+            except TypeError:  # A thread that never made a profiled call
+                pass
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        stats.dump_stats(path)
+        print(f"Profile of {1 + len(thread_profilers)} thread(s) written to {path}")
+        if top:
+            stats.sort_stats('cumulative').print_stats(top)
+
+def benchmark(calls=200000):
+    """Per-call overhead of a timed() function while disabled and enabled, against a plain call."""
+    def plain(x):
+        return x
+
+    wrapped = timed('benchmark.wrapped')(plain)
+    was_enabled = _enabled
+
+    def per_call(func):
+        start = time.perf_counter()
+        for i in range(calls):
+            func(i)
+        return (time.perf_counter() - start) / calls * 1e9
+
+    disable()
+    baseline = per_call(plain)
+    disabled = per_call(wrapped)
+    enable()
+    enabled = per_call(wrapped)
+    if not was_enabled:
+        disable()
+    print(f"plain call {baseline:.0f}ns, timed() disabled {disabled:.0f}ns (+{disabled - baseline:.0f}ns), "
+          f"enabled {enabled:.0f}ns (+{enabled - baseline:.0f}ns)")
+    return {'plain_ns': baseline, 'disabled_ns': disabled, 'enabled_ns': enabled}
+
+if __name__ == "__main__":
+    benchmark()
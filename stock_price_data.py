@@ -0,0 +1,221 @@
+import json
+import os
+import threading
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+import stock_metrics
+
+# Constants
+DEFAULT_CACHE_PATH = os.path.join('data', 'prices')
+OHLCV_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Adj Close', 'Volume']
+COVERAGE_FILE = '_coverage.json'
+
+def period_start(period, end=None):
+    """Convert a yfinance-style period ('1d', '5d', '1wk', '6mo', '5y', 'max') to a start date string."""
+    end = pd.Timestamp(end or datetime.today().strftime('%Y-%m-%d'))
+    if period == 'max':
+        return '1900-01-01'
+    for suffix, unit in (('mo', 'months'), ('wk', 'weeks'), ('d', 'days'), ('y', 'years')):
+        if period.endswith(suffix):
+            count = int(period[:-len(suffix)])
+            return (end - pd.DateOffset(**{unit: count})).strftime('%Y-%m-%d')
+    raise ValueError(f"Unsupported period '{period}'")
+
+def _today():
+    return datetime.today().strftime('%Y-%m-%d')
+
+def _tomorrow():
+    return (datetime.today() + timedelta(days=1)).strftime('%Y-%m-%d')
+
+def _normalize(frame):
+    """Return a frame with flat OHLCV columns, a tz-naive 'Date' index and no all-NaN rows."""
+    frame = frame.reindex(columns=OHLCV_COLUMNS).dropna(how='all')
+    index = pd.DatetimeIndex(frame.index)
+    if index.tz is not None:
+        index = index.tz_localize(None)
+    frame.index = index.rename('Date')
+    return frame.sort_index()
+
+class YFinanceProvider:
+    """Downloads OHLCV for many tickers in one batched yfinance call."""
+
+    def download(self, tickers, start, end):
+        """Return a dict of ticker -> OHLCV DataFrame for [start, end) (end exclusive)."""
+        import yfinance as yf
+        with stock_metrics.timer('yfinance.download', items=len(tickers)):
+            data = yf.download(list(tickers), start=start, end=end, group_by='ticker',
+                               auto_adjust=False, progress=False, threads=True)
+        frames = {}
+        if data.empty:
+            return frames
+        for ticker in tickers:
+            if isinstance(data.columns, pd.MultiIndex):
+                if ticker not in data.columns.get_level_values(0):
+                    continue
+                frame = data[ticker]
+            else:
+                frame = data
+            frame = _normalize(frame)
+            if not frame.empty:
+                frames[ticker] = frame
+        return frames
+
+class FixtureProvider:
+    """
+    Offline provider serving OHLCV from in-memory frames or a directory of <ticker>.csv files.
+    Records every download call in `calls` so tests can assert what would have hit the network.
+    """
+
+    def __init__(self, frames=None, directory=None):
+        self.frames = {ticker: _normalize(frame) for ticker, frame in (frames or {}).items()}
+        self.directory = directory
+        self.calls = []
+
+    def _frame(self, ticker):
+        if ticker not in self.frames and self.directory:
+            csv_file_path = os.path.join(self.directory, f"{ticker}.csv")
+            if os.path.exists(csv_file_path):
+                self.frames[ticker] = _normalize(pd.read_csv(csv_file_path, index_col=0, parse_dates=True))
+        return self.frames.get(ticker)
+
+    def download(self, tickers, start, end):
+        self.calls.append((tuple(tickers), start, end))
+        frames = {}
+        for ticker in tickers:
+            frame = self._frame(ticker)
+            if frame is None:
+                continue
+            frame = frame[(frame.index >= pd.Timestamp(start)) & (frame.index < pd.Timestamp(end))]
+            if not frame.empty:
+                frames[ticker] = frame
+        return frames
+
+class PriceCache:
+    """
+    Local OHLCV cache (one Parquet file per ticker) in front of a price provider.
+
+    The cache tracks the contiguous [start, end) range it has fetched for each ticker and
+    only asks the provider for the missing head or tail. Tickers that miss the same range
+    are fetched together in one batched call. Today's bar is never marked as covered, so
+    it is refreshed on the next request.
+    """
+
+    def __init__(self, provider=None, path=DEFAULT_CACHE_PATH):
+        self.provider = provider or YFinanceProvider()
+        self.path = path
+        self._lock = threading.Lock()
+        os.makedirs(path, exist_ok=True)
+        coverage_path = os.path.join(path, COVERAGE_FILE)
+        self._coverage = {}
+        if os.path.exists(coverage_path):
+            with open(coverage_path, encoding='utf-8') as file:
+                self._coverage = json.load(file)
+
+    def _file_path(self, ticker):
+        return os.path.join(self.path, f"{ticker}.parquet")
+
+    def _load(self, ticker):
+        file_path = self._file_path(ticker)
+        if os.path.exists(file_path):
+            return pd.read_parquet(file_path)
+        return None
+
+    def _save_coverage(self):
+        coverage_path = os.path.join(self.path, COVERAGE_FILE)
+        with open(coverage_path + '.tmp', 'w', encoding='utf-8') as file:
+            json.dump(self._coverage, file)
+        os.replace(coverage_path + '.tmp', coverage_path)
+
+    def _missing_ranges(self, ticker, start, end):
+        covered = self._coverage.get(ticker)
+        if covered is None:
+            return [(start, end)]
+        covered_start, covered_end = covered
+        ranges = []
+        if start < covered_start:
+            ranges.append((start, covered_start))
+        if end > covered_end:
+            ranges.append((covered_end, end))
+        return ranges
+
+    def get(self, tickers, start, end=None):
+        """
+        Return a dict of ticker -> OHLCV DataFrame for [start, end), fetching only what is missing.
+        Tickers with no data are left out of the result.
+        """
+        end = end or _tomorrow()
+        tickers = list(dict.fromkeys(tickers))
+        with self._lock:
+            # Group tickers by the exact range they are missing so each range is one batched call
+            pending = {}
+            for ticker in tickers:
+                for missing in self._missing_ranges(ticker, start, end):
+                    pending.setdefault(missing, []).append(ticker)
+
+        # Download without holding the lock so concurrent callers don't queue behind each other's network calls
+        downloads = [(range_start, range_end, range_tickers, self.provider.download(range_tickers, range_start, range_end))
+                     for (range_start, range_end), range_tickers in pending.items()]
+
+        with self._lock:
+            for range_start, range_end, range_tickers, downloaded in downloads:
+                for ticker in range_tickers:
+                    frame = downloaded.get(ticker)
+                    if frame is None and ticker not in self._coverage:
+                        continue  # Unknown or invalid ticker: don't record coverage
+                    if frame is not None:
+                        existing = self._load(ticker)
+                        if existing is not None:
+                            frame = pd.concat([existing, frame])
+                            frame = frame[~frame.index.duplicated(keep='last')].sort_index()
+                        frame.to_parquet(self._file_path(ticker))
+
+                    covered_start, covered_end = self._coverage.get(ticker, (range_start, range_end))
+                    self._coverage[ticker] = (
+                        min(covered_start, range_start),
+                        min(max(covered_end, range_end), _today()),
+                    )
+            if pending:
+                self._save_coverage()
+
+            results = {}
+            for ticker in tickers:
+                frame = self._load(ticker)
+                if frame is None:
+                    continue
+                frame = frame[(frame.index >= pd.Timestamp(start)) & (frame.index < pd.Timestamp(end))]
+                if not frame.empty:
+                    results[ticker] = frame
+        return results
+
+# Shared cache used by all modules
+_price_cache = None
+
+def get_price_cache():
+    """Return the shared price cache, creating it with the yfinance provider on first use."""
+    global _price_cache
+    if _price_cache is None:
+        _price_cache = PriceCache()
+    return _price_cache
+
+def set_provider(provider, path=DEFAULT_CACHE_PATH):
+    """Replace the shared cache with one backed by `provider` (e.g. a FixtureProvider for offline runs)."""
+    global _price_cache
+    _price_cache = PriceCache(provider=provider, path=path)
+    return _price_cache
+
+@stock_metrics.timed('prices.get_prices')
+def get_prices(tickers, start=None, end=None, period=None):
+    """
+    Return a dict of ticker -> OHLCV DataFrame from the shared cache.
+    Pass either start (and optionally end, exclusive) or a yfinance-style period.
+    """
+    if period is not None:
+        start = period_start(period)
+    return get_price_cache().get(tickers, start, end)
+
+def validate_tickers(ticker_list, lookback='7d'):
+    """Return the tickers that have any price data in the recent lookback, in one batched request."""
+    found = get_prices(ticker_list, period=lookback)
+    return [ticker for ticker in ticker_list if ticker in found]
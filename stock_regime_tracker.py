@@ -0,0 +1,149 @@
+import numpy as np
+import pandas as pd
+
+class RegimeTracker:
+    """
+    Online forward filter for one ticker's fitted GaussianHMM.
+
+    Each update takes one new observation (a return, or a feature row for multivariate
+    models) and advances the filtered state distribution P(state_t | x_1..x_t) with one
+    K x K transition product and K Gaussian densities, instead of re-decoding the whole
+    history. The per-state inverse covariances are computed once up front.
+    """
+
+    def __init__(self, model, probabilities=None, last_date=None, log_likelihood=0.0, n_updates=0):
+        self.model = model
+        self.transmat = np.asarray(model.transmat_, dtype=np.float64)
+        self.means = np.asarray(model.means_, dtype=np.float64)
+        covars = np.asarray(model.covars_, dtype=np.float64)  # Always (K, d, d) whatever the covariance_type
+        self.precisions = np.linalg.inv(covars)
+        _, logdets = np.linalg.slogdet(covars)
+        self.log_norm = -0.5 * (self.means.shape[1] * np.log(2 * np.pi) + logdets)
+
+        self.probabilities = None if probabilities is None else np.asarray(probabilities, dtype=np.float64)
+        self.last_date = last_date
+        self.log_likelihood = log_likelihood
+        self.n_updates = n_updates
+
+    def _log_densities(self, observation):
+        diffs = observation[None, :] - self.means
+        mahalanobis = np.einsum('kd,kde,ke->k', diffs, self.precisions, diffs)
+        return self.log_norm - 0.5 * mahalanobis
+
+    def update(self, observation, date=None):
+        """Feed one observation; return (regime, probability) for the current bar."""
+        observation = np.atleast_1d(np.asarray(observation, dtype=np.float64))
+        if self.probabilities is None:
+            prior = np.asarray(self.model.startprob_, dtype=np.float64)
+        else:
+            prior = self.probabilities @ self.transmat
+
+        with np.errstate(divide='ignore'):
+            log_joint = np.log(prior) + self._log_densities(observation)
+        shift = np.max(log_joint)
+        joint = np.exp(log_joint - shift)
+        total = joint.sum()
+        self.probabilities = joint / total
+        self.log_likelihood += shift + np.log(total)
+        self.n_updates += 1
+        if date is not None:
+            self.last_date = str(date)
+        return self.regime, self.probability
+
+    def update_many(self, observations, dates=None):
+        """Feed observations in order and return the (bars x K) filtered probabilities."""
+        observations = np.asarray(observations, dtype=np.float64)
+        if observations.ndim == 1:
+            observations = observations[:, None]
+        filtered = np.empty((len(observations), self.model.n_components))
+        for t, observation in enumerate(observations):
+            self.update(observation, None if dates is None else dates[t])
+            filtered[t] = self.probabilities
+        return filtered
+
+    @property
+    def regime(self):
+        return None if self.probabilities is None else int(np.argmax(self.probabilities))
+
+    @property
+    def probability(self):
+        return None if self.probabilities is None else float(np.max(self.probabilities))
+
+    def state_dict(self):
+        """Filter state to checkpoint alongside the model version it was built from."""
+        return {
+            'probabilities': None if self.probabilities is None else self.probabilities.tolist(),
+            'last_date': self.last_date,
+            'log_likelihood': self.log_likelihood,
+            'n_updates': self.n_updates,
+        }
+
+    @classmethod
+    def from_state_dict(cls, model, state):
+        return cls(model, **state)
+
+def track(models, data_by_ticker, features=None):
+    """
+    Build a tracker per ticker from its model and run it over the ticker's history.
+
+    :param models: Dict of ticker -> fitted GaussianHMM.
+    :param data_by_ticker: Dict of ticker -> DataFrame with the model's feature columns.
+    :return: Dict of ticker -> RegimeTracker, ready for update() on new bars.
+    """
+    features = features or ['Returns']
+    trackers = {}
+    for ticker, model in models.items():
+        data = data_by_ticker[ticker]
+        tracker = RegimeTracker(model)
+        tracker.update_many(data[features].to_numpy(dtype=np.float64), [str(d.date()) for d in data.index])
+        trackers[ticker] = tracker
+    return trackers
+
+def current_regimes(trackers):
+    """Return a DataFrame with each ticker's current regime, its probability and the bar it is as of."""
+    rows = [
+        {'ticker': ticker, 'regime': tracker.regime, 'probability': tracker.probability, 'as_of': tracker.last_date}
+        for ticker, tracker in trackers.items()
+    ]
+    return pd.DataFrame(rows, columns=['ticker', 'regime', 'probability', 'as_of'])
+
+def check_against_batch(model, observations, checkpoints=20):
+    """
+    Compare the online filter with hmmlearn's batch decoding on historical data.
+
+    At evenly spaced bars t the filtered distribution must equal predict_proba on
+    observations[:t + 1] at its last row (the posterior given data up to t), and the
+    accumulated log-likelihood must equal score(). Also reports how often the filtered
+    regime matches the full-history Viterbi path, which can differ because Viterbi
+    uses future bars.
+
+    :return: Dict with the largest probability and log-likelihood differences and the Viterbi agreement.
+    """
+    observations = np.asarray(observations, dtype=np.float64)
+    if observations.ndim == 1:
+        observations = observations[:, None]
+    tracker = RegimeTracker(model)
+    filtered = tracker.update_many(observations)
+
+    worst = 0.0
+    for t in np.linspace(0, len(observations) - 1, checkpoints).astype(int):
+        batch = model.predict_proba(observations[:t + 1])[-1]
+        worst = max(worst, float(np.max(np.abs(batch - filtered[t]))))
+    return {
+        'max_probability_diff': worst,
+        'log_likelihood_diff': float(abs(tracker.log_likelihood - model.score(observations))),
+        'viterbi_agreement': float(np.mean(np.argmax(filtered, axis=1) == model.predict(observations))),
+    }
+
+if __name__ == "__main__":
+    import stock_hmm_store
+    import stock_hmm_training
+    data_by_ticker = stock_hmm_store.synthetic_regime_data(3)
+    results = stock_hmm_training.train_models(data_by_ticker, restarts=2, cpu_budget=1)
+    for ticker, result in results.items():
+        check = check_against_batch(result.model, data_by_ticker[ticker][['Returns']].to_numpy())
+        print(f"{ticker}: max |filter - predict_proba| = {check['max_probability_diff']:.2e}, "
+              f"|loglik diff| = {check['log_likelihood_diff']:.2e}, "
+              f"Viterbi agreement = {check['viterbi_agreement']:.1%}")
+    trackers = track({ticker: result.model for ticker, result in results.items()}, data_by_ticker)
+    print(current_regimes(trackers).to_string(index=False))
@@ -0,0 +1,99 @@
+import time
+
+import stock_fundamentals
+import stock_price_data
+
+# Constants
+DEFAULT_MAX_WORKERS = stock_fundamentals.DEFAULT_MAX_WORKERS
+
+def fetch_fundamentals(tickers, max_workers=DEFAULT_MAX_WORKERS, as_of=None, fields=None):
+    """
+    Return {ticker: fundamentals} from the local snapshot store, refreshing stale tickers
+    in parallel with at most `max_workers` requests in flight. With `as_of` the values
+    come from that day's snapshot history and nothing is fetched. `fields` limits the
+    result, and the staleness check, to those fields.
+    """
+    return stock_fundamentals.get_store().get_many(tickers, max_workers=max_workers, as_of=as_of, fields=fields)
+
+class ScreenResult:
+    """Outcome of a screen: surviving tickers, the data they were judged on, and per-stage timings."""
+
+    def __init__(self, tickers, fundamentals, prices, stages):
+        self.tickers = tickers
+        self.fundamentals = fundamentals
+        self.prices = prices
+        self.stages = stages
+
+    def print_report(self):
+        print(f"{'Stage':<32}{'Seconds':>10}{'In':>8}{'Out':>8}{'Pruned':>8}")
+        for stage in self.stages:
+            print(f"{stage['stage']:<32}{stage['seconds']:>10.2f}{stage['in']:>8}{stage['out']:>8}{stage['pruned']:>8}")
+
+def _apply(stages, name, tickers, keep):
+    """Run one filter stage, recording its timing and how many tickers it pruned."""
+    start = time.perf_counter()
+    survivors = [ticker for ticker in tickers if keep(ticker)]
+    stages.append({
+        'stage': name,
+        'seconds': time.perf_counter() - start,
+        'in': len(tickers),
+        'out': len(survivors),
+        'pruned': len(tickers) - len(survivors),
+    })
+    return survivors
+
+def _timed(stages, name, tickers, fetch):
+    start = time.perf_counter()
+    result = fetch()
+    stages.append({
+        'stage': name,
+        'seconds': time.perf_counter() - start,
+        'in': len(tickers),
+        'out': len(tickers),
+        'pruned': 0,
+    })
+    return result
+
+def run_screen(tickers, fundamental_filters=(), price_filters=(), price_period=None,
+               max_workers=DEFAULT_MAX_WORKERS, as_of=None, fields=None):
+    """
+    Screen tickers cheapest-first.
+
+    Fundamentals are fetched in parallel and every fundamental filter runs before any
+    price history is downloaded; only the survivors get the (batched, cached) price
+    download, then the price filters run.
+
+    :param fundamental_filters: List of (name, predicate(fundamentals) -> bool); fundamentals
+                                is a dict with the fields of stock_fundamentals.FIELD_TTLS.
+    :param price_filters: List of (name, predicate(prices, info) -> bool); prices is the OHLCV DataFrame.
+    :param price_period: yfinance-style period of history to download for the survivors;
+                         None skips the price stage (price_filters are then ignored).
+    :param as_of: Optional 'YYYY-MM-DD' to judge fundamentals from that day's snapshot.
+    :param fields: Fundamentals the filters read (default: all tracked fields); only
+                   their TTLs trigger a refetch.
+    :return: ScreenResult
+    """
+    stages = []
+    tickers = list(tickers)
+
+    fundamentals = _timed(stages, "fetch fundamentals", tickers,
+                          lambda: fetch_fundamentals(tickers, max_workers=max_workers, as_of=as_of, fields=fields))
+    for name, predicate in fundamental_filters:
+        tickers = _apply(stages, name, tickers, lambda t: predicate(fundamentals[t]))
+
+    prices = {}
+    if price_period is not None and tickers:
+        prices = _timed(stages, "fetch prices", tickers,
+                        lambda: stock_price_data.get_prices(tickers, period=price_period))
+        tickers = _apply(stages, "has price history", tickers,
+                         lambda t: t in prices and len(prices[t]) >= 2)
+        for name, predicate in price_filters:
+            tickers = _apply(stages, name, tickers, lambda t: predicate(prices[t], fundamentals[t]))
+
+    return ScreenResult(tickers, fundamentals, prices, stages)
+
+def period_return_pct(prices):
+    """Percent change in Close from the first to the last bar."""
+    start_price = prices['Close'].iloc[0]
+    end_price = prices['Close'].iloc[-1]
+    return ((end_price - start_price) / start_price) * 100
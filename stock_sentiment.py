@@ -1,32 +1,35 @@
 import requests
-import yfinance as yf
-from transformers import pipeline
 import config
-import stock_hmm_analysis
+import stock_fundamentals
+import stock_ingest_state
+import stock_jobs
+import stock_metrics
+import stock_sentiment_engine
+import stock_sentiment_runner
 from datetime import datetime, timedelta
 import calendar
-import csv
-import os
 
 # Constants
 API_KEY = config.NEWS_API_KEY
 BASE_URL = 'https://newsapi.org/v2/everything'
-SENTIMENT_MODEL = 'nlptown/bert-base-multilingual-uncased-sentiment'
-
-# Set up sentiment analysis pipeline
-sentiment_analyzer = pipeline("sentiment-analysis", model=SENTIMENT_MODEL)
+SENTIMENT_MODEL = stock_sentiment_engine.SENTIMENT_MODEL
+SOURCE = stock_ingest_state.SOURCE_NEWSAPI
 
 def get_company_name(ticker):
-    """Fetch the company name for a given stock ticker using yfinance."""
+    """Fetch the company name for a given stock ticker from the fundamentals store (backed by yfinance)."""
     try:
-        company_info = yf.Ticker(ticker).info
+        company_info = stock_fundamentals.get_store().get(ticker, fields=("longName",))  # Served locally until the name's 90-day TTL runs out
         return company_info.get("longName") or ticker  # Fallback to ticker if name not found
     except Exception as e:
         print(f"Error fetching company name for {ticker}: {e}")
         return ticker  # Fallback to ticker symbol if API fails
 
+@stock_metrics.timed('newsapi.fetch_news')
 def fetch_news(query, from_date, to_date, num_articles=100):
-    """Fetch recent news articles related to a company name within a date range using NewsAPI."""
+    """
+    Fetch recent news articles related to a company name within a date range using NewsAPI.
+    Returns None if the request failed, so callers can tell a failure from an empty month.
+    """
     params = {
         'q': query,
         'apiKey': API_KEY,
@@ -36,34 +39,16 @@ def fetch_news(query, from_date, to_date, num_articles=100):
         'pageSize': num_articles,
     }
     response = requests.get(BASE_URL, params=params)
+    if response.status_code != 200:
+        print(f"Failed to fetch news for {query}: {response.status_code} {response.text[:200]}")
+        return None
     articles = response.json().get('articles', [])
     return [{'title': a['title'], 'description': a['description'], 'url': a['url']} for a in articles]
 
-def analyze_sentiment(articles):
+@stock_metrics.timed('newsapi.analyze_sentiment')
+def analyze_sentiment(articles, batch_size=stock_sentiment_engine.DEFAULT_BATCH_SIZE):
     """Analyze sentiment of each article and return average sentiment score."""
-    sentiments = []
-    for article in articles:
-        # Combine title and description for sentiment analysis
-        text = f"{article['title']} {article['description']}"
-        sentiment = sentiment_analyzer(text)
-        sentiments.append(sentiment[0]['label'])
-    
-    # Convert sentiments to a simple score for averaging (e.g., 1 to 5 for star rating)
-    sentiment_scores = {'1 star': -2, '2 stars': -1, '3 stars': 0, '4 stars': 1, '5 stars': 2}
-    scores = [sentiment_scores[s] for s in sentiments]
-    avg_score = sum(scores) / len(scores) if scores else 0
-
-    # Determine consensus
-    if avg_score > 1:
-        consensus = "Strongly Positive"
-    elif avg_score > 0:
-        consensus = "Positive"
-    elif avg_score < 0:
-        consensus = "Negative"
-    else:
-        consensus = "Neutral"
-    
-    return consensus, avg_score
+    return stock_sentiment_engine.analyze_sentiment(articles, batch_size=batch_size)
 
 def get_past_six_months():
     """Generate a list of the first and last dates for each of the past six months, starting from the end of the previous month."""
@@ -90,37 +75,25 @@ def get_past_six_months():
     
     return months
 
+def run(tickers, date_ranges=None, fetch_workers=stock_jobs.DEFAULT_FETCH_WORKERS,
+        queue_size=stock_jobs.DEFAULT_QUEUE_SIZE, batch_articles=stock_jobs.DEFAULT_BATCH_ARTICLES, summary=None):
+    """
+    Fetch, score and store monthly NewsAPI sentiment for already validated tickers, through
+    the shared streaming pipeline (see stock_sentiment_runner.run).
 
+    :return: (results, company_names); results maps (ticker, from_date, to_date) to
+             (consensus, avg_score) for every window, stored or new.
+    """
+    return stock_sentiment_runner.run(tickers, date_ranges or get_past_six_months(), SOURCE, fetch_news,
+                                      get_company_name, fetch_workers=fetch_workers, queue_size=queue_size,
+                                      batch_articles=batch_articles, summary=summary)
 
-def save_articles_to_csv(ticker, month, articles):
-    """Save articles to a CSV file named based on the ticker and month if the file doesn't already exist."""
-    # Create a directory for the ticker if it doesn't exist
-    os.makedirs(ticker, exist_ok=True)
-    
-    # Define the CSV file path
-    csv_file_path = os.path.join(ticker, f"{ticker}_{month}.csv")
-    
-    # Check if the file already exists
-    if os.path.exists(csv_file_path):
-        print(f"File {csv_file_path} already exists. Skipping write.")
-        return  # Do not write if the file already exists
-
-    # Define the CSV headers
-    headers = ['Title', 'Description', 'URL']
-    
-    # Write articles to the CSV file
-    with open(csv_file_path, mode='w', newline='', encoding='utf-8') as file:
-        writer = csv.DictWriter(file, fieldnames=headers)
-        writer.writeheader()
-        for article in articles:
-            writer.writerow({
-                'Title': article['title'],
-                'Description': article['description'],
-                'URL': article['url']
-            })
-    print(f"Saved articles to {csv_file_path}")
+print_results = stock_sentiment_runner.print_results
 
 def main():
+    # Deferred: stock_hmm_analysis pulls in hmmlearn and matplotlib
+    import stock_hmm_analysis
+
     # Collect tickers from user
     pre_tickers = []
     tkr = input("Enter the stock tickers you'd like to see analyzed (-1 to quit): ")
@@ -130,28 +103,9 @@ def main():
 
     # Validate tickers
     tickers = stock_hmm_analysis.validate_tickers(pre_tickers)
-    
-    # Get date ranges for the past six months
-    date_ranges = get_past_six_months()
-    
-    # Analyze each ticker
-    for ticker in tickers:
-        company_name = get_company_name(ticker)
-        print(f"\nAnalyzing {company_name} ({ticker})...")
-        
-        for from_date, to_date in date_ranges:
-            articles = fetch_news(company_name, from_date, to_date)
-            if not articles:
-                print(f"No articles found for {company_name} from {from_date} to {to_date}.")
-                continue
-            
-            # Analyze and print consensus
-            consensus, avg_score = analyze_sentiment(articles)
-            print(f"From {from_date} to {to_date}: Media consensus on {ticker} ({company_name}): {consensus} (Score: {avg_score})")
-            
-            # Save articles to CSV
-            month = datetime.strptime(from_date, '%Y-%m-%d').strftime('%Y-%m')
-            save_articles_to_csv(ticker, month, articles)
+
+    results, company_names = run(tickers)
+    print_results(results, company_names)
 
 # Run the main function
 if __name__ == "__main__":
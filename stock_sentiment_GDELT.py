@@ -1,26 +1,30 @@
 import requests
-import yfinance as yf
-from transformers import pipeline
 import config
-import stock_hmm_analysis
+import stock_gdelt_fetcher
+import stock_fundamentals
+import stock_ingest_state
+import stock_jobs
+import stock_metrics
+import stock_sentiment_engine
+import stock_sentiment_runner
+import stock_source_strength
 from datetime import datetime, timedelta
 import calendar
-import csv
-import os
 import re
 from datetime import datetime
 from dateutil.relativedelta import relativedelta
 import calendar
 
 # Constants
-GDELT_BASE_URL = 'https://api.gdeltproject.org/api/v2/doc/doc'
-SENTIMENT_MODEL = 'nlptown/bert-base-multilingual-uncased-sentiment'
+GDELT_BASE_URL = stock_gdelt_fetcher.GDELT_BASE_URL
+SENTIMENT_MODEL = stock_sentiment_engine.SENTIMENT_MODEL
+SOURCE = stock_ingest_state.SOURCE_GDELT
 
-# Set up sentiment analysis pipeline
-sentiment_analyzer = pipeline("sentiment-analysis", model=SENTIMENT_MODEL)
+# Shared concurrent GDELT client (pooled session, rate limiter, retries)
+_fetcher = None
 
 def get_company_name(ticker):
-    """Fetch the company name for a given stock ticker using yfinance."""
+    """Fetch the company name for a given stock ticker from the fundamentals store (backed by yfinance)."""
     
     if ticker == "GOOG":
         return "GOOG"
@@ -28,7 +32,7 @@ def get_company_name(ticker):
         return "AMZN"
 
     try:
-        company_info = yf.Ticker(ticker).info
+        company_info = stock_fundamentals.get_store().get(ticker, fields=("longName",))  # Served locally until the name's 90-day TTL runs out
         return company_info.get("longName") or ticker  # Fallback to ticker if name not found
     except Exception as e:
         print(f"Error fetching company name for {ticker}: {e}")
@@ -55,127 +59,54 @@ def clean_query(query):
     return " ".join(filtered_words)
 
 
-def fetch_news(query, from_date, to_date, num_articles=100):
-    """Fetch recent news articles related to a company name within a date range using GDELT Document API, excluding specific sources."""
-    # Clean the query
-    query = clean_query(query)
-    
-    from_date = from_date.replace("-", "") + "000000"
-    to_date = to_date.replace("-", "") + "235959"
-
-    params = {
-        'query': query,
-        'mode': 'ArtList',
-        'startdatetime': from_date,
-        'enddatetime': to_date,
-        'maxrecords': num_articles,
-        'format': 'json',
-        'sourcelang': 'English',
-    }
-    
-    response = requests.get(GDELT_BASE_URL, params=params)
-    
-    if response.status_code != 200:
-        print(f"Failed to fetch data for {query} from {from_date} to {to_date}. Status Code: {response.status_code}")
-        return []
+def _get_fetcher():
+    """Return the shared GDELT fetcher, creating its pooled session on first use."""
+    global _fetcher
+    if _fetcher is None:
+        _fetcher = stock_gdelt_fetcher.GDELTFetcher()
+    return _fetcher
 
-    try:
-        data = response.json()
-    except requests.exceptions.JSONDecodeError:
-        print("Response content is not in JSON format. Here is the response content:")
-        print(response.text)
+def _parse_articles(data):
+    """Turn a GDELT ArtList response into article dicts, excluding specific sources."""
+    if data is None:
         return []
 
     articles = data.get('articles', [])
     
     # Filter out articles from "WKRB13 News"
+    kept = [article for article in articles if article.get('source', '').lower() != 'wkrb13 news']
+
+    # Classify every kept article's source strength in one batch
     filtered_articles = []
-    for article in articles:
-        if article.get('source', '').lower() == 'wkrb13 news':
-            continue  # Skip this article
-        article['source_strength'] = classify_article(article)  # Classify the article
+    for article, (strength, _) in zip(kept, stock_source_strength.classify_articles(kept)):
         filtered_articles.append({
             'title': article.get('title', ''),
             'description': article.get('seendate', ''),
             'url': article.get('url', ''),
-            'source_strength': article['source_strength']
+            'source_strength': strength
         })
 
     return filtered_articles
 
-
-def classify_article(article):
-    """Classify an article based on its source strength."""
-    strong_keywords = [
-    "press release", "announced", "executive", "official", "statement", 
-    "disclosed", "released", "earnings call", "SEC filing", "government report", 
-    "quarterly report", "fiscal report", "financial statement", "official report", 
-    "conference call", "CEO", "CFO", "authorized", "confirmed", "verified", 
-    "annual report", "shareholder letter", "board of directors", "regulatory filing", 
-    "audited", "certified", "corporate filing", "press conference", "official announcement"
-]
-
-    moderate_keywords = [
-    "analyst", "report", "industry", "expert", "market analysis", 
-    "consulting firm", "study", "survey", "projection", "forecast", 
-    "research report", "white paper", "summary", "evaluation", 
-    "market outlook", "insight", "review", "observation", "interview", 
-    "predicted", "estimated", "expected", "analysis", "commentary", 
-    "business intelligence", "sector report", "trend analysis", 
-    "valuation", "financial analyst", "consultant", "advisory", 
-    "assessment", "industry data"
-]
-    weak_keywords = [
-    "rumor", "speculation", "unconfirmed", "alleged", "reported", 
-    "insider", "gossip", "leaked", "anonymous source", "unverified", 
-    "suspected", "claimed", "suggested", "unsubstantiated", "possible", 
-    "hinted", "implied", "likely", "anticipated", "potentially", 
-    "unclear", "predicted", "projected", "forecasted", "assumed", 
-    "suggestive", "unproven", "indicated", "insinuated", "allegedly", 
-    "hypothetical", "possibly", "guesswork", "doubtful", "conjecture"
-]
-
-    # Combine title and description, handling missing fields gracefully
-    content = f"{article.get('title', '')} {article.get('description', '')}".lower()
-
-    # Check for strong keywords
-    if any(keyword in content for keyword in strong_keywords):
-        return "Strong"
-    # Check for moderate keywords
-    elif any(keyword in content for keyword in moderate_keywords):
-        return "Moderate"
-    # Check for weak keywords
-    elif any(keyword in content for keyword in weak_keywords):
-        return "Weak"
-    # Default classification
-    return "Unclassified"
-
-
-def analyze_sentiment(articles):
-    """Analyze sentiment of each article and return average sentiment score."""
-    sentiments = []
-    for article in articles:
-        # Combine title and description for sentiment analysis
-        text = f"{article['title']} {article['description']}"
-        sentiment = sentiment_analyzer(text)
-        sentiments.append(sentiment[0]['label'])
-    
-    # Convert sentiments to a simple score for averaging (e.g., 1 to 5 for star rating)
-    sentiment_scores = {'1 star': -2, '2 stars': -1, '3 stars': 0, '4 stars': 1, '5 stars': 2}
-    scores = [sentiment_scores[s] for s in sentiments]
-    avg_score = sum(scores) / len(scores) if scores else 0
-
-    # Determine consensus
-    if avg_score > 1:
-        consensus = "Strongly Positive"
-    elif avg_score > 0:
-        consensus = "Positive"
-    elif avg_score < 0:
-        consensus = "Negative"
-    else:
-        consensus = "Neutral"
+@stock_metrics.timed('gdelt.fetch_news')
+def fetch_news(query, from_date, to_date, num_articles=100):
+    """
+    Fetch recent news articles related to a company name within a date range using GDELT Document API, excluding specific sources.
+    Returns None if the request failed, so callers can tell a failure from an empty month.
+    """
+    # Clean the query
+    query = clean_query(query)
     
-    return consensus, avg_score
+    params = stock_gdelt_fetcher.build_params(query, from_date, to_date, num_articles)
+    data = _get_fetcher().get(params)
+    if data is None:
+        return None  # The request failed, as opposed to a month with no articles
+    return _parse_articles(data)
+
+@stock_metrics.timed('gdelt.analyze_sentiment')
+def analyze_sentiment(articles, batch_size=stock_sentiment_engine.DEFAULT_BATCH_SIZE):
+    """Analyze sentiment of each article and return average sentiment score."""
+    return stock_sentiment_engine.analyze_sentiment(articles, batch_size=batch_size)
 
 def get_past_six_months():
     """Generate a list of the first and last dates for each of the past six months, starting from the end of the previous month."""
@@ -199,30 +130,25 @@ def get_past_six_months():
     
     return months
 
-def save_articles_to_csv(ticker, month, articles):
-    """Save articles to a CSV file named based on the ticker and month if the file doesn't already exist."""
-    os.makedirs(ticker, exist_ok=True)
-    csv_file_path = os.path.join(ticker, f"{ticker}_sentiment_for_{month}.csv")
-    
-    if os.path.exists(csv_file_path):
-        print(f"File {csv_file_path} already exists. Skipping write.")
-        return
+def run(tickers, date_ranges=None, fetch_workers=stock_jobs.DEFAULT_FETCH_WORKERS,
+        queue_size=stock_jobs.DEFAULT_QUEUE_SIZE, batch_articles=stock_jobs.DEFAULT_BATCH_ARTICLES, summary=None):
+    """
+    Fetch, score and store monthly GDELT sentiment for already validated tickers, through
+    the shared streaming pipeline (see stock_sentiment_runner.run).
 
-    headers = ['Title', 'Description', 'URL', 'Source Strength']
-    
-    with open(csv_file_path, mode='w', newline='', encoding='utf-8') as file:
-        writer = csv.DictWriter(file, fieldnames=headers)
-        writer.writeheader()
-        for article in articles:
-            writer.writerow({
-                'Title': article['title'],
-                'Description': article['description'],
-                'URL': article['url'],
-                'Source Strength': article['source_strength']
-            })
-    print(f"Saved articles to {csv_file_path}")
+    :return: (results, company_names); results maps (ticker, from_date, to_date) to
+             (consensus, avg_score) for every window, stored or new.
+    """
+    return stock_sentiment_runner.run(tickers, date_ranges or get_past_six_months(), SOURCE, fetch_news,
+                                      get_company_name, fetch_workers=fetch_workers, queue_size=queue_size,
+                                      batch_articles=batch_articles, summary=summary)
+
+print_results = stock_sentiment_runner.print_results
 
 def main():
+    # Deferred: stock_hmm_analysis pulls in hmmlearn and matplotlib
+    import stock_hmm_analysis
+
     # Collect tickers from user
     pre_tickers = []
     tkr = input("Enter the stock tickers you'd like to see analyzed (-1 to quit): ").upper()  # Convert to uppercase
@@ -232,28 +158,9 @@ def main():
 
     # Validate tickers
     tickers = stock_hmm_analysis.validate_tickers(pre_tickers)
-    
-    # Get date ranges for the past six months
-    date_ranges = get_past_six_months()
-    
-    # Analyze each ticker
-    for ticker in tickers:
-        company_name = get_company_name(ticker)
-        print(f"\nAnalyzing {company_name} ({ticker})...")
-        
-        for from_date, to_date in date_ranges:
-            articles = fetch_news(company_name, from_date, to_date)
-            if not articles:
-                print(f"No articles found for {company_name} from {from_date} to {to_date}.")
-                continue
-            
-            # Analyze and print consensus
-            consensus, avg_score = analyze_sentiment(articles)
-            print(f"From {from_date} to {to_date}: Media consensus on {ticker} ({company_name}): {consensus} (Score: {avg_score})")
-            
-            # Save articles to CSV
-            month = datetime.strptime(from_date, '%Y-%m-%d').strftime('%Y-%m')
-            save_articles_to_csv(ticker, month, articles)
+
+    results, company_names = run(tickers)
+    print_results(results, company_names)
 
 # Run the main function
 if __name__ == "__main__":
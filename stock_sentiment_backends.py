@@ -0,0 +1,118 @@
+import os
+import time
+
+# Constants
+BACKENDS = ("pytorch", "quantized", "onnx")
+ONNX_EXPORT_DIR = os.path.join('.cache', 'onnx')
+
+# Fixed headline set used to compare backends against the PyTorch pipeline
+PARITY_ARTICLES = [
+    "Apple beats quarterly earnings estimates as iPhone sales surge",
+    "Tesla shares plunge after disappointing delivery numbers",
+    "Microsoft announces new partnership to expand cloud services in Europe",
+    "Amazon faces antitrust lawsuit from federal regulators",
+    "Nvidia stock hits record high on booming AI chip demand",
+    "Boeing halts production after safety concerns over new jet",
+    "Google parent Alphabet reports steady ad revenue growth",
+    "Meta cuts thousands of jobs in latest round of layoffs",
+    "Netflix subscriber growth slows as competition heats up",
+    "Intel warns of weak demand, shares fall in after-hours trading",
+    "JPMorgan raises dividend after passing Federal Reserve stress test",
+    "Pfizer drug trial shows promising results for cancer patients",
+    "Walmart keeps full-year outlook unchanged amid mixed consumer spending",
+    "Coca-Cola posts in-line results, maintains guidance",
+    "AMD unveils new processors, analysts remain cautious",
+    "Disney theme parks see record attendance over the holidays",
+    "Ford recalls hundreds of thousands of vehicles over brake defect",
+    "Exxon profit drops sharply as oil prices retreat",
+    "Nike shares jump after strong holiday season sales",
+    "Starbucks struggles as sales decline in China",
+    "Berkshire Hathaway adds to its stake in energy companies",
+    "Visa and Mastercard settle long-running fee dispute with merchants",
+    "Salesforce CEO says company is on track for record year",
+    "Uber reports first full year of profitability",
+    "Zoom revenue growth stalls after pandemic boom fades",
+]
+
+def _onnx_export_path(model_name):
+    return os.path.join(ONNX_EXPORT_DIR, model_name.replace('/', '__'))
+
+def build_pipeline(backend, model_name):
+    """
+    Build a sentiment-analysis pipeline for the given backend.
+
+    - "pytorch": the stock transformers pipeline.
+    - "quantized": the same model with its Linear layers dynamically quantized to int8.
+    - "onnx": an ONNX Runtime export of the model (exported once, then reused from disk).
+    """
+    from transformers import pipeline, AutoTokenizer, AutoModelForSequenceClassification
+
+    if backend == "pytorch":
+        return pipeline("sentiment-analysis", model=model_name)
+
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    if backend == "quantized":
+        import torch
+        model = AutoModelForSequenceClassification.from_pretrained(model_name)
+        model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        return pipeline("sentiment-analysis", model=model, tokenizer=tokenizer)
+
+    if backend == "onnx":
+        from optimum.onnxruntime import ORTModelForSequenceClassification
+        export_path = _onnx_export_path(model_name)
+        if os.path.isdir(export_path):
+            model = ORTModelForSequenceClassification.from_pretrained(export_path)
+        else:
+            model = ORTModelForSequenceClassification.from_pretrained(model_name, export=True)
+            model.save_pretrained(export_path)
+        return pipeline("sentiment-analysis", model=model, tokenizer=tokenizer)
+
+    raise ValueError(f"Unknown sentiment backend '{backend}'. Choose one of {BACKENDS}.")
+
+def _labels(analyzer, texts, batch_size):
+    return [result['label'] for result in analyzer(texts, batch_size=batch_size, truncation=True)]
+
+def check_parity(backend, model_name, texts=PARITY_ARTICLES, batch_size=8):
+    """
+    Compare a backend's labels with the PyTorch pipeline on a fixed article set.
+
+    :return: Label agreement in percent.
+    """
+    reference = _labels(build_pipeline("pytorch", model_name), texts, batch_size)
+    candidate = _labels(build_pipeline(backend, model_name), texts, batch_size)
+    matches = sum(r == c for r, c in zip(reference, candidate))
+    agreement = 100 * matches / len(texts)
+    print(f"{backend} vs pytorch: {matches}/{len(texts)} labels agree ({agreement:.1f}%)")
+    return agreement
+
+def benchmark_backends(model_name, backends=BACKENDS, texts=PARITY_ARTICLES, batch_size=8, repeats=3):
+    """
+    Measure single-article latency and batched throughput for each backend.
+
+    :return: dict of backend -> {'latency_ms': ..., 'articles_per_sec': ...}
+    """
+    results = {}
+    for backend in backends:
+        analyzer = build_pipeline(backend, model_name)
+        analyzer(texts[0], truncation=True)  # Warm up
+
+        start = time.perf_counter()
+        for _ in range(repeats):
+            for text in texts:
+                analyzer(text, truncation=True)
+        latency_ms = 1000 * (time.perf_counter() - start) / (repeats * len(texts))
+
+        start = time.perf_counter()
+        for _ in range(repeats):
+            _labels(analyzer, texts, batch_size)
+        throughput = repeats * len(texts) / (time.perf_counter() - start)
+
+        results[backend] = {'latency_ms': latency_ms, 'articles_per_sec': throughput}
+        print(f"{backend:<10} latency: {latency_ms:8.2f} ms/article   throughput: {throughput:8.1f} articles/sec")
+    return results
+
+if __name__ == "__main__":
+    from stock_sentiment_engine import SENTIMENT_MODEL
+    for backend in BACKENDS[1:]:
+        check_parity(backend, SENTIMENT_MODEL)
+    benchmark_backends(SENTIMENT_MODEL)
@@ -0,0 +1,115 @@
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+
+# Constants
+DEFAULT_CACHE_PATH = os.path.join('.cache', 'sentiment_scores.sqlite')
+DEFAULT_MAX_ENTRIES = 500_000
+
+def normalize_text(text):
+    """Normalize text before hashing so trivial whitespace/case differences share a cache entry."""
+    # The star-rating model is uncased, so lowercasing does not change its output
+    return re.sub(r"\s+", " ", text).strip().lower()
+
+def text_hash(text):
+    """Return the content hash used as the cache key for a piece of text."""
+    return hashlib.sha256(normalize_text(text).encode('utf-8')).hexdigest()
+
+class SentimentCache:
+    """
+    Persistent SQLite cache of sentiment labels keyed by (model, normalized text hash).
+
+    Lookups refresh an entry's last-used time; once the table grows past
+    `max_entries` the least recently used rows are evicted.
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, model=None, max_entries=DEFAULT_MAX_ENTRIES):
+        self.path = path
+        self.model = model
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS scores ("
+            " model TEXT NOT NULL,"
+            " text_hash TEXT NOT NULL,"
+            " label TEXT NOT NULL,"
+            " last_used REAL NOT NULL,"
+            " PRIMARY KEY (model, text_hash))"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS scores_last_used ON scores (last_used)")
+        self._conn.commit()
+
+    def get_many(self, hashes):
+        """Return a dict of hash -> label for every hash already in the cache."""
+        hashes = list(set(hashes))
+        found = {}
+        with self._lock:
+            # Stay well under SQLite's bound-parameter limit
+            for start in range(0, len(hashes), 500):
+                chunk = hashes[start:start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT text_hash, label FROM scores WHERE model = ? AND text_hash IN ({placeholders})",
+                    [self.model, *chunk],
+                ).fetchall()
+                found.update(rows)
+            if found:
+                now = time.time()
+                self._conn.executemany(
+                    "UPDATE scores SET last_used = ? WHERE model = ? AND text_hash = ?",
+                    [(now, self.model, h) for h in found],
+                )
+                self._conn.commit()
+            self.hits += len(found)
+            self.misses += len(hashes) - len(found)
+        return found
+
+    def put_many(self, labels_by_hash):
+        """Store hash -> label pairs and evict the least recently used rows if over capacity."""
+        if not labels_by_hash:
+            return
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO scores (model, text_hash, label, last_used) VALUES (?, ?, ?, ?)",
+                [(self.model, h, label, now) for h, label in labels_by_hash.items()],
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        count = self._conn.execute("SELECT COUNT(*) FROM scores").fetchone()[0]
+        excess = count - self.max_entries
+        if excess > 0:
+            self._conn.execute(
+                "DELETE FROM scores WHERE rowid IN (SELECT rowid FROM scores ORDER BY last_used LIMIT ?)",
+                (excess,),
+            )
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM scores WHERE model = ?", (self.model,)).fetchone()[0]
+
+    def stats(self):
+        """Return hit/miss counters and the current hit rate."""
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,291 @@
+import stock_metrics
+import stock_sentiment_backends
+import stock_sentiment_cache
+import subprocess
+import sys
+import threading
+import time
+
+# Constants
+SENTIMENT_MODEL = 'nlptown/bert-base-multilingual-uncased-sentiment'
+DEFAULT_BATCH_SIZE = 32
+
+# Convert sentiments to a simple score for averaging (e.g., 1 to 5 for star rating)
+SENTIMENT_SCORES = {'1 star': -2, '2 stars': -1, '3 stars': 0, '4 stars': 1, '5 stars': 2}
+
+# The pipeline and score cache are created on first use so importing this module stays cheap
+_sentiment_analyzer = None
+_sentiment_cache = None
+_backend = None
+_load_lock = threading.Lock()
+
+def get_backend():
+    """Return the inference backend, read from config.SENTIMENT_BACKEND (default "pytorch")."""
+    global _backend
+    if _backend is None:
+        import config
+        _backend = getattr(config, "SENTIMENT_BACKEND", "pytorch")
+    return _backend
+
+def set_backend(backend):
+    """Switch the inference backend; the model and cache are reloaded on next use."""
+    global _backend, _sentiment_analyzer, _sentiment_cache
+    if backend not in stock_sentiment_backends.BACKENDS:
+        raise ValueError(f"Unknown sentiment backend '{backend}'. Choose one of {stock_sentiment_backends.BACKENDS}.")
+    with _load_lock:
+        _backend = backend
+        _sentiment_analyzer = None
+        if _sentiment_cache is not None:
+            _sentiment_cache.close()  # Entries are keyed per backend, so the old connection is done
+        _sentiment_cache = None
+
+def _cache_model_key():
+    # Non-default backends can disagree with PyTorch on a few labels, so they get their own entries
+    backend = get_backend()
+    return SENTIMENT_MODEL if backend == "pytorch" else f"{SENTIMENT_MODEL}@{backend}"
+
+def get_sentiment_analyzer():
+    """Return the shared sentiment pipeline, loading the model on first call."""
+    global _sentiment_analyzer
+    if _sentiment_analyzer is None:
+        backend = get_backend()
+        with _load_lock:
+            if _sentiment_analyzer is None:
+                # transformers/torch are only imported once something actually needs scoring
+                with stock_metrics.timer('sentiment.model_load'):
+                    _sentiment_analyzer = stock_sentiment_backends.build_pipeline(backend, SENTIMENT_MODEL)
+    return _sentiment_analyzer
+
+def get_sentiment_cache():
+    """Return the persistent score cache consulted before running the transformer."""
+    global _sentiment_cache
+    if _sentiment_cache is None:
+        model_key = _cache_model_key()
+        with _load_lock:
+            if _sentiment_cache is None:
+                _sentiment_cache = stock_sentiment_cache.SentimentCache(model=model_key)
+    return _sentiment_cache
+
+def warm_up():
+    """Load the model ahead of time and run one throwaway forward pass."""
+    get_sentiment_analyzer()("warm up", truncation=True)
+
+def article_text(article):
+    """Combine title and description into the text that gets scored."""
+    return f"{article['title']} {article['description']}"
+
+def consensus_from_score(avg_score):
+    """Map an average star score onto a consensus label."""
+    if avg_score > 1:
+        return "Strongly Positive"
+    elif avg_score > 0:
+        return "Positive"
+    elif avg_score < 0:
+        return "Negative"
+    return "Neutral"
+
+def _run_model(texts, batch_size):
+    """Run the model over texts in length-bucketed batches and return labels in input order."""
+    if not texts:
+        return []
+
+    sentiment_analyzer = get_sentiment_analyzer()
+
+    # Token lengths decide the buckets; truncation matches what the model will see
+    with stock_metrics.timer('sentiment.tokenize', items=len(texts)):
+        encoded = sentiment_analyzer.tokenizer(texts, truncation=True)
+    lengths = [len(ids) for ids in encoded['input_ids']]
+    order = sorted(range(len(texts)), key=lengths.__getitem__)
+
+    labels = [None] * len(texts)
+    for start in range(0, len(order), batch_size):
+        bucket = order[start:start + batch_size]
+        with stock_metrics.timer('sentiment.inference', items=len(bucket)):
+            results = sentiment_analyzer([texts[i] for i in bucket], batch_size=len(bucket), truncation=True)
+        for i, result in zip(bucket, results):
+            labels[i] = result['label']
+    return labels
+
+def score_texts(texts, batch_size=DEFAULT_BATCH_SIZE, use_cache=True):
+    """
+    Score a list of texts with the sentiment model and return the star labels in input order.
+
+    Cached texts are answered from the score cache; the rest are deduplicated, sorted by
+    token length and cut into batches of `batch_size`, so each forward pass only pads up to
+    the longest text in its own bucket.
+    """
+    hashes = [stock_sentiment_cache.text_hash(text) for text in texts]
+    sentiment_cache = get_sentiment_cache() if use_cache else None
+    known = sentiment_cache.get_many(hashes) if use_cache else {}
+
+    # Score each unseen text once, even if it appears many times in this run
+    pending = {}
+    for h, text in zip(hashes, texts):
+        if h not in known and h not in pending:
+            pending[h] = text
+    stock_metrics.count('sentiment.cache_hits', len(known))
+    stock_metrics.count('sentiment.texts_scored', len(pending))
+    new_labels = dict(zip(pending, _run_model(list(pending.values()), batch_size)))
+    if use_cache:
+        sentiment_cache.put_many(new_labels)
+
+    known.update(new_labels)
+    return [known[h] for h in hashes]
+
+def summarize_scores(scores, weights=None):
+    """Return (consensus, avg_score) for a list of per-article scores, optionally weighted."""
+    if weights is None:
+        avg_score = sum(scores) / len(scores) if scores else 0
+    else:
+        total = sum(weights)
+        avg_score = sum(score * weight for score, weight in zip(scores, weights)) / total if total else 0
+    return consensus_from_score(avg_score), avg_score
+
+def score_article_groups(groups, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Score many groups of articles (e.g. one per ticker and month) in shared batches.
+
+    :param groups: dict (or iterable of pairs) mapping a group key to its list of articles.
+    :param batch_size: Number of texts per forward pass.
+
+    :return: (labels, stats) where labels maps each key to the star label of every
+             article in that group, and stats holds the article count, elapsed seconds,
+             articles/sec and cache counters.
+    """
+    groups = list(groups.items()) if isinstance(groups, dict) else list(groups)
+
+    # Flatten every group into one stream so batches span tickers and months
+    texts = []
+    owners = []
+    for key, articles in groups:
+        for article in articles:
+            texts.append(article_text(article))
+            owners.append(key)
+
+    start = time.perf_counter()
+    flat_labels = score_texts(texts, batch_size=batch_size)
+    elapsed = time.perf_counter() - start
+
+    labels = {key: [] for key, _ in groups}
+    for key, label in zip(owners, flat_labels):
+        labels[key].append(label)
+
+    stats = {
+        'articles': len(texts),
+        'seconds': elapsed,
+        'articles_per_sec': len(texts) / elapsed if elapsed > 0 else 0.0,
+        **get_sentiment_cache().stats(),
+    }
+    return labels, stats
+
+def score_story_groups(groups, batch_size=DEFAULT_BATCH_SIZE, deduplicator=None, weighting=None):
+    """
+    Like score_article_groups, but group each key's syndicated copies into stories first
+    and score only one article per story.
+
+    Every copy gets its story's label, so stored articles keep one label each. The
+    weights share out a story's weight (see stock_article_dedup.copy_weight) across its
+    copies, so summarize_labels(labels, weights) counts each story once, scaled by how
+    widely it was syndicated, instead of once per copy.
+
+    :param deduplicator: ArticleDeduplicator to use (default: the shared one). If the shared
+                         one was disabled (stock_article_dedup.set_deduplicator(None)),
+                         every article is scored as its own story with weight 1.
+    :param weighting: 'story', 'log' or 'copies' (default: stock_article_dedup.DEFAULT_WEIGHTING).
+    :return: (labels, weights, stats); labels and weights map each key to one entry per
+             article; stats is score_article_groups' stats for the scored stories plus
+             'dedup', the summed ArticleDeduplicator counters.
+    """
+    import stock_article_dedup
+    deduplicator = deduplicator or stock_article_dedup.get_deduplicator()
+    weighting = weighting or stock_article_dedup.DEFAULT_WEIGHTING
+    groups = list(groups.items()) if isinstance(groups, dict) else list(groups)
+
+    if deduplicator is None:
+        labels, stats = score_article_groups(groups, batch_size=batch_size)
+        weights = {key: [1.0] * len(articles) for key, articles in groups}
+        n_articles = sum(len(articles) for _, articles in groups)
+        stats['dedup'] = {'articles': n_articles, 'exact_url': 0, 'exact_title': 0, 'near_duplicate': 0,
+                          'unique': n_articles}
+        return labels, weights, stats
+
+    stories = {key: deduplicator.dedup(articles) for key, articles in groups}
+    story_labels, stats = score_article_groups(
+        [(key, stories[key].unique_articles(articles)) for key, articles in groups], batch_size=batch_size)
+
+    labels, weights = {}, {}
+    for key, _ in groups:
+        result = stories[key]
+        labels[key] = result.expand(story_labels[key])
+        weights[key] = result.expand([weight / copies for weight, copies in zip(result.weights(weighting), result.copies)])
+
+    counters = {'articles': 0, 'exact_url': 0, 'exact_title': 0, 'near_duplicate': 0, 'unique': 0}
+    for result in stories.values():
+        for counter, value in result.counters.items():
+            counters[counter] += value
+    stats['dedup'] = counters
+    return labels, weights, stats
+
+def summarize_labels(labels, weights=None):
+    """Return (consensus, avg_score) for a list of star labels, optionally weighted."""
+    return summarize_scores([SENTIMENT_SCORES[label] for label in labels], weights)
+
+def analyze_sentiment_groups(groups, batch_size=DEFAULT_BATCH_SIZE, deduplicate=True):
+    """
+    Score many groups of articles in shared batches and summarize each group.
+
+    With deduplicate (the default) syndicated copies are scored once and weighted as in
+    score_story_groups; otherwise every article counts equally.
+
+    :return: (results, stats) where results maps each key to (consensus, avg_score);
+             stats is as returned by score_story_groups / score_article_groups.
+    """
+    if deduplicate:
+        labels, weights, stats = score_story_groups(groups, batch_size=batch_size)
+    else:
+        labels, stats = score_article_groups(groups, batch_size=batch_size)
+        weights = {key: None for key in labels}
+    results = {key: summarize_labels(group_labels, weights[key]) for key, group_labels in labels.items()}
+    return results, stats
+
+def analyze_sentiment(articles, batch_size=DEFAULT_BATCH_SIZE):
+    """Analyze sentiment of each article and return (consensus, avg_score)."""
+    results, _ = analyze_sentiment_groups([(None, articles)], batch_size=batch_size)
+    return results[None]
+
+def print_throughput(stats):
+    """Print the throughput figures returned by score_article_groups."""
+    print(f"Scored {stats['articles']} articles in {stats['seconds']:.2f}s "
+          f"({stats['articles_per_sec']:.1f} articles/sec, "
+          f"cache hits: {stats['hits']}, misses: {stats['misses']})")
+    if 'dedup' in stats:
+        import stock_article_dedup
+        stock_article_dedup.print_counters(stats['dedup'])
+
+# Snippet run in a fresh interpreter for each startup measurement
+_STARTUP_PROBE = """
+import resource, time
+start = time.perf_counter()
+import {module}
+imported = time.perf_counter() - start
+{extra}
+total = time.perf_counter() - start
+rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+print(f"{{imported:.3f}} {{total:.3f}} {{rss_mb:.1f}}")
+"""
+
+def benchmark_startup(modules=('stock_sentiment', 'stock_sentiment_GDELT')):
+    """
+    Measure import time and peak RSS of each module in a fresh interpreter,
+    first with the model left unloaded and then after an explicit warm_up().
+    """
+    print(f"{'Module':<24}{'Mode':<10}{'Import (s)':>12}{'Total (s)':>12}{'Peak RSS (MB)':>16}")
+    for module in modules:
+        for mode, extra in (("lazy", ""), ("warm", "import stock_sentiment_engine; stock_sentiment_engine.warm_up()")):
+            probe = _STARTUP_PROBE.format(module=module, extra=extra)
+            output = subprocess.run([sys.executable, "-c", probe], capture_output=True, text=True, check=True).stdout
+            imported, total, rss_mb = output.split()[-3:]
+            print(f"{module:<24}{mode:<10}{float(imported):>12.3f}{float(total):>12.3f}{float(rss_mb):>16.1f}")
+
+if __name__ == "__main__":
+    benchmark_startup()
@@ -0,0 +1,129 @@
+from datetime import datetime
+
+import stock_ingest_state
+import stock_jobs
+import stock_sentiment_engine
+
+def plan_windows(tickers, date_ranges, state, source, get_company_name):
+    """
+    Split the (ticker, month) windows into work for the pipeline. Completed months come
+    from the ingestion state store; only the rest need the network, and tickers sharing a
+    company name share one request per month.
+
+    :return: (results, resumed, tasks, company_names): (consensus, avg_score) of windows
+             scored earlier, [(key, articles)] fetched before a crash but never scored,
+             [(company_name, from_date, to_date, tickers)] still to fetch, and the
+             company name of each ticker with windows to fetch (only those are looked up).
+    """
+    results = {}
+    resumed = []
+    pending = {}
+    for ticker in tickers:
+        for from_date, to_date in date_ranges:
+            key = (ticker, from_date, to_date)
+            record = state.get(ticker, source, from_date, to_date)
+            if record and stock_ingest_state.is_complete_window(to_date):
+                if record['status'] == stock_ingest_state.STATUS_SCORED:
+                    results[key] = (record['consensus'], record['avg_score'])
+                    continue
+                # Fetched before a crash but never scored: resume without refetching
+                resumed.append((key, record['articles']))
+                continue
+            pending.setdefault(ticker, []).append((from_date, to_date))
+
+    # Company names cost a fundamentals lookup, so only resolve them for tickers going to the network
+    company_names = {ticker: get_company_name(ticker) for ticker in pending}
+    by_company = {}
+    for ticker, windows in pending.items():
+        for from_date, to_date in windows:
+            by_company.setdefault((company_names[ticker], from_date, to_date), []).append(ticker)
+    tasks = [(company_name, from_date, to_date, window_tickers)
+             for (company_name, from_date, to_date), window_tickers in sorted(by_company.items())]
+    return results, resumed, tasks, company_names
+
+def fetch_task(task, state, source, fetch_news):
+    """Fetch stage: one company's month from the source, recorded as fetched for each of its tickers."""
+    company_name, from_date, to_date, tickers = task
+    articles = fetch_news(company_name, from_date, to_date)
+    if articles is None:
+        # Nothing is recorded, so the next run retries this window
+        raise RuntimeError(f"request for {company_name} from {from_date} to {to_date} failed")
+    if not articles:
+        # A month with no coverage is still complete: record it so reruns skip the network
+        print(f"No articles found for {company_name} from {from_date} to {to_date}.")
+    windows = []
+    for ticker in tickers:
+        state.mark_fetched(ticker, source, from_date, to_date, articles)
+        windows.append(((ticker, from_date, to_date), articles))
+    return windows
+
+def store_windows(fetched, labels, weights, state, store, source):
+    """Store stage: save each window's articles with their scores, then mark the window scored."""
+    results = {}
+    for (ticker, from_date, to_date), group_labels in labels.items():
+        if not group_labels:
+            # No coverage that month: no consensus rather than a made-up neutral one
+            state.mark_scored(ticker, source, from_date, to_date, None, None)
+            results[(ticker, from_date, to_date)] = (None, None)
+            continue
+        consensus, avg_score = stock_sentiment_engine.summarize_labels(group_labels, weights[(ticker, from_date, to_date)])
+        month = datetime.strptime(from_date, '%Y-%m-%d').strftime('%Y-%m')
+        scores = [stock_sentiment_engine.SENTIMENT_SCORES[label] for label in group_labels]
+        store.append(ticker, month, fetched[(ticker, from_date, to_date)], source, labels=group_labels, scores=scores)
+        state.mark_scored(ticker, source, from_date, to_date, consensus, avg_score)
+        results[(ticker, from_date, to_date)] = (consensus, avg_score)
+    return results
+
+def run(tickers, date_ranges, source, fetch_news, get_company_name, fetch_workers=stock_jobs.DEFAULT_FETCH_WORKERS,
+        queue_size=stock_jobs.DEFAULT_QUEUE_SIZE, batch_articles=stock_jobs.DEFAULT_BATCH_ARTICLES, summary=None):
+    """
+    Fetch, score and store monthly news sentiment for already validated tickers.
+
+    Runs as a streaming pipeline (stock_jobs.stream): fetch_workers threads fetch windows
+    into a bounded queue, one thread scores them in batches of about batch_articles
+    articles (each syndicated story once), and a writer thread stores the articles with
+    their scores and marks each window scored. Network waits overlap inference, and a
+    full queue holds the fetchers back so memory stays flat.
+
+    :param source: Ingestion source name (stock_ingest_state.SOURCE_NEWSAPI / SOURCE_GDELT).
+    :param fetch_news: fetch_news(query, from_date, to_date) -> articles, or None if the request failed.
+    :param get_company_name: Ticker -> the company name used as the news query.
+    :return: (results, company_names); results maps (ticker, from_date, to_date) to
+             (consensus, avg_score) for every window, stored or new.
+    """
+    import stock_article_store  # Deferred: pulls in pyarrow
+    summary = summary or stock_jobs.RunSummary()
+    state = stock_ingest_state.IngestState()
+    store = stock_article_store.ArticleStore()
+
+    with summary.stage('plan', items=len(tickers) * len(date_ranges)):
+        results, resumed, tasks, company_names = plan_windows(tickers, date_ranges, state, source, get_company_name)
+    summary.count('windows_cached', len(results))
+    summary.count('windows_resumed', len(resumed))
+    print(f"\nFetching news for {len(tasks)} company/month windows...")
+
+    def score(batch):
+        labels, weights, stats = stock_sentiment_engine.score_story_groups(batch)
+        stock_sentiment_engine.print_throughput(stats)
+        summary.count('articles', stats['dedup']['articles'])
+        summary.count('stories_scored', stats['articles'])
+        return batch, labels, weights
+
+    def write(scored):
+        results.update(store_windows(*scored, state, store, source))
+
+    stock_jobs.stream(tasks, lambda task: fetch_task(task, state, source, fetch_news), score, write, summary,
+                      fetch_workers=fetch_workers, queue_size=queue_size, batch_articles=batch_articles,
+                      ready=resumed)
+    stock_jobs.print_pipeline_report(summary)
+    summary.count('windows', len(results))
+    return results, company_names
+
+def print_results(results, company_names):
+    """Print consensus for every window, stored or new."""
+    for (ticker, from_date, to_date), (consensus, avg_score) in sorted(results.items()):
+        name = company_names.get(ticker, ticker)
+        if consensus is None:
+            print(f"From {from_date} to {to_date}: No articles found for {ticker} ({name}).")
+            continue
+        print(f"From {from_date} to {to_date}: Media consensus on {ticker} ({name}): {consensus} (Score: {avg_score})")
@@ -0,0 +1,216 @@
+import time
+
+# Constants
+STRONG = "Strong"
+MODERATE = "Moderate"
+WEAK = "Weak"
+UNCLASSIFIED = "Unclassified"
+
+STRONG_KEYWORDS = [
+    "press release", "announced", "executive", "official", "statement",
+    "disclosed", "released", "earnings call", "SEC filing", "government report",
+    "quarterly report", "fiscal report", "financial statement", "official report",
+    "conference call", "CEO", "CFO", "authorized", "confirmed", "verified",
+    "annual report", "shareholder letter", "board of directors", "regulatory filing",
+    "audited", "certified", "corporate filing", "press conference", "official announcement"
+]
+
+MODERATE_KEYWORDS = [
+    "analyst", "report", "industry", "expert", "market analysis",
+    "consulting firm", "study", "survey", "projection", "forecast",
+    "research report", "white paper", "summary", "evaluation",
+    "market outlook", "insight", "review", "observation", "interview",
+    "predicted", "estimated", "expected", "analysis", "commentary",
+    "business intelligence", "sector report", "trend analysis",
+    "valuation", "financial analyst", "consultant", "advisory",
+    "assessment", "industry data"
+]
+
+WEAK_KEYWORDS = [
+    "rumor", "speculation", "unconfirmed", "alleged", "reported",
+    "insider", "gossip", "leaked", "anonymous source", "unverified",
+    "suspected", "claimed", "suggested", "unsubstantiated", "possible",
+    "hinted", "implied", "likely", "anticipated", "potentially",
+    "unclear", "predicted", "projected", "forecasted", "assumed",
+    "suggestive", "unproven", "indicated", "insinuated", "allegedly",
+    "hypothetical", "possibly", "guesswork", "doubtful", "conjecture"
+]
+
+# Classes in precedence order: an article gets the first class with any hit
+CLASSES = [(STRONG, STRONG_KEYWORDS), (MODERATE, MODERATE_KEYWORDS), (WEAK, WEAK_KEYWORDS)]
+
+# Per-token lookups are memoized; the memo is cleared if the vocabulary grows past this
+MAX_MEMO_TOKENS = 200000
+
+class _TokenIndex(dict):
+    """Memo of token -> (token, one-word keywords inside it, phrases it can start), or None if neither."""
+
+    def __init__(self, single_words, phrases):
+        super().__init__()
+        self.single_words = single_words
+        self.phrases = phrases
+
+    def __missing__(self, token):
+        if len(self) >= MAX_MEMO_TOKENS:
+            self.clear()
+        singles = [term for term in self.single_words if term in token]
+        phrase_starts = [phrase for phrase in self.phrases if token.endswith(phrase[1])]
+        entry = (token, singles, phrase_starts) if singles or phrase_starts else None
+        self[token] = entry
+        return entry
+
+class SourceStrengthClassifier:
+    """
+    Keyword source-strength classifier built once.
+
+    Keywords are lowercased (the article text is too), which fixes mixed-case keywords
+    like "SEC filing" and "CEO" never matching. Text is split on single spaces into
+    tokens, and keyword occurrences are found through a per-token index:
+
+    - a one-word keyword occurs iff it is a substring of some token;
+    - "w1 ... wn" occurs iff a token ends with w1, the next tokens equal the middle words,
+      and the token after them starts with wn.
+
+    That is exactly `keyword in content`, but each distinct token is only checked against
+    the keyword lists once; after that, a token costs one dict lookup, and tokens
+    without keywords never reach Python-level code.
+    """
+
+    def __init__(self, classes=CLASSES):
+        self.rank = {}
+        self.term_class = {}
+        for rank, (strength, keywords) in enumerate(classes):
+            self.rank[strength] = rank
+            for keyword in keywords:
+                keyword = keyword.lower()
+                # A term listed in two classes counts for the stronger one, as in the original checks
+                self.term_class.setdefault(keyword, strength)
+        self.term_rank = {term: self.rank[strength] for term, strength in self.term_class.items()}
+        self._index = _TokenIndex(
+            [term for term in self.term_class if ' ' not in term],
+            # (term, first word, middle words, last word) for every multi-word keyword
+            [(term, words[0], words[1:-1], words[-1])
+             for term, words in ((term, term.split(' ')) for term in self.term_class if ' ' in term)],
+        )
+
+    def hits(self, content):
+        """Return the set of keywords occurring in already-lowercased text."""
+        tokens = content.split(' ')
+        found = set()
+        for token, singles, phrase_starts in filter(None, map(self._index.__getitem__, set(tokens))):
+            found.update(singles)
+            if not phrase_starts:
+                continue
+            # Check each phrase at every position of this token (list.index jumps between them)
+            position = -1
+            while True:
+                try:
+                    position = tokens.index(token, position + 1)
+                except ValueError:
+                    break
+                for term, _, middle, last_word in phrase_starts:
+                    last = position + len(middle) + 1
+                    if (last < len(tokens) and tokens[last].startswith(last_word)
+                            and (not middle or tokens[position + 1:last] == middle)):
+                        found.add(term)
+        return found
+
+    def classify_text(self, content):
+        """Return (strength, hit terms ordered strongest first) for already-lowercased text."""
+        found = self.hits(content)
+        if not found:
+            return UNCLASSIFIED, []
+        ordered = sorted(found, key=lambda term: (self.term_rank[term], term))
+        return self.term_class[ordered[0]], ordered
+
+def article_content(article):
+    """Title and description, lowercased, as the classifier sees them."""
+    return f"{article.get('title', '')} {article.get('description', '')}".lower()
+
+_classifier = None
+
+def get_classifier():
+    """Return the shared classifier, building it on first use."""
+    global _classifier
+    if _classifier is None:
+        _classifier = SourceStrengthClassifier()
+    return _classifier
+
+def classify_articles(articles):
+    """
+    Classify many articles with the shared classifier.
+
+    :return: List of (strength, hit terms) per article; strength is 'Strong', 'Moderate',
+             'Weak' or 'Unclassified', and the hit terms are ordered strongest first.
+    """
+    classifier = get_classifier()
+    return [classifier.classify_text(article_content(article)) for article in articles]
+
+def classify_article(article):
+    """Classify an article based on its source strength."""
+    return classify_articles([article])[0][0]
+
+def _scan_classify(article, lowercase_keywords=True):
+    """The original per-call substring scans, kept as the reference for benchmarks and checks."""
+    content = article_content(article)
+    for strength, keywords in CLASSES:
+        if any((keyword.lower() if lowercase_keywords else keyword) in content for keyword in keywords):
+            return strength
+    return UNCLASSIFIED
+
+# Headline vocabulary for synthetic articles
+FILLER_WORDS = [
+    "shares", "stock", "rose", "fell", "company", "quarter", "revenue", "growth", "market", "apple",
+    "amazon", "deal", "bank", "rates", "fed", "inflation", "tech", "sales", "profit", "loss", "says",
+    "new", "after", "amid", "as", "to", "the", "of", "in", "on", "for", "with", "higher", "lower",
+    "investors", "trade", "china", "oil", "prices", "week", "year", "billion", "million", "plan",
+    "cuts", "jobs", "data", "nasdaq", "dow", "record", "beats", "misses", "estimates", "guidance",
+    "merger", "acquisition", "lawsuit", "tesla", "microsoft", "nvidia", "chip", "cloud", "retail",
+]
+
+def sample_articles(n=5000, keyword_rate=0.03, seed=0):
+    """Synthetic headlines where roughly `keyword_rate` of the words are classifier keywords."""
+    import random
+    rng = random.Random(seed)
+    keywords = [keyword for _, class_keywords in CLASSES for keyword in class_keywords]
+    articles = []
+    for _ in range(n):
+        words = [
+            rng.choice(keywords) if rng.random() < keyword_rate
+            else rng.choice(FILLER_WORDS) + rng.choice(['', '', '', 's', ',', '.', "'s"])
+            for _ in range(rng.randint(6, 25))
+        ]
+        articles.append({'title': ' '.join(words[:12]).capitalize(), 'description': ' '.join(words[12:])})
+    return articles
+
+def benchmark(n=5000, keyword_rate=0.03, repeats=3):
+    """
+    Compare the indexed classifier with the original scan on synthetic articles, check
+    that it agrees with the scan once the keywords are lowercased, and count how many
+    articles the case fix reclassifies.
+    """
+    articles = sample_articles(n, keyword_rate)
+    classify_articles(articles)  # Build the classifier and warm its token index outside the timed loop
+
+    start = time.perf_counter()
+    for _ in range(repeats):
+        scanned = [_scan_classify(article, lowercase_keywords=False) for article in articles]
+    scan_seconds = (time.perf_counter() - start) / repeats
+
+    start = time.perf_counter()
+    for _ in range(repeats):
+        indexed = [strength for strength, _ in classify_articles(articles)]
+    indexed_seconds = (time.perf_counter() - start) / repeats
+
+    fixed_scan = [_scan_classify(article) for article in articles]
+    mismatches = sum(a != b for a, b in zip(indexed, fixed_scan))
+    reclassified = sum(a != b for a, b in zip(indexed, scanned))
+    print(f"{n} articles ({keyword_rate:.0%} keywords): scan {scan_seconds * 1000:.1f} ms, indexed {indexed_seconds * 1000:.1f} ms "
+          f"({scan_seconds / indexed_seconds:.1f}x)")
+    print(f"Disagreements with the lowercased scan: {mismatches}; reclassified by the case fix: {reclassified}")
+    return {'scan_seconds': scan_seconds, 'indexed_seconds': indexed_seconds,
+            'mismatches': mismatches, 'reclassified': reclassified}
+
+if __name__ == "__main__":
+    for rate in (0.01, 0.03, 0.15):
+        benchmark(keyword_rate=rate)
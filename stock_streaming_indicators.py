@@ -0,0 +1,332 @@
+import json
+import math
+import os
+from collections import deque
+
+# Each class below does O(1) work per bar and mirrors the online kernels pandas uses for
+# rolling(...).mean(), rolling(...).std() and ewm(adjust=False).mean(), so after warm-up
+# the streamed values reproduce the batch calculate_* results in stock_hmm_analysis.
+
+class RollingMean:
+    """Trailing mean over `window` bars (pandas rolling(window).mean())."""
+
+    def __init__(self, window):
+        self.window = window
+        self.values = deque()
+        self.sum_x = 0.0
+        self.compensation_add = 0.0
+        self.compensation_remove = 0.0
+        self.neg_ct = 0
+        self.prev_value = math.nan
+        self.same_count = 0
+
+    def _add(self, value):
+        y = value - self.compensation_add
+        t = self.sum_x + y
+        self.compensation_add = t - self.sum_x - y
+        self.sum_x = t
+        if math.copysign(1.0, value) < 0:
+            self.neg_ct += 1
+        self.same_count = self.same_count + 1 if value == self.prev_value else 1
+        self.prev_value = value
+
+    def _remove(self, value):
+        y = -value - self.compensation_remove
+        t = self.sum_x + y
+        self.compensation_remove = t - self.sum_x - y
+        self.sum_x = t
+        if math.copysign(1.0, value) < 0:
+            self.neg_ct -= 1
+
+    def update(self, value):
+        """Add one bar and return the current mean (NaN until the window is full)."""
+        if len(self.values) == self.window:
+            self._remove(self.values.popleft())
+        self.values.append(value)
+        self._add(value)
+
+        nobs = len(self.values)
+        if nobs < self.window:
+            return math.nan
+        if self.same_count >= nobs:
+            return self.prev_value
+        result = self.sum_x / nobs
+        if self.neg_ct == 0 and result < 0:
+            return 0.0
+        if self.neg_ct == nobs and result > 0:
+            return 0.0
+        return result
+
+    def to_dict(self):
+        return {
+            'window': self.window, 'values': list(self.values), 'sum_x': self.sum_x,
+            'compensation_add': self.compensation_add, 'compensation_remove': self.compensation_remove,
+            'neg_ct': self.neg_ct, 'prev_value': self.prev_value, 'same_count': self.same_count,
+        }
+
+    @classmethod
+    def from_dict(cls, state):
+        obj = cls(state['window'])
+        obj.values = deque(state['values'])
+        for key in ('sum_x', 'compensation_add', 'compensation_remove', 'neg_ct', 'prev_value', 'same_count'):
+            setattr(obj, key, state[key])
+        return obj
+
+class RollingStd:
+    """Trailing sample standard deviation over `window` bars (pandas rolling(window).std())."""
+
+    def __init__(self, window):
+        self.window = window
+        self.values = deque()
+        self.mean_x = 0.0
+        self.ssqdm_x = 0.0
+        self.compensation_add = 0.0
+        self.compensation_remove = 0.0
+        self.prev_value = math.nan
+        self.same_count = 0
+
+    def _add(self, value, nobs):
+        self.same_count = self.same_count + 1 if value == self.prev_value else 1
+        self.prev_value = value
+        prev_mean = self.mean_x - self.compensation_add
+        y = value - self.compensation_add
+        t = y - self.mean_x
+        self.compensation_add = t + self.mean_x - y
+        self.mean_x += t / nobs
+        self.ssqdm_x += (value - prev_mean) * (value - self.mean_x)
+
+    def _remove(self, value, nobs):
+        if nobs:
+            prev_mean = self.mean_x - self.compensation_remove
+            y = value - self.compensation_remove
+            t = y - self.mean_x
+            self.compensation_remove = t + self.mean_x - y
+            self.mean_x -= t / nobs
+            self.ssqdm_x -= (value - prev_mean) * (value - self.mean_x)
+        else:
+            self.mean_x = 0.0
+            self.ssqdm_x = 0.0
+
+    def update(self, value):
+        """Add one bar and return the current standard deviation (NaN until the window is full)."""
+        # Same order as pandas: drop the bar leaving the window, then add the new one
+        if len(self.values) == self.window:
+            self._remove(self.values.popleft(), len(self.values))
+        self.values.append(value)
+        self._add(value, len(self.values))
+
+        nobs = len(self.values)
+        if nobs < self.window or nobs <= 1:
+            return math.nan
+        if self.same_count >= nobs:
+            return 0.0
+        return math.sqrt(max(self.ssqdm_x / (nobs - 1), 0.0))
+
+    def to_dict(self):
+        return {
+            'window': self.window, 'values': list(self.values), 'mean_x': self.mean_x,
+            'ssqdm_x': self.ssqdm_x, 'compensation_add': self.compensation_add,
+            'compensation_remove': self.compensation_remove, 'prev_value': self.prev_value,
+            'same_count': self.same_count,
+        }
+
+    @classmethod
+    def from_dict(cls, state):
+        obj = cls(state['window'])
+        obj.values = deque(state['values'])
+        for key in ('mean_x', 'ssqdm_x', 'compensation_add', 'compensation_remove', 'prev_value', 'same_count'):
+            setattr(obj, key, state[key])
+        return obj
+
+class EMA:
+    """Exponential moving average (pandas ewm(span=span, adjust=False).mean())."""
+
+    def __init__(self, span):
+        self.span = span
+        self.alpha = 2.0 / (span + 1.0)
+        self.weighted = math.nan
+
+    def update(self, value):
+        if math.isnan(self.weighted):
+            self.weighted = value
+        elif self.weighted != value:
+            old_wt = 1.0 - self.alpha
+            self.weighted = (old_wt * self.weighted + self.alpha * value) / (old_wt + self.alpha)
+        return self.weighted
+
+    def to_dict(self):
+        return {'span': self.span, 'weighted': self.weighted}
+
+    @classmethod
+    def from_dict(cls, state):
+        obj = cls(state['span'])
+        obj.weighted = state['weighted']
+        return obj
+
+class RSI:
+    """Relative strength index over `window` bars using simple rolling gain/loss means."""
+
+    def __init__(self, window=14):
+        self.window = window
+        self.prev_price = math.nan
+        self.avg_gain = RollingMean(window)
+        self.avg_loss = RollingMean(window)
+
+    def update(self, price):
+        delta = price - self.prev_price  # NaN on the first bar counts as no gain and no loss
+        self.prev_price = price
+        gain = delta if delta > 0 else 0.0
+        loss = -(delta if delta < 0 else 0.0)
+        avg_gain = self.avg_gain.update(gain)
+        avg_loss = self.avg_loss.update(loss)
+        if math.isnan(avg_gain) or math.isnan(avg_loss):
+            return math.nan
+        if avg_loss == 0:
+            return math.nan if avg_gain == 0 else 100.0
+        return 100 - (100 / (1 + avg_gain / avg_loss))
+
+    def to_dict(self):
+        return {'window': self.window, 'prev_price': self.prev_price,
+                'avg_gain': self.avg_gain.to_dict(), 'avg_loss': self.avg_loss.to_dict()}
+
+    @classmethod
+    def from_dict(cls, state):
+        obj = cls(state['window'])
+        obj.prev_price = state['prev_price']
+        obj.avg_gain = RollingMean.from_dict(state['avg_gain'])
+        obj.avg_loss = RollingMean.from_dict(state['avg_loss'])
+        return obj
+
+class MACD:
+    """MACD line, signal line and histogram from fast/slow/signal EMAs."""
+
+    def __init__(self, fast=12, slow=26, signal=9):
+        self.fast = EMA(fast)
+        self.slow = EMA(slow)
+        self.signal = EMA(signal)
+
+    def update(self, price):
+        macd_line = self.fast.update(price) - self.slow.update(price)
+        signal_line = self.signal.update(macd_line)
+        return macd_line, signal_line, macd_line - signal_line
+
+    def to_dict(self):
+        return {'fast': self.fast.to_dict(), 'slow': self.slow.to_dict(), 'signal': self.signal.to_dict()}
+
+    @classmethod
+    def from_dict(cls, state):
+        obj = cls()
+        obj.fast = EMA.from_dict(state['fast'])
+        obj.slow = EMA.from_dict(state['slow'])
+        obj.signal = EMA.from_dict(state['signal'])
+        return obj
+
+class IndicatorState:
+    """
+    All stock_hmm_analysis indicators for one ticker, updated one Adj Close bar at a time.
+
+    The very first bar only seeds the previous price (get_stock_data drops it because its
+    return is NaN); every later bar returns a dict with the same columns main() computes.
+    State can be checkpointed with save()/load() and then fed only new bars.
+    """
+
+    def __init__(self):
+        self.prev_close = math.nan
+        self.last_date = None
+        self.ma = RollingMean(14)
+        self.ema = EMA(14)
+        self.rsi = RSI(14)
+        self.macd = MACD(12, 26, 9)
+        self.volatility = RollingStd(30)
+
+    def update(self, adj_close, date=None):
+        """Feed one bar; return the indicator values for it, or None for the seeding bar."""
+        returns = adj_close / self.prev_close - 1.0
+        self.prev_close = adj_close
+        if date is not None:
+            self.last_date = str(date)
+        if math.isnan(returns):
+            return None
+
+        macd_line, signal_line, macd_histogram = self.macd.update(adj_close)
+        return {
+            'Adj Close': adj_close,
+            'Returns': returns,
+            'MA_14': self.ma.update(adj_close),
+            'EMA_14': self.ema.update(adj_close),
+            'RSI_14': self.rsi.update(adj_close),
+            'MACD_Line': macd_line,
+            'Signal_Line': signal_line,
+            'MACD_Histogram': macd_histogram,
+            'Volatility_30': self.volatility.update(returns) * math.sqrt(30),
+        }
+
+    def update_many(self, adj_close):
+        """
+        Feed a pandas Series of Adj Close (indexed by date) and return a DataFrame of the
+        indicator rows it produced. Bars on or before the last seen date are skipped, so a
+        restored state can be handed the full recent history safely.
+        """
+        import pandas as pd
+        rows = {}
+        for date, price in adj_close.items():
+            if self.last_date is not None and str(date) <= self.last_date:
+                continue
+            row = self.update(float(price), date)
+            if row is not None:
+                rows[date] = row
+        return pd.DataFrame.from_dict(rows, orient='index')
+
+    def to_dict(self):
+        return {
+            'prev_close': self.prev_close, 'last_date': self.last_date,
+            'ma': self.ma.to_dict(), 'ema': self.ema.to_dict(), 'rsi': self.rsi.to_dict(),
+            'macd': self.macd.to_dict(), 'volatility': self.volatility.to_dict(),
+        }
+
+    @classmethod
+    def from_dict(cls, state):
+        obj = cls()
+        obj.prev_close = state['prev_close']
+        obj.last_date = state['last_date']
+        obj.ma = RollingMean.from_dict(state['ma'])
+        obj.ema = EMA.from_dict(state['ema'])
+        obj.rsi = RSI.from_dict(state['rsi'])
+        obj.macd = MACD.from_dict(state['macd'])
+        obj.volatility = RollingStd.from_dict(state['volatility'])
+        return obj
+
+    def save(self, path):
+        """Checkpoint the state to a JSON file."""
+        with open(path + '.tmp', 'w', encoding='utf-8') as file:
+            json.dump(self.to_dict(), file)
+        os.replace(path + '.tmp', path)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, encoding='utf-8') as file:
+            return cls.from_dict(json.load(file))
+
+def check_against_batch(adj_close):
+    """
+    Stream a ticker's Adj Close Series (checkpointing halfway) and compare with the batch
+    calculate_* functions. Returns {indicator: number of bars that differ}.
+    """
+    import numpy as np
+    import pandas as pd
+    import stock_indicator_engine
+
+    prices = adj_close.dropna()
+    batch = stock_indicator_engine._per_ticker(prices.to_frame('Adj Close'))['Adj Close']
+
+    half = len(prices) // 2
+    state = IndicatorState()
+    first = state.update_many(prices.iloc[:half])
+    restored = IndicatorState.from_dict(json.loads(json.dumps(state.to_dict())))
+    streamed = pd.concat([first, restored.update_many(prices)])
+
+    return {
+        name: int(np.sum(~((streamed[name].to_numpy() == batch[name].to_numpy())
+                           | (np.isnan(streamed[name].to_numpy()) & np.isnan(batch[name].to_numpy())))))
+        for name in stock_indicator_engine.INDICATOR_NAMES
+    }